@@ -7,6 +7,7 @@ import glob
 import matplotlib.pyplot as plt
 import functools
  
+import jax_am
 from jax_am.fem.solver import solver
 from jax_am.fem.generate_mesh import Mesh, box_mesh, get_meshio_cell_type
 from jax_am.fem.utils import save_sol
@@ -15,6 +16,9 @@ from jax_am.phase_field.utils import make_video
 
 from applications.fem.crystal_plasticity.models import CrystalPlasticity
 
+
+jax_am.enable_x64()
+
 os.environ["CUDA_VISIBLE_DEVICES"] = "3"
 
 
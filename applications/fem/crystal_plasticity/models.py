@@ -118,9 +118,15 @@ class CrystalPlasticity(Mechanics):
         tensor_map, _ = self.get_maps()
         return tensor_map
 
+    def internal_vars_gp(self):
+        """The time step is an internal variable (not read from self in the maps), 
+        so that the cached kernels follow its changes between steps
+        """
+        dt_gp = np.full(self.rot_mats_gp.shape[:2], self.dt)
+        return [self.Fp_inv_old_gp, self.slip_resistance_old_gp, self.slip_old_gp, self.rot_mats_gp, dt_gp]
+
     def newton_update(self, sol):
-        return self.newton_vars(sol, laplace=[self.Fp_inv_old_gp, self.slip_resistance_old_gp, 
-            self.slip_old_gp, self.rot_mats_gp])
+        return self.newton_vars(sol, laplace=self.internal_vars_gp())
 
     def get_maps(self):
         h = 541.5
@@ -129,7 +135,7 @@ class CrystalPlasticity(Mechanics):
         ao = 0.001
         xm = 0.1
 
-        def get_partial_tensor_map(Fp_inv_old, slip_resistance_old, slip_old, rot_mat):
+        def get_partial_tensor_map(Fp_inv_old, slip_resistance_old, slip_old, rot_mat, dt):
             _, unflatten_fn = jax.flatten_util.ravel_pytree(Fp_inv_old)
     
             def first_PK_stress(u_grad):
@@ -148,7 +154,7 @@ class CrystalPlasticity(Mechanics):
 
             def helper(u_grad, S):
                 tau = np.sum(S[None, :, :] * rotate_tensor_rank_2_vmap(rot_mat, self.Schmid_tensors), axis=(1, 2))
-                gamma_inc = ao*self.dt*np.absolute(tau/slip_resistance_old)**(1./xm)*np.sign(tau)
+                gamma_inc = ao*dt*np.absolute(tau/slip_resistance_old)**(1./xm)*np.sign(tau)
 
                 tmp = h*np.absolute(gamma_inc) * np.absolute(1 - slip_resistance_old/t_sat)**gss_a * np.sign(1 - slip_resistance_old/t_sat)
                 g_inc = (self.q @ tmp[:, None]).reshape(-1)
@@ -228,12 +234,12 @@ class CrystalPlasticity(Mechanics):
 
             return first_PK_stress, update_int_vars
 
-        def tensor_map(u_grad, Fp_inv_old, slip_resistance_old, slip_old, rot_mat):
-            first_PK_stress, _ = get_partial_tensor_map(Fp_inv_old, slip_resistance_old, slip_old, rot_mat)
+        def tensor_map(u_grad, Fp_inv_old, slip_resistance_old, slip_old, rot_mat, dt):
+            first_PK_stress, _ = get_partial_tensor_map(Fp_inv_old, slip_resistance_old, slip_old, rot_mat, dt)
             return first_PK_stress(u_grad)
 
-        def update_int_vars_map(u_grad, Fp_inv_old, slip_resistance_old, slip_old, rot_mat):
-            _, update_int_vars = get_partial_tensor_map(Fp_inv_old, slip_resistance_old, slip_old, rot_mat)
+        def update_int_vars_map(u_grad, Fp_inv_old, slip_resistance_old, slip_old, rot_mat, dt):
+            _, update_int_vars = get_partial_tensor_map(Fp_inv_old, slip_resistance_old, slip_old, rot_mat, dt)
             return update_int_vars(u_grad)
 
         return tensor_map, update_int_vars_map
@@ -247,7 +253,7 @@ class CrystalPlasticity(Mechanics):
         u_grads = np.sum(u_grads, axis=2) # (num_cells, num_quads, vec, dim)
   
         Fp_inv_new_gp, slip_resistance_new_gp, slip_new_gp, y_ini_gp = \
-            vmap_update_int_vars_map(u_grads, self.Fp_inv_old_gp, self.slip_resistance_old_gp, self.slip_old_gp, self.rot_mats_gp)
+            vmap_update_int_vars_map(u_grads, *self.internal_vars_gp())
 
         slip_inc_dt_index_0 = (slip_new_gp[0, 0, 0] - self.slip_old_gp[0, 0, 0])/self.dt
         print(f"slip inc dt index 0 = {slip_inc_dt_index_0}, max slip = {np.max(np.absolute(slip_new_gp))}")
@@ -270,7 +276,7 @@ class CrystalPlasticity(Mechanics):
 
         partial_tensor_map, _ = self.get_maps()
         vmap_partial_tensor_map = jax.jit(jax.vmap(jax.vmap(partial_tensor_map)))
-        P = vmap_partial_tensor_map(u_grads, self.Fp_inv_old_gp, self.slip_resistance_old_gp, self.slip_old_gp, self.rot_mats_gp)
+        P = vmap_partial_tensor_map(u_grads, *self.internal_vars_gp())
 
         def P_to_sigma(P, F):
             return 1./np.linalg.det(F) * P @ F.T
@@ -6,12 +6,16 @@ import glob
 import meshio
 import matplotlib.pyplot as plt
 
+import jax_am
 from jax_am.fem.solver import solver
 from jax_am.fem.generate_mesh import Mesh, box_mesh, get_meshio_cell_type
 from jax_am.fem.utils import save_sol
 
 from applications.fem.crystal_plasticity.models import CrystalPlasticity
 
+
+jax_am.enable_x64()
+
 os.environ["CUDA_VISIBLE_DEVICES"] = "2"
 
 case_name = 'polycrystal_am'
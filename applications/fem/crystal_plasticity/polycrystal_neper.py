@@ -6,6 +6,7 @@ import glob
 import meshio
 import matplotlib.pyplot as plt
 
+import jax_am
 from jax_am.fem.solver import solver
 from jax_am.fem.generate_mesh import Mesh, box_mesh, get_meshio_cell_type
 from jax_am.fem.utils import save_sol
@@ -13,6 +14,9 @@ from jax_am.phase_field.neper import pre_processing
 
 from applications.fem.crystal_plasticity.models import CrystalPlasticity
 
+
+jax_am.enable_x64()
+
 os.environ["CUDA_VISIBLE_DEVICES"] = "1"
 
 case_name = 'polycrystal_neper'
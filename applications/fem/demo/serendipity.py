@@ -4,11 +4,15 @@ import numpy as onp
 import meshio
 import os
 
+import jax_am
 from jax_am.fem.models import LinearElasticity
 from jax_am.fem.solver import solver
 from jax_am.fem.generate_mesh import Mesh, box_mesh, get_meshio_cell_type
 from jax_am.fem.utils import save_sol
 
+
+jax_am.enable_x64()
+
 os.environ["CUDA_VISIBLE_DEVICES"] = "3"
 
 def problem():
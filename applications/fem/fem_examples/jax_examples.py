@@ -5,10 +5,15 @@ import meshio
 import time
 import os
 
+import jax_am
 from jax_am.fem.models import LinearElasticity, HyperElasticity, Plasticity
 from jax_am.fem.solver import solver
 from jax_am.fem.utils import modify_vtu_file, save_sol
 from jax_am.fem.generate_mesh import Mesh, cylinder_mesh
+from jax_am.fem.benchmark import machine_metadata, save_results
+
+
+jax_am.enable_x64()
 
 os.environ["CUDA_VISIBLE_DEVICES"] = "1"
 
@@ -192,18 +197,16 @@ def plasticity():
 
 
 def performance_test():
-    solve_time = []
-    num_dofs = []
-    # for i in range(6, -1, -1):
-    for i in range(3, -1, -1):
+    """Solve time of the dogbone sweep, saved as JSON with machine metadata.
+    For the generated box mesh benchmarks with baseline comparison, run python -m jax_am.fem.benchmark
+    """
+    records = []
+    # for i in range(7):
+    for i in range(4):
         wall_time, n_dofs = linear_elasticity_dogbone(10., i)
-        solve_time.append(wall_time)
-        num_dofs.append(n_dofs)
-    solve_time = np.array(solve_time)
-    num_dofs = np.array(num_dofs)
-    platform = jax.lib.xla_bridge.get_backend().platform
-    onp.savetxt(os.path.join(data_dir, f'/txt/jax_fem_{platform}_time.txt'), solve_time[::-1], fmt='%.3f')
-    onp.savetxt(os.path.join(data_dir, f'txt/jax_fem_{platform}_dof.txt'), num_dofs[::-1], fmt='%.3f')
+        records.append({'problem': 'dogbone', 'mesh_index': i, 'num_dofs': int(n_dofs), 'metrics': {'solve': wall_time}})
+    results = {'metadata': machine_metadata(), 'results': records}
+    save_results(results, os.path.join(data_dir, f'json/jax_fem_{results["metadata"]["backend"]}_dogbone.json'))
 
 
 def generate_fem_examples():
@@ -1,5 +1,6 @@
 import matplotlib.pyplot as plt
 import numpy as onp
+import json
 import os
 
 # Latex style plot
@@ -33,6 +34,16 @@ def plot_plastic_stress_strain():
         plt.savefig(os.path.join(data_dir, f'pdf/{problem_names[i]}_stress_strain.pdf'), bbox_inches='tight')
 
 
+def load_jax_fem_performance(data_dir, platform):
+    """Read the output of jax_examples.performance_test
+    """
+    with open(os.path.join(data_dir, f"json/jax_fem_{platform}_dogbone.json")) as f:
+        records = json.load(f)['results']
+    solve_time = onp.array([r['metrics']['solve'] for r in records])
+    num_dofs = onp.array([r['num_dofs'] for r in records])
+    return solve_time, num_dofs
+
+
 def plot_performance():
     data_dir = f"applications/fem/fem_examples/data/"
     abaqus_cpu_time = onp.loadtxt(os.path.join(data_dir, f"txt/abaqus_fem_time_cpu.txt"))
@@ -41,10 +52,8 @@ def plot_performance():
     fenicsx_time_np_1 = onp.loadtxt(os.path.join(data_dir, f"txt/fenicsx_fem_time_mpi_np_1.txt"))
     fenicsx_time_np_2 = onp.loadtxt(os.path.join(data_dir, f"txt/fenicsx_fem_time_mpi_np_2.txt"))
     fenicsx_time_np_4 = onp.loadtxt(os.path.join(data_dir, f"txt/fenicsx_fem_time_mpi_np_4.txt"))
-    jax_time_cpu = onp.loadtxt(os.path.join(data_dir, f"txt/jax_fem_cpu_time.txt"))  
-    jax_time_gpu = onp.loadtxt(os.path.join(data_dir, f"txt/jax_fem_gpu_time.txt"))  
-    cpu_dofs = onp.loadtxt(os.path.join(data_dir, f"txt/jax_fem_cpu_dof.txt"))   
-    gpu_dofs = onp.loadtxt(os.path.join(data_dir, f"txt/jax_fem_gpu_dof.txt"))   
+    jax_time_cpu, cpu_dofs = load_jax_fem_performance(data_dir, 'cpu')
+    jax_time_gpu, gpu_dofs = load_jax_fem_performance(data_dir, 'gpu')
 
     plt.figure(figsize=(12, 9))
     plt.plot(gpu_dofs[1:], abaqus_cpu_time[1:], linestyle='-', marker='o', markersize=12, linewidth=2, color='blue', label='Abaqus CPU')
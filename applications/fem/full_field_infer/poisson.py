@@ -7,11 +7,15 @@ import os
 import glob
 import scipy.optimize as opt
 
+import jax_am
 from jax_am.fem.core import FEM
 from jax_am.fem.solver import solver, adjoint_method
 from jax_am.fem.utils import modify_vtu_file, save_sol
 from jax_am.fem.generate_mesh import Mesh, box_mesh
 
+
+jax_am.enable_x64()
+
 onp.random.seed(0)
 
 os.environ["CUDA_VISIBLE_DEVICES"] = "3"
@@ -5,6 +5,7 @@ import os
 import matplotlib.pyplot as plt
 import time
 
+import jax_am
 from jax_am.fem.generate_mesh import Mesh, box_mesh
 from jax_am.fem.solver import solver
 from jax_am.fem.utils import save_sol
@@ -14,6 +15,9 @@ from applications.fem.multi_scale.utils import tensor_to_flat, tensor_to_flat
 from applications.fem.multi_scale.trainer import H_to_C, get_nn_batch_forward
 from applications.fem.multi_scale.fem_model import HyperElasticity
 
+
+jax_am.enable_x64()
+
 args.device = 1
 
 os.environ["CUDA_VISIBLE_DEVICES"] = str(args.device)
@@ -30,8 +30,16 @@ class HyperElasticity(Mechanics):
         else:
             raise NotImplementedError(f"mode = {self.mode} is not defined.")
 
+    def rve_internal_vars(self, H_bar):
+        """H_bar is passed to the kernels as an internal variable (not read from self), 
+        so that cached kernels follow its changes and batched solves can vmap over it.
+        """
+        return {'laplace': [self.E, self.nu, np.broadcast_to(H_bar, self.E.shape + H_bar.shape)]}
+
     def compute_residual(self, sol):
-        if self.mode == 'rve' or self.mode == 'dns' :
+        if self.mode == 'rve':
+            return self.compute_residual_vars(sol, **self.rve_internal_vars(self.H_bar))
+        elif self.mode == 'dns':
             return self.compute_residual_vars(sol, laplace=[self.E, self.nu])
         elif self.mode == 'nn':
             return self.compute_residual_vars(sol)
@@ -43,7 +51,9 @@ class HyperElasticity(Mechanics):
         return stress_map
 
     def newton_update(self, sol):
-        if self.mode == 'dns' or self.mode == 'rve':
+        if self.mode == 'rve':
+            return self.newton_vars(sol, **self.rve_internal_vars(self.H_bar))
+        elif self.mode == 'dns':
             return self.newton_vars(sol, laplace=[self.E, self.nu])
         elif self.mode == 'nn':
             return self.newton_vars(sol)
@@ -63,7 +73,7 @@ class HyperElasticity(Mechanics):
     def stress_strain_fns(self):
         if self.mode == 'rve':  
             stress, psi = self.maps_rve()
-            vmap_stress = lambda x: jax.vmap(jax.vmap(stress))(x, self.E, self.nu)
+            vmap_stress = lambda x: jax.vmap(jax.vmap(stress))(x, *self.rve_internal_vars(self.H_bar)['laplace'])
             vmap_energy = lambda x: jax.vmap(jax.vmap(psi))(x + self.H_bar[None, None, :, :], self.E, self.nu)
         elif self.mode == 'dns':
             stress, psi = self.maps_dns()
@@ -88,9 +98,9 @@ class HyperElasticity(Mechanics):
             return energy
         P_fn = jax.grad(psi)
 
-        def first_PK_stress(u_grad, E, nu):
+        def first_PK_stress(u_grad, E, nu, H_bar):
             I = np.eye(self.dim)
-            F = u_grad + I + self.H_bar
+            F = u_grad + I + H_bar
             P = P_fn(F, E, nu)
             return P
 
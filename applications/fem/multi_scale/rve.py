@@ -7,14 +7,18 @@ import glob
 from functools import partial
 from scipy.stats import qmc
 
+import jax_am
 from jax_am.fem.generate_mesh import Mesh, box_mesh
-from jax_am.fem.solver import solver, assign_bc, get_A_fn_linear_fn
+from jax_am.fem.solver import solver, solver_batch, assign_bc, get_A_fn_linear_fn
 from jax_am.fem.utils import save_sol
 
 from applications.fem.multi_scale.arguments import args
 from applications.fem.multi_scale.utils import flat_to_tensor
 from applications.fem.multi_scale.fem_model import HyperElasticity
 
+
+jax_am.enable_x64()
+
 os.environ["CUDA_VISIBLE_DEVICES"] = str(args.device)
 
 
@@ -77,7 +81,6 @@ def rve_problem(data_dir):
     periodic_bc_info = [location_fns_A, location_fns_B, mappings, vecs]
     problem = HyperElasticity(jax_mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info, 
         periodic_bc_info=periodic_bc_info, additional_info=('rve', None))
-    problem.p_num_eps = 1e2 # For numerical stability of imposing periodic B.C.
     return problem
 
 
@@ -137,7 +140,7 @@ def check_one_rve():
 def solve_rve_problem(problem, sample_H_bar):
     base_H_bar = flat_to_tensor(sample_H_bar)
     problem.H_bar = base_H_bar
-    sol_fluc = solver(problem)
+    sol_fluc = solver(problem, periodic_method='master_slave')
     energy = problem.compute_energy(sol_fluc)
     ratios = [0.25, 0.5, 0.75, 0.9, 1.]
     if np.any(np.isnan(energy)):
@@ -145,12 +148,34 @@ def solve_rve_problem(problem, sample_H_bar):
         sol_fluc = np.zeros((problem.num_total_nodes, problem.vec))
         for ratio in ratios:
             problem.H_bar = ratio * base_H_bar
-            sol_fluc = solver(problem)
+            sol_fluc = solver(problem, periodic_method='master_slave')
         energy = problem.compute_energy(sol_fluc)
 
     return sol_fluc, np.hstack((sample_H_bar, energy))
 
 
+def solve_rve_batch(problem, sample_H_bars):
+    """Solve the RVE problem for a batch of samples at once, samples that fail are solved again 
+    with quasi-static steps by solve_rve_problem
+    """
+    base_H_bars = jax.vmap(flat_to_tensor)(np.array(sample_H_bars))
+    batch_size = len(base_H_bars)
+    E, nu = problem.E, problem.nu
+    # The material fields are shared by the batch, only H_bar is batched
+    internal_vars = {'laplace': [E, nu, np.broadcast_to(base_H_bars[:, None, None, :, :], (batch_size,) + E.shape + (3, 3))]}
+    sol_flucs, report = solver_batch(problem, internal_vars=internal_vars, internal_vars_axes={'laplace': [None, None, 0]}, 
+                                     return_report=True)
+    results = []
+    for i in range(batch_size):
+        problem.H_bar = base_H_bars[i]
+        energy = problem.compute_energy(sol_flucs[i])
+        if report.batch_converged[i] and not np.any(np.isnan(energy)):
+            results.append((sol_flucs[i], np.hstack((sample_H_bars[i], energy))))
+        else:
+            results.append(solve_rve_problem(problem, sample_H_bars[i]))
+    return results
+
+
 def generate_samples():
     dim_H = 6
     sampler = qmc.Sobol(d=dim_H, scramble=False, seed=0)
@@ -163,7 +188,7 @@ def generate_samples():
     return scaled_sample
  
 
-def collect_data():
+def collect_data(batch_size=32):
     data_dir = os.path.join(os.path.dirname(__file__), 'data')
     problem = rve_problem(data_dir)
     date = f"11012022"
@@ -186,20 +211,22 @@ def collect_data():
         todo = list(set(complete) - set(done))
         if len(todo) == 0:
             break
-        chosen_ind = onp.random.choice(todo)
-        print(f"\nSolving problem # {chosen_ind} on device = {args.device}, done = {len(done)}, todo = {len(todo)}, total = {len(complete)} ")
-        sample_H_bar = samples[chosen_ind]
-        sol_fluc, data = solve_rve_problem(problem, sample_H_bar)
-        if np.any(np.isnan(data)):
-            print(f"######################################### Failed solve, check why!")
-            onp.savetxt(os.path.join(root_numpy, f"{chosen_ind:05d}.txt"), sample_H_bar)
-        else:
-            print(f"Saving data = {data}")
-            onp.save(os.path.join(root_numpy, f"{chosen_ind:05d}.npy"), data)
-
-        sol_disp = problem.fluc_to_disp(sol_fluc)
-        jax_vtu_path = os.path.join(root_vtk, f"sol_disp_{chosen_ind:05d}.vtu")
-        save_sol(problem, sol_disp, jax_vtu_path)
+        chosen_inds = onp.random.choice(todo, min(batch_size, len(todo)), replace=False)
+        print(f"\nSolving problems # {chosen_inds.tolist()} on device = {args.device}, done = {len(done)}, todo = {len(todo)}, total = {len(complete)} ")
+        sample_H_bars = samples[chosen_inds]
+        results = solve_rve_batch(problem, sample_H_bars)
+        for chosen_ind, sample_H_bar, (sol_fluc, data) in zip(chosen_inds, sample_H_bars, results):
+            if np.any(np.isnan(data)):
+                print(f"######################################### Failed solve, check why!")
+                onp.savetxt(os.path.join(root_numpy, f"{chosen_ind:05d}.txt"), sample_H_bar)
+            else:
+                print(f"Saving data = {data}")
+                onp.save(os.path.join(root_numpy, f"{chosen_ind:05d}.npy"), data)
+
+            problem.H_bar = flat_to_tensor(sample_H_bar)
+            sol_disp = problem.fluc_to_disp(sol_fluc)
+            jax_vtu_path = os.path.join(root_vtk, f"sol_disp_{chosen_ind:05d}.vtu")
+            save_sol(problem, sol_disp, jax_vtu_path)
 
 
 if __name__=="__main__":
@@ -10,11 +10,12 @@ import glob
 import matplotlib.pyplot as plt
 from torch.utils.data import Dataset, DataLoader
 
+import jax_am
 from applications.fem.multi_scale.arguments import args
 from applications.fem.multi_scale.utils import flat_to_tensor, tensor_to_flat
 
-from jax.config import config
-config.update("jax_enable_x64", True)
+
+jax_am.enable_x64()
 
 os.environ["CUDA_VISIBLE_DEVICES"] = str(args.device)
 
@@ -5,12 +5,16 @@ import os
 import glob
 import meshio
 
+import jax_am
 from jax_am.fem.generate_mesh import box_mesh, Mesh
 from jax_am.fem.solver import solver
 from jax_am.fem.utils import save_sol
 
 from applications.fem.thermal.models import Thermal, initialize_hash_map, update_hash_map, get_active_mesh
 
+
+jax_am.enable_x64()
+
 os.environ["CUDA_VISIBLE_DEVICES"] = "3"
 data_dir = os.path.join(os.path.dirname(__file__), 'data') 
 
@@ -40,19 +40,9 @@ class Thermal(FEM):
         return self.compute_Neumann_integral_vars(surface_old_T)
 
     def get_surface_old_T(self, sol):
-        """TODO: Should we move this function to jax-am library?
+        """Temperature at the face quadrature points of each Neumann boundary, (num_selected_faces, num_face_quads, vec)
         """
-        cells_sol = sol[self.cells] # (num_cells, num_nodes, vec)
-        surface_old_T = []
-        crt_t = []
-        for i in range(len(self.neumann_value_fns)):
-            boundary_inds = self.neumann_boundary_inds_list[i]
-            selected_cell_sols = cells_sol[boundary_inds[:, 0]] # (num_selected_faces, num_nodes, vec))
-            selected_face_shape_vals = self.face_shape_vals[boundary_inds[:, 1]] # (num_selected_faces, num_face_quads, num_nodes)
-            # (num_selected_faces, 1, num_nodes, vec) * (num_selected_faces, num_face_quads, num_nodes, 1) -> (num_selected_faces, num_face_quads, vec) 
-            u = np.sum(selected_cell_sols[:, None, :, :] * selected_face_shape_vals[:, :, :, None], axis=2)
-            surface_old_T.append(u)
-        return surface_old_T
+        return [self.interpolate_to_face_quads(sol, boundary_inds) for boundary_inds in self.neumann_boundary_inds_list]
 
     def update_Neumann_boundary_inds(self):
         cell_points = onp.take(self.points, self.cells, axis=0) # (num_cells, num_nodes, dim)
@@ -6,6 +6,7 @@ import glob
 import meshio
 import time
 
+import jax_am
 from jax_am.fem.generate_mesh import Mesh
 from jax_am.fem.core import FEM
 from jax_am.fem.solver import solver
@@ -13,6 +14,9 @@ from jax_am.fem.utils import save_sol
 
 from applications.fem.thermal.models import Thermal, initialize_hash_map, update_hash_map, get_active_mesh
 
+
+jax_am.enable_x64()
+
 os.environ["CUDA_VISIBLE_DEVICES"] = "3"
 data_dir = os.path.join(os.path.dirname(__file__), 'data') 
 
@@ -95,7 +99,7 @@ def ded_thin_wall():
                 print(f"Laser off: i = {i} in {toolpath.shape[0]} , j = {j} in {num_laser_off}")
                 old_sol = full_sol[points_map_active]
                 problem.old_sol = old_sol
-                sol = solver(problem, linear=True)
+                sol = solver(problem, linear=True, linear_solver='scipy_direct')
                 full_sol = full_sol.at[points_map_active].set(sol)
                 vtk_path = os.path.join(vtk_dir, f"u_active_{i:05d}_{j:05d}.vtu")
                 save_sol(problem, sol, vtk_path)
@@ -130,7 +134,7 @@ def ded_thin_wall():
                     print(f"New elements born")
                     problem = Thermal(active_mesh, vec=vec, dim=dim, dirichlet_bc_info=[[],[],[]], neumann_bc_info=neumann_bc_info_laser_on, 
                                       additional_info=(old_sol, rho, Cp, dt, external_faces))
-                sol = solver(problem, linear=True)
+                sol = solver(problem, linear=True, linear_solver='scipy_direct')
                 full_sol = full_sol.at[points_map_active].set(sol)
                 if j % 10 == 0:
                     vtk_path = os.path.join(vtk_dir, f"u_active_{i:05d}_{j:05d}.vtu")
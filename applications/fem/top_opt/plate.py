@@ -10,6 +10,7 @@ from scipy.optimize import Bounds
 import meshio
 import time
 
+import jax_am
 from jax_am.fem.generate_mesh import Mesh, box_mesh
 from jax_am.fem.solver import solver, adjoint_method
 from jax_am.fem.utils import save_sol
@@ -17,6 +18,9 @@ from jax_am.fem.utils import save_sol
 from applications.fem.top_opt.fem_model import Elasticity
 from applications.fem.top_opt.mma import optimize
 
+
+jax_am.enable_x64()
+
 os.environ["CUDA_VISIBLE_DEVICES"] = "1"
 
 
@@ -8,6 +8,7 @@ import glob
 from functools import partial
 from orix.quaternion import Orientation
 
+import jax_am
 from jax_am.cfd.cfd_am import mesh3d, AM_3d
 from jax_am.phase_field.utils import Field, walltime
 from jax_am.phase_field.yaml_parser import pf_parse
@@ -15,6 +16,8 @@ from jax_am.phase_field.allen_cahn import PFSolver
 from jax_am.phase_field.neper import pre_processing
 
 
+jax_am.enable_x64()
+
 os.environ["CUDA_VISIBLE_DEVICES"] = "1"
 
 
@@ -29,3 +29,12 @@ Contact
 
 __version__ = "0.0.2"
 
+
+def enable_x64():
+    """Switch JAX to 64-bit floats. 
+    Importing jax_am does not change the global JAX config; call this at the top of a script 
+    (FEM warns and falls back to calling it on construction otherwise).
+    """
+    import jax
+    jax.config.update("jax_enable_x64", True)
+
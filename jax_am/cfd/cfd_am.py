@@ -7,7 +7,6 @@ from functools import partial
 import os
 import time
 import glob
-jax.config.update("jax_enable_x64", True)
 
 
  # calculate ghost_cell values
@@ -410,6 +409,7 @@ class poisson():
         values = vmap_fn(U[self.msh.cell_conn],*args)
         self.values = self.apply_BC_to_matrix(values)
         self.precond_values = ((self.msh.cell_conn == np.arange(self.msh.cell_num)[:,None])*self.values).sum(axis=1)
+        self.amg_precond = None
 
     def compute_linearized_residual(self, U):
         return (self.values * U[self.msh.cell_conn]).sum(axis=1)
@@ -418,6 +418,25 @@ class poisson():
         # return (1./self.values[:,0]*U)
         return (1./self.precond_values*U)
 
+    def get_sparse_matrix(self):
+        # the matrix of compute_linearized_residual, duplicated neighbors (padded boundary cells) are summed
+        rows = onp.repeat(onp.arange(self.msh.cell_num), self.msh.cell_conn.shape[1])
+        cols = onp.array(self.msh.cell_conn).reshape(-1)
+        return scipy.sparse.csr_array((onp.array(self.values).reshape(-1), (rows, cols)), 
+                                      shape=(self.msh.cell_num, self.msh.cell_num))
+
+    def get_amg_preconditioner(self):
+        # smoothed aggregation AMG V-cycle, set up once per newton_update. The stencil pattern is fixed, 
+        # so the aggregates of the first setup are reused and only the values are updated
+        from jax_am.fem.amg import SmoothedAggregationAMG
+        if self.amg_precond is None:
+            if getattr(self, 'amg', None) is None:
+                self.amg = SmoothedAggregationAMG(self.get_sparse_matrix())
+            else:
+                self.amg.update(self.get_sparse_matrix())
+            self.amg_precond = self.amg.get_precond()
+        return self.amg_precond
+
     def set_bc(self, bc_type, bc_value):
         self.bc_type = bc_type
         self.bc_value = bc_value
@@ -677,7 +696,7 @@ class mesh3d(uniform_mesh):
 
 
 def solver_linear(eqn,*args,tol=1e-6,precond=False,update=True):
-# solve linear problems
+# solve linear problems, precond can be False, True (Jacobi) or 'amg'
     
     dofs = np.zeros(eqn.ndof)
     
@@ -686,7 +705,9 @@ def solver_linear(eqn,*args,tol=1e-6,precond=False,update=True):
         eqn.newton_update(dofs,*args)
 
     A_fn = eqn.compute_linearized_residual
-    if precond:
+    if precond == 'amg':
+        preconditoner = eqn.get_amg_preconditioner()
+    elif precond:
         preconditoner = eqn.jacobiPreconditioner
     else:
         preconditoner = None
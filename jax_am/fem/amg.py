@@ -0,0 +1,295 @@
+"""Smoothed aggregation algebraic multigrid (SA-AMG) preconditioner.
+
+The hierarchy is set up on the host with numpy/scipy, and the V-cycle is applied in JAX, so that it can be
+used as the preconditioner M of jax.scipy.sparse.linalg.cg/bicgstab.
+
+Reference:
+Vanek, Petr, Jan Mandel, and Marian Brezina.
+"Algebraic multigrid by smoothed aggregation for second and fourth order elliptic problems."
+Computing 56.3 (1996): 179-196.
+"""
+import jax
+import jax.numpy as np
+import numpy as onp
+import scipy
+from jax.experimental.sparse import BCOO
+
+
+def rigid_body_modes(points):
+    """Near-nullspace of linear elasticity: translations and infinitesimal rotations.
+
+    Parameters
+    ----------
+    points : onp.ndarray
+        (num_nodes, dim), dim = 2 or 3
+
+    Returns
+    -------
+    B : onp.ndarray
+        (num_nodes*dim, 3) for dim = 2, (num_nodes*dim, 6) for dim = 3
+    """
+    points = onp.asarray(points, dtype=onp.float64)
+    num_nodes, dim = points.shape
+    # Centered coordinates keep the rotations well conditioned
+    x = points - onp.mean(points, axis=0)
+    zero = onp.zeros(num_nodes)
+    if dim == 2:
+        rotations = [onp.stack((-x[:, 1], x[:, 0]), axis=1)]
+    elif dim == 3:
+        rotations = [onp.stack((zero, -x[:, 2], x[:, 1]), axis=1),
+                     onp.stack((x[:, 2], zero, -x[:, 0]), axis=1),
+                     onp.stack((-x[:, 1], x[:, 0], zero), axis=1)]
+    else:
+        raise NotImplementedError(f"Rigid body modes are only defined for dim = 2 or 3, got dim = {dim}")
+    translations = [onp.tile(onp.eye(dim)[d], (num_nodes, 1)) for d in range(dim)]
+    return onp.stack([mode.reshape(-1) for mode in translations + rotations], axis=1)
+
+
+def near_nullspace(points, vec, dim):
+    """Rigid body modes if the unknown is a displacement (vec == dim), otherwise constants for each component.
+
+    Returns
+    -------
+    B : onp.ndarray
+        (num_nodes*vec, num_modes)
+    """
+    num_nodes = len(points)
+    if vec == dim and dim in [2, 3]:
+        return rigid_body_modes(onp.asarray(points)[:, :dim])
+    return onp.kron(onp.ones((num_nodes, 1)), onp.eye(vec))
+
+
+def strength_graph(A, dof_to_node, theta):
+    """Node graph of strong connections. A block (i, j) of A is strong if its Frobenius norm c_ij satisfies
+    c_ij >= theta*sqrt(c_ii*c_jj). The graph is symmetrized and has no diagonal.
+
+    Returns
+    -------
+    C : scipy.sparse.csr_array
+        (num_nodes, num_nodes)
+    """
+    num_nodes = dof_to_node.max() + 1
+    A = A.tocoo()
+    C = scipy.sparse.csr_array((A.data**2, (dof_to_node[A.row], dof_to_node[A.col])), shape=(num_nodes, num_nodes))
+    C.sum_duplicates()
+    C.data = onp.sqrt(C.data)
+    diag = C.diagonal()
+    C = C.tocoo()
+    strong = (C.row != C.col) & (C.data >= theta*onp.sqrt(diag[C.row]*diag[C.col]))
+    C = scipy.sparse.csr_array((onp.ones(onp.sum(strong)), (C.row[strong], C.col[strong])), shape=(num_nodes, num_nodes))
+    C = C + C.T
+    C.sort_indices()
+    return C
+
+
+def standard_aggregation(C):
+    """Greedy aggregation of the strength graph C.
+    Pass 1 forms aggregates of a node and all its neighbors, if none of them is aggregated yet.
+    Pass 2 adds remaining nodes to a neighboring aggregate. Pass 3 groups what is left with its free neighbors.
+    Isolated nodes (e.g., fully constrained ones) are not aggregated and only seen by the smoother.
+    Passes 1 and 3 depend on the visiting order and loop over nodes; solvers set up for a sequence of matrices 
+    with the same pattern reuse the aggregates, see SmoothedAggregationAMG.update.
+
+    Returns
+    -------
+    aggregates : onp.ndarray
+        (num_nodes,) aggregate index of each node, -1 for isolated nodes
+    num_aggregates : int
+    """
+    indptr, indices = C.indptr, C.indices
+    num_nodes = C.shape[0]
+    aggregates = -onp.ones(num_nodes, dtype=onp.int64)
+    num_aggregates = 0
+
+    for i in range(num_nodes):
+        neighbors = indices[indptr[i]:indptr[i + 1]]
+        if aggregates[i] < 0 and len(neighbors) > 0 and onp.all(aggregates[neighbors] < 0):
+            aggregates[neighbors] = num_aggregates
+            aggregates[i] = num_aggregates
+            num_aggregates += 1
+
+    # Pass 2: the first neighbor (in the sorted row of C) aggregated in pass 1
+    rows = onp.repeat(onp.arange(num_nodes), onp.diff(indptr))
+    joins = (aggregates[rows] < 0) & (aggregates[indices] >= 0)
+    joining_nodes, first = onp.unique(rows[joins], return_index=True)
+    aggregates[joining_nodes] = aggregates[indices[joins]][first]
+
+    for i in onp.flatnonzero(aggregates < 0):
+        neighbors = indices[indptr[i]:indptr[i + 1]]
+        if aggregates[i] < 0 and len(neighbors) > 0:
+            aggregates[neighbors[aggregates[neighbors] < 0]] = num_aggregates
+            aggregates[i] = num_aggregates
+            num_aggregates += 1
+
+    return aggregates, num_aggregates
+
+
+def fit_candidates(dof_aggregates, B):
+    """Tentative prolongator T with orthonormal columns such that T B_c = B, by a QR factorization of
+    the rows of B in each aggregate. Aggregates with fewer dofs than near-nullspace vectors get fewer coarse dofs.
+    Aggregates with the same number of dofs are factorized together by one stacked QR.
+
+    Parameters
+    ----------
+    dof_aggregates : onp.ndarray
+        (num_dofs,) aggregate index of each dof, -1 for unaggregated dofs
+    B : onp.ndarray
+        (num_dofs, num_modes)
+
+    Returns
+    -------
+    T : scipy.sparse.csr_array
+        (num_dofs, num_coarse_dofs)
+    B_c : onp.ndarray
+        (num_coarse_dofs, num_modes)
+    coarse_dof_to_node : onp.ndarray
+        (num_coarse_dofs,) the aggregate of each coarse dof, i.e., the coarse "node"
+    """
+    num_dofs, num_modes = B.shape
+    valid = onp.flatnonzero(dof_aggregates >= 0)
+    order = valid[onp.argsort(dof_aggregates[valid], kind='stable')]
+    counts = onp.bincount(dof_aggregates[valid])
+    starts = onp.cumsum(counts) - counts
+    # Coarse dofs of each aggregate, numbered aggregate by aggregate
+    num_coarse = onp.minimum(counts, num_modes)
+    coarse_starts = onp.cumsum(num_coarse) - num_coarse
+    rows, cols, vals = [onp.zeros(0, dtype=onp.int64)], [onp.zeros(0, dtype=onp.int64)], [onp.zeros(0)]
+    B_c = onp.zeros((onp.sum(num_coarse), num_modes))
+    for n in onp.unique(counts):
+        aggregates = onp.flatnonzero(counts == n)
+        m = min(n, num_modes)
+        dofs = order[starts[aggregates][:, None] + onp.arange(n)] # (num_aggregates_n, n)
+        Q, R = onp.linalg.qr(B[dofs]) # (num_aggregates_n, n, m), (num_aggregates_n, m, num_modes)
+        coarse_dofs = coarse_starts[aggregates][:, None] + onp.arange(m) # (num_aggregates_n, m)
+        rows.append(onp.repeat(dofs.reshape(-1), m))
+        cols.append(onp.repeat(coarse_dofs, n, axis=0).reshape(-1))
+        vals.append(Q.reshape(-1))
+        B_c[coarse_dofs.reshape(-1)] = R.reshape(-1, num_modes)
+    T = scipy.sparse.csr_array((onp.hstack(vals), (onp.hstack(rows), onp.hstack(cols))),
+                               shape=(num_dofs, len(B_c)))
+    return T, B_c, onp.repeat(onp.arange(len(counts)), num_coarse)
+
+
+def spectral_radius(D_inv, A, num_iterations=20, seed=0):
+    """Power iteration estimate of the spectral radius of D^{-1} A
+    """
+    x = onp.random.default_rng(seed).random(A.shape[0])
+    rho = 1.
+    for i in range(num_iterations):
+        y = D_inv*(A @ x)
+        rho = onp.linalg.norm(y)/onp.linalg.norm(x)
+        x = y/onp.linalg.norm(y)
+    return rho
+
+
+def smoother_data(A):
+    """Damped Jacobi smoother of a level: A, the inverse diagonal and the damping 4/(3 rho(D^{-1} A))
+    """
+    diag = A.diagonal()
+    D_inv = onp.where(diag != 0., 1./onp.where(diag != 0., diag, 1.), 0.)
+    return {'A': A, 'D_inv': D_inv, 'omega': 4./3./spectral_radius(D_inv, A)}
+
+
+def smooth_prolongator(level):
+    """Set level['P'] = (I - omega D^{-1} A) T, the tentative prolongator smoothed by one damped Jacobi step,
+    and return the Galerkin coarse operator P^T A P.
+    """
+    A, T = level['A'], level['T']
+    P = scipy.sparse.csr_array(T - scipy.sparse.diags(level['omega']*level['D_inv']) @ (A @ T))
+    level['P'] = P
+    return scipy.sparse.csr_array(P.T @ A @ P)
+
+
+class SmoothedAggregationAMG():
+    """Smoothed aggregation AMG hierarchy of a sparse matrix A, with damped Jacobi smoothing of the
+    tentative prolongators, Galerkin coarse operators P^T A P and a dense pseudo-inverse on the coarsest level.
+
+    Parameters
+    ----------
+    A : scipy.sparse matrix
+        (num_dofs, num_dofs)
+    B : onp.ndarray
+        (num_dofs, num_modes) near-nullspace vectors, defaults to constants. See near_nullspace.
+    dof_to_node : onp.ndarray
+        (num_dofs,) node of each dof, aggregation works on the node graph. Defaults to one dof per node.
+    theta : float
+        Strength of connection threshold
+    max_coarse : int
+        Stop coarsening once a level has at most max_coarse dofs
+    max_levels : int
+    sweeps : int
+        Damped Jacobi sweeps before and after each coarse correction
+    """
+    def __init__(self, A, B=None, dof_to_node=None, theta=0., max_coarse=500, max_levels=10, sweeps=2):
+        A = scipy.sparse.csr_array(A, dtype=onp.float64)
+        num_dofs = A.shape[0]
+        B = onp.ones((num_dofs, 1)) if B is None else onp.asarray(B, dtype=onp.float64)
+        dof_to_node = onp.arange(num_dofs) if dof_to_node is None else onp.asarray(dof_to_node)
+        self.sweeps = sweeps
+        self.levels = []
+        while True:
+            level = smoother_data(A)
+            self.levels.append(level)
+            if A.shape[0] <= max_coarse or len(self.levels) == max_levels:
+                break
+            aggregates, num_aggregates = standard_aggregation(strength_graph(A, dof_to_node, theta))
+            if num_aggregates == 0:
+                break
+            T, B, dof_to_node = fit_candidates(aggregates[dof_to_node], B)
+            if T.shape[1] >= A.shape[0]:
+                break
+            level['T'] = T
+            A = smooth_prolongator(level)
+
+        self.coarse_inv = onp.linalg.pinv(self.levels[-1]['A'].toarray())
+
+    def update(self, A):
+        """Set up the hierarchy for new values of A (same size and near-nullspace), reusing the aggregates and 
+        tentative prolongators, so that only the smoothed prolongators, the coarse operators and the coarsest 
+        inverse are recomputed. With theta = 0, the aggregates only depend on the sparsity pattern, so the result 
+        equals a new setup as long as the pattern is unchanged. Returns self.
+        """
+        A = scipy.sparse.csr_array(A, dtype=onp.float64)
+        assert A.shape == self.levels[0]['A'].shape, f"AMG hierarchy of size {self.levels[0]['A'].shape}, got {A.shape}"
+        for level in self.levels:
+            level.update(smoother_data(A))
+            if 'T' in level:
+                A = smooth_prolongator(level)
+        self.coarse_inv = onp.linalg.pinv(self.levels[-1]['A'].toarray())
+        return self
+
+    def operator_complexity(self):
+        return sum(level['A'].nnz for level in self.levels)/self.levels[0]['A'].nnz
+
+    def __repr__(self):
+        sizes = [level['A'].shape[0] for level in self.levels]
+        return (f"SmoothedAggregationAMG(levels={len(self.levels)}, sizes={sizes}, "
+                f"operator_complexity={self.operator_complexity():.2f})")
+
+    def get_precond(self):
+        """V-cycle as a JAX function (num_dofs,) -> (num_dofs,), one application of the preconditioner.
+        It is symmetric (same pre- and post-smoothing, restriction = P^T), so it can be used with CG.
+        """
+        levels = [{'A': BCOO.from_scipy_sparse(level['A']), 'D_inv': np.array(level['D_inv']),
+                   'omega': level['omega']} for level in self.levels]
+        for level_jax, level in zip(levels, self.levels):
+            if 'P' in level:
+                level_jax['P'] = BCOO.from_scipy_sparse(level['P'])
+                level_jax['R'] = BCOO.from_scipy_sparse(scipy.sparse.csr_array(level['P'].T))
+        coarse_inv = np.array(self.coarse_inv)
+        sweeps = self.sweeps
+
+        def smooth(level, x, b):
+            for i in range(sweeps):
+                x = x + level['omega']*level['D_inv']*(b - level['A'] @ x)
+            return x
+
+        def v_cycle(i, b):
+            if i == len(levels) - 1:
+                return coarse_inv @ b
+            level = levels[i]
+            x = smooth(level, np.zeros_like(b), b)
+            x = x + level['P'] @ v_cycle(i + 1, level['R'] @ (b - level['A'] @ x))
+            return smooth(level, x, b)
+
+        return lambda b: v_cycle(0, b)
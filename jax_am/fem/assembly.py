@@ -0,0 +1,184 @@
+import numpy as onp
+import jax
+import jax.numpy as np
+from jax.experimental.sparse import BCOO
+import scipy
+
+
+class AssemblyPlan():
+    """Symbolic assembly of the global sparse matrix.
+
+    The sparsity pattern only depends on the mesh connectivity and the number of vector components,
+    so it is computed once. Each Newton step then only needs to fill the CSR data vector by scattering
+    the cell Jacobian entries into their precomputed slots - no coordinate arrays, no sorting.
+
+    The pattern is first built on the node graph (num_nodes^2 entries per cell) and then expanded
+    to the dof level, so the expensive unique/sort runs on an array vec^2 times smaller.
+
+    If symmetric is True, only the upper triangle (including the diagonal) is stored, both for the cell 
+    Jacobians and for the global matrix. A cell entry (p, q) with p <= q is accumulated into the global slot 
+    (min(I, J), max(I, J)), which is valid since the global matrix is symmetric.
+
+    Attributes
+    ----------
+    num_total_dofs : int
+    nnz : int
+        Number of nonzeros of the deduplicated global matrix.
+    indptr : onp.ndarray
+        (num_total_dofs + 1,)
+    indices : onp.ndarray
+        (nnz,) column indices, sorted within each row
+    cell_slots : onp.ndarray
+        (num_cells, (num_nodes*vec)^2), or (num_cells, cell_triu_size) if symmetric
+        cell_slots[c, k] is the position in the CSR data vector where entry k of the flattened
+        cell Jacobian (num_nodes, vec, num_nodes, vec) of cell c is accumulated.
+        If symmetric, entry k refers to the k-th entry of the upper triangle, ordered as cell_triu_inds.
+    cell_triu_inds : tuple
+        onp.triu_indices(num_nodes*vec)
+    diag_slots : onp.ndarray
+        (num_total_dofs,) positions of the diagonal entries in the CSR data vector
+    block_diag_slots : onp.ndarray
+        (num_total_nodes, vec, vec) positions of the entries of the node-diagonal blocks in the CSR data vector
+        (in symmetric mode, entries below the diagonal map to their transposed entry)
+    """
+    def __init__(self, cells, vec, num_total_nodes, symmetric=False):
+        cells = onp.asarray(cells, dtype=onp.int64)
+        num_cells, num_nodes = cells.shape
+        self.vec = vec
+        self.num_total_dofs = num_total_nodes*vec
+        self.symmetric = symmetric
+        self.cell_triu_inds = onp.triu_indices(num_nodes*vec)
+
+        # Node graph: unique (row_node, col_node) pairs in row-major order
+        keys = (cells[:, :, None]*num_total_nodes + cells[:, None, :]).reshape(-1)
+        node_keys, node_slots = onp.unique(keys, return_inverse=True)
+        node_rows = node_keys // num_total_nodes
+        node_cols = node_keys % num_total_nodes
+        node_row_nnz = onp.bincount(node_rows, minlength=num_total_nodes)
+        node_indptr = onp.hstack((0, onp.cumsum(node_row_nnz)))
+
+        self.nnz = len(node_keys)*vec**2
+        index_dtype = onp.int32 if self.nnz < onp.iinfo(onp.int32).max else onp.int64
+
+        # Dof row (vec*n + a) holds vec*node_row_nnz[n] entries
+        self.indptr = onp.hstack((0, onp.cumsum(onp.repeat(vec*node_row_nnz, vec)))).astype(index_dtype)
+
+        vec_inds = onp.arange(vec)
+        # (num_node_nnz, vec, vec) -> (nnz,)
+        slots = self._dof_slots(onp.arange(len(node_keys)), node_rows, node_indptr, node_row_nnz)
+        self.indices = onp.empty(self.nnz, dtype=index_dtype)
+        self.indices[slots.reshape(-1)] = (vec*node_cols[:, None, None] + vec_inds[None, None, :]).repeat(vec, axis=1).reshape(-1)
+
+        # (num_cells, num_nodes, num_nodes, vec, vec) -> (num_cells, num_nodes, vec, num_nodes, vec)
+        cell_slots = self._dof_slots(node_slots.reshape(num_cells, num_nodes, num_nodes), cells[:, :, None],
+                                     node_indptr, node_row_nnz)
+        self.cell_slots = onp.transpose(cell_slots, axes=(0, 1, 3, 2, 4)).reshape(num_cells, -1).astype(index_dtype)
+
+        rows = onp.repeat(onp.arange(self.num_total_dofs), onp.diff(self.indptr))
+        if symmetric:
+            upper = self.indices >= rows
+            # Position of the transposed entry (j, i) for each entry (i, j); CSR keys are already sorted
+            keys = rows*self.num_total_dofs + self.indices
+            transposed = onp.searchsorted(keys, self.indices.astype(onp.int64)*self.num_total_dofs + rows)
+            upper_pos = onp.cumsum(upper) - 1
+            cell_slots = self.cell_slots[:, self.cell_triu_inds[0]*num_nodes*vec + self.cell_triu_inds[1]]
+            cell_slots = onp.where(upper[cell_slots], cell_slots, transposed[cell_slots])
+            self.cell_slots = upper_pos[cell_slots].astype(index_dtype)
+            rows = rows[upper]
+            self.indices = self.indices[upper]
+            self.nnz = len(self.indices)
+            self.indptr = onp.hstack((0, onp.cumsum(onp.bincount(rows, minlength=self.num_total_dofs)))).astype(index_dtype)
+
+        self.diag_slots = onp.flatnonzero(self.indices == rows)
+
+        # CSR keys are sorted, so each entry of a node-diagonal block is found by a binary search
+        keys = rows.astype(onp.int64)*self.num_total_dofs + self.indices
+        node_dofs = onp.arange(self.num_total_dofs, dtype=onp.int64).reshape(num_total_nodes, vec)
+        block_rows, block_cols = node_dofs[:, :, None], node_dofs[:, None, :]
+        if symmetric:
+            block_rows, block_cols = onp.minimum(block_rows, block_cols), onp.maximum(block_rows, block_cols)
+        self.block_diag_slots = onp.searchsorted(keys, block_rows*self.num_total_dofs + block_cols).astype(index_dtype)
+        self._bcoo_indices = None
+        self._bcoo_indices_device = None
+
+    def _dof_slots(self, node_slot, row_node, node_indptr, node_row_nnz):
+        """Map a node-graph entry and a component pair (a, b) to its position in the dof-level CSR data.
+        Dof row (vec*n + a) starts at vec*vec*node_indptr[n] + a*vec*node_row_nnz[n], and within the row
+        the node entry k occupies columns vec*(k - node_indptr[n]) + b.
+
+        Returns
+        -------
+        slots : onp.ndarray
+            (*node_slot.shape, vec, vec)
+        """
+        vec = self.vec
+        vec_inds = onp.arange(vec)
+        base = vec*(node_slot + (vec - 1)*node_indptr[row_node])
+        stride = vec*node_row_nnz[row_node]
+        return base[..., None, None] + stride[..., None, None]*vec_inds[:, None] + vec_inds[None, :]
+
+    def assemble(self, cells_jac, cell_inds=None):
+        """Accumulate cell Jacobians into the CSR data vector.
+
+        Parameters
+        ----------
+        cells_jac : onp.ndarray
+            (num_selected_cells, num_nodes, vec, num_nodes, vec), or (num_selected_cells, cell_triu_size) if symmetric
+        cell_inds : onp.ndarray
+            (num_selected_cells,) Which cells the Jacobians belong to. Defaults to all cells.
+
+        Returns
+        -------
+        data : onp.ndarray
+            (nnz,)
+        """
+        slots = self.cell_slots if cell_inds is None else self.cell_slots[cell_inds]
+        cells_jac = onp.asarray(cells_jac).reshape(len(slots), -1)
+        return onp.bincount(slots.reshape(-1), weights=cells_jac.reshape(-1), minlength=self.nnz)
+
+    def to_scipy(self, data):
+        """The full matrix, also in symmetric mode.
+        """
+        A = scipy.sparse.csr_array((data, self.indices, self.indptr), shape=(self.num_total_dofs, self.num_total_dofs))
+        if self.symmetric:
+            A = (A + scipy.sparse.triu(A, k=1).T).tocsr()
+        return A
+
+    def diagonal(self, data):
+        return data[self.diag_slots]
+
+    def block_diagonal(self, data):
+        """Node-diagonal blocks of the matrix, (num_total_nodes, vec, vec)
+        """
+        return data[self.block_diag_slots]
+
+    def to_bcoo(self, data):
+        """The stored matrix (only the upper triangle in symmetric mode). 
+        Entries are unique and already sorted, so no sort_indices() is needed.
+        """
+        if self._bcoo_indices is None:
+            rows = onp.repeat(onp.arange(self.num_total_dofs, dtype=self.indices.dtype), onp.diff(self.indptr))
+            self._bcoo_indices = onp.stack((rows, self.indices), axis=1)
+        if isinstance(data, jax.core.Tracer):
+            # Under a transformation, the converted indices would be a tracer, which must not be stored
+            indices = np.array(self._bcoo_indices)
+        else:
+            if self._bcoo_indices_device is None:
+                self._bcoo_indices_device = np.array(self._bcoo_indices)
+            indices = self._bcoo_indices_device
+        return BCOO((np.array(data), indices), shape=(self.num_total_dofs, self.num_total_dofs),
+                    indices_sorted=True, unique_indices=True)
+
+    def get_matvec(self, data):
+        """Product with the full matrix. In symmetric mode, A x = U x + U^T x - diag(U) x.
+        """
+        A_sp = self.to_bcoo(data)
+        if self.symmetric:
+            A_sp_T = A_sp.T
+            diag = np.array(self.diagonal(data))
+            def matvec(x):
+                return A_sp @ x + A_sp_T @ x - diag*x
+        else:
+            def matvec(x):
+                return A_sp @ x
+        return matvec
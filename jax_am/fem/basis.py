@@ -181,3 +181,45 @@ def get_face_shape_vals_and_grads(ele_type):
     face_shape_grads_ref = onp.transpose(face_shape_grads_ref, axes=(1, 2, 3, 0))
     print(f"face_quad_points.shape = {face_quad_points.shape}")
     return face_shape_vals, face_shape_grads_ref, face_weights, face_normals, face_inds
+
+
+def get_tensor_product_basis(ele_type):
+    """1D factors of the tensor-product (Lagrange) hexahedral elements, used for sum factorization.
+    A 3D shape function is N_n(x, y, z) = N1_i(x) N1_j(y) N1_k(z), and the quadrature is the tensor product
+    of the 1D quadrature. Tensor indices are flattened lexicographically, t = i*p^2 + j*p + k.
+
+    Returns
+    -------
+    shape_vals_1d : ndarray
+        (num_quads_1d, num_nodes_1d)
+    shape_grads_1d : ndarray
+        (num_quads_1d, num_nodes_1d)
+    node_tensor_inds : ndarray
+        (num_nodes,) Flattened tensor index of each node, in the (re-ordered) node ordering
+    quad_tensor_inds : ndarray
+        (num_quads,) Flattened tensor index of each quadrature point, in the ordering of get_shape_vals_and_grads
+    """
+    element_family, basix_ele, basix_face_ele, gauss_order, degree, re_order = get_elements(ele_type)
+    if ele_type not in ['HEX8', 'HEX27']:
+        raise NotImplementedError(f"Sum factorization is only available for HEX8 and HEX27, got {ele_type}")
+
+    quad_points_1d, _ = basix.make_quadrature(basix.CellType.interval, gauss_order)
+    element_1d = basix.create_element(basix.ElementFamily.P, basix.CellType.interval, degree)
+    vals_and_grads_1d = element_1d.tabulate(1, quad_points_1d)
+    shape_vals_1d = vals_and_grads_1d[0, :, :, 0]
+    shape_grads_1d = vals_and_grads_1d[1, :, :, 0]
+
+    def tensor_inds(points, points_1d):
+        # (num_points, dim, num_points_1d) -> (num_points, dim)
+        inds = onp.argmin(onp.abs(points[:, :, None] - points_1d.reshape(-1)[None, None, :]), axis=-1)
+        assert onp.allclose(points_1d.reshape(-1)[inds], points), f"{ele_type} is not a tensor-product element"
+        n = len(points_1d)
+        return inds[:, 0]*n**2 + inds[:, 1]*n + inds[:, 2]
+
+    element = basix.create_element(element_family, basix_ele, degree)
+    node_tensor_inds = tensor_inds(element.points[re_order], element_1d.points)
+    quad_points, _ = basix.make_quadrature(basix_ele, gauss_order)
+    quad_tensor_inds = tensor_inds(quad_points, quad_points_1d)
+    assert len(onp.unique(node_tensor_inds)) == len(node_tensor_inds) == len(element_1d.points)**3
+    assert len(onp.unique(quad_tensor_inds)) == len(quad_tensor_inds) == len(quad_points_1d)**3
+    return shape_vals_1d, shape_grads_1d, node_tensor_inds, quad_tensor_inds
@@ -0,0 +1,387 @@
+"""FEM performance benchmarks with scaling sweeps.
+
+For each problem (Poisson, linear elasticity, hyper-elasticity, plasticity), element type and mesh size,
+the following phases are timed on a structured box mesh:
+    precompute      construction of the FEM object (shape functions, geometry, B.C., assembly plan)
+    residual        one residual evaluation
+    jacobian        one Newton update (cell kernels and cell Jacobians) plus global matrix assembly
+    linear_solve    Krylov solves of one full solve, taken from the solve report
+    solve           a full (Newton) solve
+Residual, Jacobian and solve are reported "cold" (first call, including compilation) and warm (best of repeats).
+
+Results are written to JSON together with machine metadata and compared against a stored baseline.
+Usage:
+    python -m jax_am.fem.benchmark --output results.json
+    python -m jax_am.fem.benchmark --problems poisson --ele_types HEX8 --sizes 4 8 16
+    python -m jax_am.fem.benchmark --output baseline_cpu.json --baseline ''  # refresh a baseline
+    python -m jax_am.fem.benchmark --renumbering --sizes 16 32  # effect of renumber_mesh on gather/scatter/SpMV
+"""
+import numpy as onp
+import jax
+import jax.numpy as np
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from jax_am.fem.assembly import AssemblyPlan
+from jax_am.fem.generate_mesh import structured_box_mesh, scrambled_box_mesh, renumber_mesh
+from jax_am.fem.models import LinearPoisson, LinearElasticity, HyperElasticity, Plasticity
+from jax_am.fem.report import block_until_ready
+from jax_am.fem.solver import solver, get_A_fn
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'benchmark_data', 'baseline_cpu.json')
+DEFAULT_PROBLEMS = ['poisson', 'linear_elasticity', 'hyperelasticity', 'plasticity']
+DEFAULT_SIZES = {'HEX8': [4, 8, 12], 'TET4': [4, 8, 12], 'HEX27': [2, 3, 4]}
+# Warm metrics that are compared against the baseline
+TIME_METRICS = ['precompute', 'residual', 'jacobian', 'linear_solve', 'solve']
+
+
+def get_problem(problem_name, mesh, ele_type, **fem_kwargs):
+    """Box [0, 1]^3, clamped at x = 0 and loaded at x = 1. fem_kwargs are passed on to FEM (e.g., shard_cells=True).
+
+    Returns
+    -------
+    problem : FEM
+    linear : bool
+        Whether the solver can take the linear shortcut
+    """
+    def left(point):
+        return np.isclose(point[0], 0., atol=1e-5)
+
+    def right(point):
+        return np.isclose(point[0], 1., atol=1e-5)
+
+    def zero_dirichlet_val(point):
+        return 0.
+
+    def get_dirichlet_val(disp):
+        def val_fn(point):
+            return disp
+        return val_fn
+
+    if problem_name == 'poisson':
+        dirichlet_bc_info = [[left, right], [0, 0], [zero_dirichlet_val, get_dirichlet_val(1.)]]
+        problem = LinearPoisson(mesh, vec=1, dim=3, ele_type=ele_type, dirichlet_bc_info=dirichlet_bc_info,
+                                source_info=lambda x: np.array([10.]), **fem_kwargs)
+        return problem, True
+
+    problem_classes = {'linear_elasticity': LinearElasticity, 'hyperelasticity': HyperElasticity, 'plasticity': Plasticity}
+    # Loads large enough for geometric nonlinearity (hyper-elasticity) and yielding (plasticity)
+    disps = {'linear_elasticity': 0.01, 'hyperelasticity': 0.1, 'plasticity': 0.01}
+    if problem_name not in problem_classes:
+        raise ValueError(f"Unknown benchmark problem {problem_name}")
+    dirichlet_bc_info = [[left, left, left, right, right, right],
+                         [0, 1, 2, 0, 1, 2],
+                         [zero_dirichlet_val, zero_dirichlet_val, zero_dirichlet_val,
+                          get_dirichlet_val(disps[problem_name]), zero_dirichlet_val, zero_dirichlet_val]]
+    problem = problem_classes[problem_name](mesh, vec=3, dim=3, ele_type=ele_type, dirichlet_bc_info=dirichlet_bc_info,
+                                            **fem_kwargs)
+    return problem, problem_name == 'linear_elasticity'
+
+
+def time_call(fn, repeats):
+    """Returns the wall time of the first call (including compilation), the best of the following repeats,
+    and the outputs of the last call.
+    """
+    times = []
+    for i in range(repeats + 1):
+        start = time.perf_counter()
+        outputs = block_until_ready(fn())
+        times.append(time.perf_counter() - start)
+    return times[0], min(times[1:]), outputs
+
+
+def run_case(problem_name, ele_type, N, repeats=3, **fem_kwargs):
+    """Benchmark one problem on an N x N x N box mesh.
+
+    Returns
+    -------
+    record : dict
+    """
+    mesh = structured_box_mesh(N, N, N, ele_type=ele_type)
+    start = time.perf_counter()
+    problem, linear = get_problem(problem_name, mesh, ele_type, **fem_kwargs)
+    precompute_time = time.perf_counter() - start
+
+    sol = np.zeros((problem.num_total_nodes, problem.vec))
+    residual_cold, residual, _ = time_call(lambda: problem.compute_residual(sol), repeats)
+
+    def jacobian_fn():
+        problem.newton_update(sol)
+        return get_A_fn(problem)
+    jacobian_cold, jacobian, _ = time_call(jacobian_fn, repeats)
+
+    solve_cold, solve, (sol, report) = time_call(lambda: solver(problem, linear=linear, return_report=True), repeats)
+
+    return {'problem': problem_name,
+            'ele_type': ele_type,
+            'N': N,
+            'num_cells': int(problem.num_cells),
+            'num_dofs': int(problem.num_total_dofs),
+            'nnz': int(report.nnz),
+            'newton_iterations': max(len(report.newton_res_history) - 1, 0),
+            'krylov_iterations': [s['iterations'] for s in report.linear_solves],
+            'converged': report.converged,
+            'metrics': {'precompute': precompute_time,
+                        'residual_cold': residual_cold,
+                        'residual': residual,
+                        'jacobian_cold': jacobian_cold,
+                        'jacobian': jacobian,
+                        'linear_solve': report.phase_times.get('linear_solve', 0.),
+                        'solve_cold': solve_cold,
+                        'solve': solve}}
+
+
+def run_renumbering_case(N, ele_type='HEX8', vec=3, repeats=10):
+    """Time the memory-bound mesh operations for a scrambled mesh and for its renumbered versions:
+        gather          sol[cells]
+        scatter         segment_sum of cell residuals to nodes
+        assemble        AssemblyPlan.assemble of the cell Jacobians (host)
+        spmv_scipy      scipy CSR product
+        spmv_jax        BCOO product of the assembly plan (jitted)
+
+    Returns
+    -------
+    records : List[dict]
+        One per ordering, with the matrix bandwidth and the times [s]
+    """
+    scrambled = scrambled_box_mesh(N, ele_type)
+    orderings = {'scrambled': scrambled, 
+                 'rcm+morton': renumber_mesh(scrambled, 'rcm', 'morton'),
+                 'morton+morton': renumber_mesh(scrambled, 'morton', 'morton')}
+    rng = onp.random.default_rng(1)
+    num_total_nodes = len(scrambled.points)
+    sol = np.array(rng.random((num_total_nodes, vec)))
+    x = rng.random(num_total_nodes*vec)
+
+    def best_time(fn, *args):
+        block_until_ready(fn(*args))
+        times = []
+        for i in range(repeats):
+            start = time.perf_counter()
+            block_until_ready(fn(*args))
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    gather = jax.jit(lambda sol, cells: sol[cells])
+    scatter = jax.jit(lambda vals, cells: jax.ops.segment_sum(vals.reshape(-1, vec), cells.reshape(-1), 
+                                                              num_segments=num_total_nodes))
+    records = []
+    for ordering, mesh in orderings.items():
+        cells = onp.asarray(mesh.cells)
+        plan = AssemblyPlan(cells, vec, num_total_nodes)
+        cells_jac = rng.random(plan.cell_slots.shape)
+        data = plan.assemble(cells_jac)
+        A = plan.to_scipy(data)
+        matvec = jax.jit(plan.get_matvec(data))
+        rows = onp.repeat(onp.arange(plan.num_total_dofs), onp.diff(plan.indptr))
+        cells_vals = np.array(rng.random((len(cells), cells.shape[1], vec)))
+        records.append({'ordering': ordering,
+                        'ele_type': ele_type,
+                        'N': N,
+                        'num_dofs': int(plan.num_total_dofs),
+                        'bandwidth': int(onp.max(onp.abs(plan.indices.astype(onp.int64) - rows))),
+                        'metrics': {'gather': best_time(gather, sol, np.array(cells)),
+                                    'scatter': best_time(scatter, cells_vals, np.array(cells)),
+                                    'assemble': best_time(plan.assemble, cells_jac),
+                                    'spmv_scipy': best_time(A.dot, x),
+                                    'spmv_jax': best_time(matvec, np.array(x))}})
+    return records
+
+
+def print_renumbering(records):
+    metrics = list(records[0]['metrics'].keys())
+    print(f"\n{'case':<28}{'bandwidth':>10}" + ''.join(f"{m:>12}" for m in metrics))
+    baseline = {}
+    for r in records:
+        key = (r['ele_type'], r['N'])
+        baseline.setdefault(key, r)
+        case = f"{r['ele_type']}/N={r['N']}/{r['ordering']}"
+        print(f"{case:<28}{r['bandwidth']:>10}" + ''.join(f"{r['metrics'][m]:>12.5f}" for m in metrics))
+        print(f"{'  speedup':<28}{'':>10}" + ''.join(f"{baseline[key]['metrics'][m]/r['metrics'][m]:>12.2f}" 
+                                                    for m in metrics))
+
+
+def machine_metadata():
+    """Information needed to decide whether two benchmark runs are comparable.
+    """
+    import scipy
+    devices = jax.devices()
+    try:
+        git_commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+                                    capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        git_commit = None
+    return {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'hostname': platform.node(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'jax': jax.__version__,
+            'jaxlib': jax.lib.__version__,
+            'numpy': onp.__version__,
+            'scipy': scipy.__version__,
+            'backend': jax.default_backend(),
+            'devices': [d.device_kind for d in devices],
+            'x64': bool(jax.config.jax_enable_x64),
+            'git_commit': git_commit}
+
+
+def run_benchmarks(problems=None, ele_types=None, sizes=None, repeats=3, **fem_kwargs):
+    """Sweep problems x element types x mesh sizes.
+
+    Parameters
+    ----------
+    problems : List[str]
+        Defaults to DEFAULT_PROBLEMS
+    ele_types : List[str]
+        Defaults to the keys of DEFAULT_SIZES
+    sizes : List[int]
+        Number of hexahedra per axis. Defaults to DEFAULT_SIZES[ele_type]
+    repeats : int
+        Number of warm repeats of each timed call
+    fem_kwargs :
+        Options passed on to every FEM object, recorded in the metadata
+
+    Returns
+    -------
+    results : dict
+        {'metadata': dict, 'results': List[dict]}
+    """
+    problems = DEFAULT_PROBLEMS if problems is None else problems
+    ele_types = list(DEFAULT_SIZES.keys()) if ele_types is None else ele_types
+    records = []
+    for problem_name in problems:
+        for ele_type in ele_types:
+            for N in (DEFAULT_SIZES[ele_type] if sizes is None else sizes):
+                print(f"\nBenchmark {problem_name}, {ele_type}, N = {N}")
+                records.append(run_case(problem_name, ele_type, N, repeats, **fem_kwargs))
+    # Collected after the runs, so that FEM has enabled x64
+    metadata = machine_metadata()
+    metadata['fem_options'] = fem_kwargs
+    return {'metadata': metadata, 'results': records}
+
+
+def save_results(results, path):
+    dir_name = os.path.dirname(path)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def case_key(record):
+    return (record['problem'], record['ele_type'], record['N'])
+
+
+def print_scaling(results):
+    """Print warm times against the number of dofs, with the fitted exponent p of time ~ num_dofs^p.
+    """
+    groups = {}
+    for record in results['results']:
+        groups.setdefault((record['problem'], record['ele_type']), []).append(record)
+    for (problem_name, ele_type), records in groups.items():
+        records = sorted(records, key=lambda r: r['num_dofs'])
+        print(f"\n{problem_name}, {ele_type}")
+        print(f"{'num_dofs':>10}" + ''.join(f"{m:>14}" for m in TIME_METRICS))
+        for r in records:
+            print(f"{r['num_dofs']:>10}" + ''.join(f"{r['metrics'][m]:>14.4f}" for m in TIME_METRICS))
+        if len(records) > 1:
+            dofs = onp.log([r['num_dofs'] for r in records])
+            exponents = [onp.polyfit(dofs, onp.log([max(r['metrics'][m], 1e-9) for r in records]), 1)[0]
+                         for m in TIME_METRICS]
+            print(f"{'exponent':>10}" + ''.join(f"{p:>14.2f}" for p in exponents))
+
+
+def compare_to_baseline(results, baseline, rtol=0.25, min_time=1e-2):
+    """Compare warm times of the cases present in both runs.
+
+    Parameters
+    ----------
+    rtol : float
+        A metric regresses if it is slower than (1 + rtol) times the baseline
+    min_time : float
+        Metrics below this time [s] in both runs are too noisy and are not flagged
+
+    Returns
+    -------
+    regressions : List[dict]
+    """
+    for key in ['processor', 'cpu_count', 'backend', 'jax', 'devices', 'fem_options']:
+        if results['metadata'].get(key) != baseline['metadata'].get(key):
+            print(f"Warning: {key} differs from the baseline "
+                  f"({results['metadata'].get(key)} vs. {baseline['metadata'].get(key)}), timings may not be comparable")
+
+    baseline_records = {case_key(r): r for r in baseline['results']}
+    regressions = []
+    print(f"\n{'case':<36}{'metric':>14}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for record in results['results']:
+        old = baseline_records.get(case_key(record))
+        if old is None:
+            continue
+        for metric in TIME_METRICS:
+            old_time, new_time = old['metrics'][metric], record['metrics'][metric]
+            ratio = new_time/old_time if old_time > 0. else onp.inf
+            regressed = ratio > 1. + rtol and max(old_time, new_time) > min_time
+            case = f"{record['problem']}/{record['ele_type']}/N={record['N']}"
+            print(f"{case:<36}{metric:>14}{old_time:>12.4f}{new_time:>12.4f}{ratio:>8.2f}" +
+                  ("  REGRESSION" if regressed else ""))
+            if regressed:
+                regressions.append({'case': case, 'metric': metric, 'baseline': old_time, 'current': new_time,
+                                    'ratio': ratio})
+        if record['newton_iterations'] != old['newton_iterations']:
+            print(f"Warning: {case_key(record)} took {record['newton_iterations']} Newton iterations, "
+                  f"baseline took {old['newton_iterations']}")
+    print(f"\n{len(regressions)} regression(s) with rtol = {rtol}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JAX-FEM performance benchmarks")
+    parser.add_argument('--problems', nargs='+', default=None, choices=DEFAULT_PROBLEMS)
+    parser.add_argument('--ele_types', nargs='+', default=None, choices=list(DEFAULT_SIZES.keys()))
+    parser.add_argument('--sizes', nargs='+', type=int, default=None, help="hexahedra per axis")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="empty string to skip the comparison")
+    parser.add_argument('--rtol', type=float, default=0.25)
+    parser.add_argument('--shard_cells', action='store_true', 
+                        help="shard cells over all devices, e.g., with XLA_FLAGS=--xla_force_host_platform_device_count=N")
+    parser.add_argument('--renumbering', action='store_true', 
+                        help="benchmark gather/scatter/assembly/SpMV for scrambled and renumbered meshes instead")
+    args = parser.parse_args(argv)
+
+    if args.renumbering:
+        records = []
+        for N in ([16, 32] if args.sizes is None else args.sizes):
+            records += run_renumbering_case(N)
+        save_results({'metadata': machine_metadata(), 'results': records}, args.output)
+        print_renumbering(records)
+        return 0
+
+    fem_kwargs = {'shard_cells': True} if args.shard_cells else {}
+    results = run_benchmarks(args.problems, args.ele_types, args.sizes, args.repeats, **fem_kwargs)
+    save_results(results, args.output)
+    print(f"\nSaved benchmark results to {args.output}")
+    print_scaling(results)
+
+    if args.baseline and os.path.isfile(args.baseline):
+        regressions = compare_to_baseline(results, load_results(args.baseline), args.rtol)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,20 +2,24 @@ import numpy as onp
 import jax
 import jax.numpy as np
 from jax.experimental.sparse import BCOO
+from jax.experimental.shard_map import shard_map
+from jax.sharding import Mesh as DeviceMesh, NamedSharding, PartitionSpec
 import scipy
-import sys
+from scipy.spatial import cKDTree
 import time
+import logging
 import functools
+import warnings
 from dataclasses import dataclass
 from typing import Any, Callable, Optional, List, Union
 
+from jax_am import enable_x64
 from jax_am.fem.generate_mesh import Mesh
-from jax_am.fem.basis import get_face_shape_vals_and_grads, get_shape_vals_and_grads
+from jax_am.fem.basis import get_face_shape_vals_and_grads, get_shape_vals_and_grads, get_tensor_product_basis
+from jax_am.fem.assembly import AssemblyPlan
 
-from jax.config import config
-config.update("jax_enable_x64", True)
 
-onp.set_printoptions(threshold=sys.maxsize, linewidth=1000, suppress=True, precision=5)
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -74,6 +78,35 @@ class FEM:
         A function that inputs a point and returns the body force at this point
     additional_info : Any
         Other information that the FEM solver should know
+    cell_batch_memory : int
+        Approximate memory budget (in bytes) for one batch of cell kernel evaluations.
+        Larger budgets mean fewer, larger batches.
+    symmetric : bool
+        Opt-in for problems with a symmetric Jacobian (e.g., Poisson, linear elasticity, hyper-elasticity).
+        Only the upper triangle of cell Jacobians and of the global matrix is stored, 
+        and the solver uses CG with a symmetric elimination of Dirichlet B.C.
+    sum_factorization : bool
+        Opt-in for HEX8 and HEX27 elements. The Laplace kernel interpolates u_grads and contracts with the
+        test function gradients through the 1D factors of the shape functions, and only stores per quadrature point 
+        inverse Jacobians instead of v_grads_JxW (neither is shape_grads stored, use get_u_grads in post-processing). 
+        This cuts the cost per cell by an order of magnitude for HEX27.
+    on_the_fly_geometry : bool
+        Opt-in to not store shape_grads and v_grads_JxW (nor inverse Jacobians with sum factorization). 
+        Jacobians are recomputed from the cell coordinates inside the cell kernels, trading FLOPs for memory.
+        Use get_u_grads instead of self.shape_grads in post-processing.
+    precision : str
+        'float64' (default) or 'mixed'. With 'mixed', the constitutive kernels are linearized in float32, so that cell 
+        Jacobians, Jacobian-vector products and the global matrix are float32 (half the memory), 
+        while residuals are still evaluated and accumulated in float64. Krylov iterations then run in float32.
+    iterative_refinement : int
+        Only used with precision='mixed'. Number of iterative refinement sweeps after each float32 linear solve, 
+        with the linear residual computed in float64 through matrix-free float64 Jacobian-vector products.
+    shard_cells : bool
+        Opt-in to split the cells over all devices (jax.devices()) with shard_map when computing residuals and 
+        Jacobians. On CPU, set XLA_FLAGS=--xla_force_host_platform_device_count=<num_cores> before importing jax
+        to get one device per core. Each device scatters its cell residuals to nodes and its cell Jacobians into 
+        the CSR data vector of the assembly plan, and the partial results are summed across devices, 
+        so only (num_total_nodes, vec) and (nnz,) arrays are gathered.
     """
     mesh: Mesh
     vec: int
@@ -85,6 +118,13 @@ class FEM:
     cauchy_bc_info: Optional[List[Union[List[Callable], List[Callable]]]] = None
     source_info: Callable = None
     additional_info: Any = ()
+    cell_batch_memory: int = 2**30
+    symmetric: bool = False
+    sum_factorization: bool = False
+    on_the_fly_geometry: bool = False
+    precision: str = 'float64'
+    iterative_refinement: int = 0
+    shard_cells: bool = False
 
     def __post_init__(self):
         self.points = self.mesh.points
@@ -92,9 +132,18 @@ class FEM:
         self.num_cells = len(self.cells)
         self.num_total_nodes = len(self.mesh.points)
         self.num_total_dofs = self.num_total_nodes*self.vec
+        assert self.precision in ['float64', 'mixed'], f"Unknown precision {self.precision}"
+        if not jax.config.jax_enable_x64:
+            # Both precision policies accumulate residuals in float64. The flag is process-global and arrays created 
+            # before the switch stay float32, so scripts should opt in explicitly; enabled here only as a fallback.
+            warnings.warn(f"FEM requires 64-bit floats and is enabling jax_enable_x64 for the whole process, call "
+                          f"jax_am.enable_x64() at the top of the script, before creating any JAX arrays", RuntimeWarning)
+            enable_x64()
+        # dtype of linearizations: cell Jacobians, Jacobian-vector products and the global matrix
+        self.jacobian_dtype = np.float32 if self.precision == 'mixed' else np.float64
 
         start = time.time()
-        print(f"Start timing - Compute shape function values, gradients, etc.")
+        logger.info(f"Start timing - Compute shape function values, gradients, etc.")
 
         self.shape_vals, self.shape_grads_ref, self.quad_weights = get_shape_vals_and_grads(self.ele_type)
         self.face_shape_vals, self.face_shape_grads_ref, self.face_quad_weights, self.face_normals, self.face_inds \
@@ -102,21 +151,42 @@ class FEM:
         self.num_quads = self.shape_vals.shape[0]
         self.num_nodes = self.shape_vals.shape[1]
         self.num_faces = self.face_shape_vals.shape[0]
-        self.shape_grads, self.JxW = self.get_shape_grads()
+        if self.on_the_fly_geometry or self.sum_factorization:
+            # The kernels do not use shape_grads, so only JxW is stored
+            self.JxW = onp.linalg.det(self.get_jacobians()) * self.quad_weights[None, :]
+        else:
+            self.shape_grads, self.JxW = self.get_shape_grads()
+
+        # Jitted cell/face kernels, reused across Newton iterations, load steps and solves
+        self.clear_kernel_cache()
 
         self.node_inds_list, self.vec_inds_list, self.vals_list = self.Dirichlet_boundary_conditions(self.dirichlet_bc_info)
+        self.bc_dof_inds, self.bc_vals = self.fuse_Dirichlet_boundary_conditions()
         self.p_node_inds_list_A, self.p_node_inds_list_B, self.p_vec_inds_list = self.periodic_boundary_conditions()
+        self.Cauchy_boundary_conditions()
 
         self.neumann = self.compute_Neumann_integral()
         self.body_force = self.compute_body_force_by_fn()
 
-        # (num_cells, num_quads, num_nodes, 1, dim)
-        self.v_grads_JxW = self.shape_grads[:, :, :, None, :] * self.JxW[:, :, None, None, None]
+        if self.sum_factorization:
+            self.shape_vals_1d, self.shape_grads_1d, self.node_tensor_inds, self.quad_tensor_inds = \
+            get_tensor_product_basis(self.ele_type)
+        # With on_the_fly_geometry, geometric cell data are recomputed inside the kernels, see get_cell_geometry
+        if self.sum_factorization and not self.on_the_fly_geometry:
+            self.inv_jacobians = self.get_inv_jacobians()
+            self.inv_jacobians_JxW = self.inv_jacobians * self.JxW[:, :, None, None]
+        elif not self.on_the_fly_geometry:
+            # (num_cells, num_quads, num_nodes, 1, dim)
+            self.v_grads_JxW = self.shape_grads[:, :, :, None, :] * self.JxW[:, :, None, None, None]
+
+        # Sparsity pattern of the global matrix, computed once and reused by every Newton step
+        self.assembly_plan = AssemblyPlan(self.cells, self.vec, self.num_total_nodes, self.symmetric)
 
         end = time.time()
         compute_time = end - start
-        print(f"Done pre-computations, took {compute_time} [s]")
-        print(f"Solving a problem with {len(self.cells)} cells, {self.num_total_nodes}x{self.vec} = {self.num_total_dofs} dofs.")
+        self.setup_time = compute_time
+        logger.info(f"Done pre-computations, took {compute_time} [s]")
+        logger.info(f"Solving a problem with {len(self.cells)} cells, {self.num_total_nodes}x{self.vec} = {self.num_total_dofs} dofs.")
 
         self.custom_init(*self.additional_info)
 
@@ -150,6 +220,149 @@ class FEM:
         JxW = jacobian_det * self.quad_weights[None, :]
         return shape_grads_physical, JxW
 
+    def get_jacobians(self):
+        """Jacobians of the reference-to-physical map at the quadrature points
+
+        Returns
+        -------
+        jacobian_dx_deta : onp.ndarray
+            (num_cells, num_quads, dim, dim)
+        """
+        physical_coos = onp.take(self.points, self.cells, axis=0) # (num_cells, num_nodes, dim)
+        # (num_cells, num_quads, num_nodes, dim, dim) -> (num_cells, num_quads, dim, dim)
+        return onp.sum(physical_coos[:, None, :, :, None] * self.shape_grads_ref[None, :, :, None, :], axis=2)
+
+    def get_inv_jacobians(self):
+        """Inverse Jacobians of the reference-to-physical map at the quadrature points
+
+        Returns
+        -------
+        jacobian_deta_dx : onp.ndarray
+            (num_cells, num_quads, dim, dim)
+        """
+        return onp.linalg.inv(self.get_jacobians())
+
+    def get_cell_shape_grads_on_the_fly(self, cell_coos, cell_JxW):
+        """Per-cell counterpart of get_shape_grads (or get_inv_jacobians with sum factorization), 
+        evaluated inside the cell kernels when on_the_fly_geometry is set.
+
+        Parameters
+        ----------
+        cell_coos : ndarray
+            (num_nodes, dim)
+        cell_JxW : ndarray
+            (num_quads,)
+
+        Returns
+        -------
+        cell_shape_grads : ndarray
+            (num_quads, num_nodes, dim), or (num_quads, dim, dim) with sum factorization
+        cell_v_grads_JxW : ndarray
+            (num_quads, num_nodes, 1, dim), or (num_quads, dim, dim) with sum factorization
+        """
+        # (num_nodes, dim) * (num_quads, num_nodes, dim) -> (num_quads, dim, dim)
+        jacobian_dx_deta = np.einsum('ni,qnj->qij', cell_coos, self.shape_grads_ref)
+        jacobian_deta_dx = np.linalg.inv(jacobian_dx_deta)
+        if self.sum_factorization:
+            return jacobian_deta_dx, jacobian_deta_dx * cell_JxW[:, None, None]
+        # (num_quads, num_nodes, dim) @ (num_quads, dim, dim) -> (num_quads, num_nodes, dim)
+        cell_shape_grads = np.einsum('qne,qed->qnd', self.shape_grads_ref, jacobian_deta_dx)
+        return cell_shape_grads, cell_shape_grads[:, :, None, :] * cell_JxW[:, None, None, None]
+
+    def get_u_grads(self, sol):
+        """Solution gradients at the quadrature points of all cells
+
+        Parameters
+        ----------
+        sol : ndarray
+            (num_total_nodes, vec)
+
+        Returns
+        -------
+        u_grads : ndarray
+            (num_cells, num_quads, vec, dim)
+        """
+        cells_sol = np.take(sol, self.cells, axis=0) # (num_cells, num_nodes, vec)
+        if self.sum_factorization and not self.on_the_fly_geometry:
+            # (num_cells, num_nodes, vec) * (num_quads, num_nodes, dim) * (num_cells, num_quads, dim, dim) 
+            # -> (num_cells, num_quads, vec, dim)
+            return np.einsum('cnv,qne,cqed->cqvd', cells_sol, self.shape_grads_ref, self.inv_jacobians)
+        if self.on_the_fly_geometry:
+            def cell_u_grads(cell_sol, cell_coos):
+                jacobian_deta_dx = np.linalg.inv(np.einsum('ni,qnj->qij', cell_coos, self.shape_grads_ref))
+                # (num_nodes, vec) * (num_quads, num_nodes, dim) * (num_quads, dim, dim) -> (num_quads, vec, dim)
+                return np.einsum('nv,qne,qed->qvd', cell_sol, self.shape_grads_ref, jacobian_deta_dx)
+            return jax.vmap(cell_u_grads)(cells_sol, onp.take(self.points, self.cells, axis=0))
+        # (num_cells, 1, num_nodes, vec, 1) * (num_cells, num_quads, num_nodes, 1, dim) -> (num_cells, num_quads, num_nodes, vec, dim)
+        u_grads = cells_sol[:, None, :, :, None] * self.shape_grads[:, :, :, None, :] 
+        return np.sum(u_grads, axis=2) # (num_cells, num_quads, vec, dim)
+
+    def get_cell_geometry(self):
+        """Geometric cell data passed to the cell kernels as (cell_shape_grads, cell_JxW, cell_v_grads_JxW).
+        With sum factorization, shape gradients are formed on the fly from the 1D factors, so 
+        inverse Jacobians take the place of shape_grads, and inverse Jacobians times JxW that of v_grads_JxW.
+        With on_the_fly_geometry, only the cell coordinates are passed, see get_cell_shape_grads_on_the_fly.
+
+        Returns
+        -------
+        shape_grads : onp.ndarray
+            (num_cells, num_quads, num_nodes, dim), or (num_cells, num_quads, dim, dim) with sum factorization,
+            or cell coordinates (num_cells, num_nodes, dim) with on_the_fly_geometry
+        JxW : onp.ndarray
+            (num_cells, num_quads)
+        v_grads_JxW : onp.ndarray
+            (num_cells, num_quads, num_nodes, 1, dim), or (num_cells, num_quads, dim, dim) with sum factorization,
+            or None with on_the_fly_geometry
+        """
+        if self.on_the_fly_geometry:
+            return onp.take(self.points, self.cells, axis=0), self.JxW, None
+        if self.sum_factorization:
+            return self.inv_jacobians, self.JxW, self.inv_jacobians_JxW
+        return self.shape_grads, self.JxW, self.v_grads_JxW
+
+    def get_face_jacobians(self, boundary_inds):
+        """Jacobians dx/deta at the face quadrature points. Faces are grouped by their local face index, 
+        so that the reference face data are not replicated per selected face.
+
+        Parameters
+        ----------
+        boundary_inds : onp.ndarray
+            (num_selected_faces, 2)
+
+        Returns
+        -------
+        jacobian_dx_deta : onp.ndarray
+            (num_selected_faces, num_face_quads, dim, dim)
+        """
+        selected_coos = onp.take(self.points, self.cells[boundary_inds[:, 0]], axis=0) # (num_selected_faces, num_nodes, dim)
+        num_face_quads = self.face_shape_grads_ref.shape[1]
+        jacobian_dx_deta = onp.zeros((len(boundary_inds), num_face_quads, self.dim, self.dim))
+        for face in onp.unique(boundary_inds[:, 1]):
+            mask = boundary_inds[:, 1] == face
+            # (num_face_quads, num_nodes, dim), (num_masked_faces, num_nodes, dim) -> (num_masked_faces, num_face_quads, dim, dim)
+            jacobian_dx_deta[mask] = onp.einsum('qnj,fni->fqij', self.face_shape_grads_ref[face], selected_coos[mask])
+        return jacobian_dx_deta
+
+    def get_face_nanson_scale(self, boundary_inds, jacobian_dx_deta=None):
+        """Surface JxW of the selected faces, by Nanson's formula, see get_face_shape_grads
+
+        Returns
+        -------
+        nanson_scale : onp.ndarray
+            (num_selected_faces, num_face_quads)
+        """
+        if jacobian_dx_deta is None:
+            jacobian_dx_deta = self.get_face_jacobians(boundary_inds)
+        jacobian_det = onp.linalg.det(jacobian_dx_deta) # (num_selected_faces, num_face_quads)
+        jacobian_deta_dx = onp.linalg.inv(jacobian_dx_deta) # (num_selected_faces, num_face_quads, dim, dim)
+        selected_f_normals = self.face_normals[boundary_inds[:, 1]] # (num_selected_faces, dim)
+        # (num_selected_faces, 1, 1, dim) @ (num_selected_faces, num_face_quads, dim, dim)
+        # (num_selected_faces, num_face_quads, 1, dim) -> (num_selected_faces, num_face_quads)
+        nanson_scale = onp.linalg.norm((selected_f_normals[:, None, None, :] @ jacobian_deta_dx)[:, :, 0, :], axis=-1)
+        selected_weights = self.face_quad_weights[boundary_inds[:, 1]] # (num_selected_faces, num_face_quads)
+        nanson_scale = nanson_scale * jacobian_det * selected_weights
+        return nanson_scale
+
     def get_face_shape_grads(self, boundary_inds):
         """Face shape function gradients and JxW (for surface integral)
         Nanson's formula is used to map physical surface ingetral to reference domain
@@ -167,26 +380,14 @@ class FEM:
         nanson_scale : onp.ndarray
             (num_selected_faces, num_face_quads)
         """
-        physical_coos = onp.take(self.points, self.cells, axis=0) # (num_cells, num_nodes, dim)
-        selected_coos = physical_coos[boundary_inds[:, 0]] # (num_selected_faces, num_nodes, dim)
-        selected_f_shape_grads_ref = self.face_shape_grads_ref[boundary_inds[:, 1]] # (num_selected_faces, num_face_quads, num_nodes, dim)
-        selected_f_normals = self.face_normals[boundary_inds[:, 1]] # (num_selected_faces, dim)
-
-        # (num_selected_faces, 1, num_nodes, dim, 1) * (num_selected_faces, num_face_quads, num_nodes, 1, dim)
-        # (num_selected_faces, num_face_quads, num_nodes, dim, dim) -> (num_selected_faces, num_face_quads, dim, dim)
-        jacobian_dx_deta = onp.sum(selected_coos[:, None, :, :, None] * selected_f_shape_grads_ref[:, :, :, None, :], axis=2)
-        jacobian_det = onp.linalg.det(jacobian_dx_deta) # (num_selected_faces, num_face_quads)
+        jacobian_dx_deta = self.get_face_jacobians(boundary_inds) # (num_selected_faces, num_face_quads, dim, dim)
         jacobian_deta_dx = onp.linalg.inv(jacobian_dx_deta) # (num_selected_faces, num_face_quads, dim, dim)
+        selected_f_shape_grads_ref = self.face_shape_grads_ref[boundary_inds[:, 1]] # (num_selected_faces, num_face_quads, num_nodes, dim)
 
-        # (1, num_face_quads, num_nodes, 1, dim) @ (num_selected_faces, num_face_quads, 1, dim, dim)
-        # (num_selected_faces, num_face_quads, num_nodes, 1, dim) -> (num_selected_faces, num_face_quads, num_nodes, dim)
-        face_shape_grads_physical = (selected_f_shape_grads_ref[:, :, :, None, :] @ jacobian_deta_dx[:, :, None, :, :])[:, :, :, 0, :]
-
-        # (num_selected_faces, 1, 1, dim) @ (num_selected_faces, num_face_quads, dim, dim)
-        # (num_selected_faces, num_face_quads, 1, dim) -> (num_selected_faces, num_face_quads)
-        nanson_scale = onp.linalg.norm((selected_f_normals[:, None, None, :] @ jacobian_deta_dx)[:, :, 0, :], axis=-1)
-        selected_weights = self.face_quad_weights[boundary_inds[:, 1]] # (num_selected_faces, num_face_quads)
-        nanson_scale = nanson_scale * jacobian_det * selected_weights
+        # (num_selected_faces, num_face_quads, num_nodes, dim) @ (num_selected_faces, num_face_quads, dim, dim)
+        # -> (num_selected_faces, num_face_quads, num_nodes, dim)
+        face_shape_grads_physical = onp.einsum('fqnj,fqji->fqni', selected_f_shape_grads_ref, jacobian_deta_dx)
+        nanson_scale = self.get_face_nanson_scale(boundary_inds, jacobian_dx_deta)
         return face_shape_grads_physical, nanson_scale
 
     def get_physical_quad_points(self):
@@ -197,9 +398,9 @@ class FEM:
         physical_quad_points : onp.ndarray
             (num_cells, num_quads, dim) 
         """
-        physical_coos = onp.take(self.points, self.cells, axis=0)
-        # (1, num_quads, num_nodes, 1) * (num_cells, 1, num_nodes, dim) -> (num_cells, num_quads, dim) 
-        physical_quad_points = onp.sum(self.shape_vals[None, :, :, None] * physical_coos[:, None, :, :], axis=2)
+        physical_coos = onp.take(self.points, self.cells, axis=0) # (num_cells, num_nodes, dim)
+        # (num_quads, num_nodes), (num_cells, num_nodes, dim) -> (num_cells, num_quads, dim) 
+        physical_quad_points = onp.einsum('qn,cnd->cqd', self.shape_vals, physical_coos)
         return physical_quad_points
 
     def get_physical_surface_quad_points(self, boundary_inds):
@@ -215,11 +416,13 @@ class FEM:
         physical_surface_quad_points : ndarray
             (num_selected_faces, num_face_quads, dim) 
         """
-        physical_coos = onp.take(self.points, self.cells, axis=0)
-        selected_coos = physical_coos[boundary_inds[:, 0]] # (num_selected_faces, num_nodes, dim)
-        selected_face_shape_vals = self.face_shape_vals[boundary_inds[:, 1]] # (num_selected_faces, num_face_quads, num_nodes)  
-        # (num_selected_faces, num_face_quads, num_nodes, 1) * (num_selected_faces, 1, num_nodes, dim) -> (num_selected_faces, num_face_quads, dim) 
-        physical_surface_quad_points = onp.sum(selected_face_shape_vals[:, :, :, None] * selected_coos[:, None, :, :], axis=2)
+        selected_coos = onp.take(self.points, self.cells[boundary_inds[:, 0]], axis=0) # (num_selected_faces, num_nodes, dim)
+        num_face_quads = self.face_shape_vals.shape[1]
+        physical_surface_quad_points = onp.zeros((len(boundary_inds), num_face_quads, selected_coos.shape[-1]))
+        for face in onp.unique(boundary_inds[:, 1]):
+            mask = boundary_inds[:, 1] == face
+            # (num_face_quads, num_nodes), (num_masked_faces, num_nodes, dim) -> (num_masked_faces, num_face_quads, dim) 
+            physical_surface_quad_points[mask] = onp.einsum('qn,fnd->fqd', self.face_shape_vals[face], selected_coos[mask])
         return physical_surface_quad_points
 
     def Dirichlet_boundary_conditions(self, dirichlet_bc_info):
@@ -262,6 +465,29 @@ class FEM:
         dirichlet_bc_info : [location_fns, vecs, value_fns]
         """
         self.node_inds_list, self.vec_inds_list, self.vals_list = self.Dirichlet_boundary_conditions(dirichlet_bc_info)
+        self.bc_dof_inds, self.bc_vals = self.fuse_Dirichlet_boundary_conditions()
+
+    def fuse_Dirichlet_boundary_conditions(self):
+        """Merge all Dirichlet B.C. groups into one flat dof index array, so that B.C. can be imposed 
+        with a single gather/scatter. A dof constrained by several groups takes the value of the last group, 
+        consistent with applying the groups one after another.
+
+        Returns
+        -------
+        bc_dof_inds : onp.ndarray
+            (num_bc_dofs,) Sorted and unique, ranges from 0 to num_total_dofs - 1
+        bc_vals : onp.ndarray
+            (num_bc_dofs,)
+        """
+        if len(self.node_inds_list) == 0:
+            return onp.zeros(0, dtype=onp.int32), onp.zeros(0)
+        dof_inds = onp.hstack([self.vec*node_inds + vec_inds for node_inds, vec_inds in 
+                               zip(self.node_inds_list, self.vec_inds_list)])
+        vals = onp.hstack([onp.asarray(vals) for vals in self.vals_list])
+        # onp.unique returns the first occurrence, so search the reversed arrays to keep the last one
+        bc_dof_inds, inds = onp.unique(dof_inds[::-1], return_index=True)
+        bc_vals = vals[::-1][inds]
+        return bc_dof_inds.astype(onp.int32), bc_vals
 
     def periodic_boundary_conditions(self):
         p_node_inds_list_A = []
@@ -272,27 +498,74 @@ class FEM:
             for i in range(len(location_fns_A)):
                 node_inds_A = onp.argwhere(jax.vmap(location_fns_A[i])(self.mesh.points)).reshape(-1)
                 node_inds_B = onp.argwhere(jax.vmap(location_fns_B[i])(self.mesh.points)).reshape(-1)
-                points_set_A = self.mesh.points[node_inds_A]
-                points_set_B = self.mesh.points[node_inds_B]
-
-                EPS = 1e-5
-                node_inds_B_ordered = []
-                for node_ind in node_inds_A:
-                    point_A = self.mesh.points[node_ind]
-                    dist = onp.linalg.norm(mappings[i](point_A)[None, :] - points_set_B, axis=-1)
-                    node_ind_B_ordered = node_inds_B[onp.argwhere(dist < EPS)].reshape(-1)
-                    node_inds_B_ordered.append(node_ind_B_ordered)
-
-                node_inds_B_ordered = onp.array(node_inds_B_ordered).reshape(-1)
+                node_inds_B_ordered = self.pair_periodic_nodes(node_inds_A, node_inds_B, mappings[i])
                 vec_inds = onp.ones_like(node_inds_A, dtype=onp.int32)*vecs[i]
 
                 p_node_inds_list_A.append(node_inds_A)
                 p_node_inds_list_B.append(node_inds_B_ordered)
                 p_vec_inds_list.append(vec_inds)
-                assert len(node_inds_A) == len(node_inds_B_ordered)
 
         return p_node_inds_list_A, p_node_inds_list_B, p_vec_inds_list
 
+    def pair_periodic_nodes(self, node_inds_A, node_inds_B, mapping, EPS=1e-5):
+        """Find for each node on boundary A the node on boundary B at the mapped location, 
+        using a KD-tree over the points of boundary B.
+
+        Parameters
+        ----------
+        node_inds_A : onp.ndarray
+            (num_periodic_nodes,)
+        node_inds_B : onp.ndarray
+            (num_nodes_B,)
+        mapping : Callable
+            Maps a point on boundary A to its periodic image on boundary B
+        EPS : float
+            Matching tolerance
+
+        Returns
+        -------
+        node_inds_B_ordered : onp.ndarray
+            (num_periodic_nodes,) node_inds_B_ordered[j] is paired with node_inds_A[j]
+        """
+        if len(node_inds_A) == 0:
+            return node_inds_A
+        if len(node_inds_B) == 0:
+            raise ValueError(f"Periodic B.C.: boundary B has no nodes, but boundary A has {len(node_inds_A)}")
+        mapped_points_A = onp.asarray(jax.vmap(mapping)(self.mesh.points[node_inds_A])).reshape(len(node_inds_A), -1)
+        tree = cKDTree(self.mesh.points[node_inds_B])
+        # Query two neighbours, so that several nodes of B within EPS can be detected
+        dist, inds = tree.query(mapped_points_A, k=min(2, len(node_inds_B)), distance_upper_bound=EPS)
+        dist, inds = dist.reshape(len(node_inds_A), -1), inds.reshape(len(node_inds_A), -1)
+
+        unmatched = onp.isinf(dist[:, 0])
+        if onp.any(unmatched):
+            point_A = self.mesh.points[node_inds_A[unmatched][0]]
+            raise ValueError(f"Periodic B.C.: {onp.sum(unmatched)} nodes on boundary A have no node on boundary B "
+                             f"within {EPS} of their mapped location, e.g., node {node_inds_A[unmatched][0]} at {point_A}")
+        if dist.shape[1] > 1 and onp.any(onp.isfinite(dist[:, 1])):
+            ambiguous = node_inds_A[onp.isfinite(dist[:, 1])]
+            raise ValueError(f"Periodic B.C.: {len(ambiguous)} nodes on boundary A match several nodes on boundary B "
+                             f"within {EPS}, e.g., node {ambiguous[0]} at {self.mesh.points[ambiguous[0]]}")
+        node_inds_B_ordered = node_inds_B[inds[:, 0]]
+        if len(onp.unique(node_inds_B_ordered)) != len(node_inds_B_ordered):
+            raise ValueError(f"Periodic B.C.: several nodes on boundary A are mapped to the same node on boundary B")
+        return node_inds_B_ordered
+
+    def Cauchy_boundary_conditions(self):
+        """Precompute the face data of all Cauchy boundaries, concatenated boundary by boundary.
+        Faces of boundary i are self.cauchy_cell_inds[splits[i]:splits[i + 1]], where splits = self.cauchy_face_splits.
+        """
+        if self.cauchy_bc_info is None:
+            return
+        location_fns, self.cauchy_value_fns = self.cauchy_bc_info
+        assert len(location_fns) == len(self.cauchy_value_fns) and len(location_fns) > 0
+        boundary_inds = self.get_boundary_conditions_inds(location_fns)
+        self.cauchy_face_splits = onp.cumsum([0] + [len(inds) for inds in boundary_inds]).tolist()
+        boundary_inds = onp.vstack(boundary_inds) # (num_selected_faces, 2)
+        self.cauchy_cell_inds = boundary_inds[:, 0] # (num_selected_faces,)
+        self.cauchy_face_shape_vals = self.face_shape_vals[boundary_inds[:, 1]] # (num_selected_faces, num_face_quads, num_nodes)
+        _, self.cauchy_nanson_scale = self.get_face_shape_grads(boundary_inds) # (num_selected_faces, num_face_quads)
+
     def get_boundary_conditions_inds(self, location_fns):
         """Given location functions, compute which faces satisfy the condition. 
         
@@ -322,6 +595,155 @@ class FEM:
             boundary_inds_list.append(boundary_inds)
         return boundary_inds_list
 
+    def integrate_over_cells(self, quad_vals):
+        """(quad_vals, v) * dx, contracted with the reference shape values by one cached jitted kernel.
+
+        Parameters
+        ----------
+        quad_vals : np.DeviceArray
+            (num_cells, num_quads, vec)
+
+        Returns
+        -------
+        integral : np.DeviceArray
+            (num_total_nodes, vec)
+        """
+        def make_fn():
+            def fn(quad_vals, JxW, cells, shape_vals):
+                # (num_quads, num_nodes), (num_cells, num_quads, vec), (num_cells, num_quads) -> (num_cells, num_nodes, vec)
+                cell_vals = np.einsum('qn,cqv,cq->cnv', shape_vals, quad_vals, JxW)
+                return jax.ops.segment_sum(cell_vals.reshape(-1, self.vec), cells.reshape(-1), num_segments=self.num_total_nodes)
+            return fn
+
+        args = (quad_vals, self.JxW, self.cells, self.shape_vals)
+        return self.get_cached_kernel('cell_integral', make_fn, args)(*args)
+
+    def interpolate_to_quads(self, sol):
+        """Values of the solution at the quadrature points
+
+        Returns
+        -------
+        u : np.DeviceArray
+            (num_cells, num_quads, vec)
+        """
+        def make_fn():
+            def fn(sol, cells, shape_vals):
+                # (num_quads, num_nodes), (num_cells, num_nodes, vec) -> (num_cells, num_quads, vec)
+                return np.einsum('qn,cnv->cqv', shape_vals, sol[cells])
+            return fn
+
+        args = (sol, self.cells, self.shape_vals)
+        return self.get_cached_kernel('cell_interpolation', make_fn, args)(*args)
+
+    def pad_faces(self, boundary_inds):
+        """Sort the selected faces into groups by local face index, and pad each group to the next power of two, 
+        so that boundaries changing between steps (e.g., in the thermal model) seldom change the shapes seen by 
+        the jitted face kernels. The kernels contract each group with the reference data of its own local face only.
+        Padded faces point to node num_total_nodes, which is dropped by segment_sum.
+
+        Returns
+        -------
+        face_cells : onp.ndarray
+            (num_padded_faces, num_nodes)
+        positions : onp.ndarray
+            (num_selected_faces,) position of each selected face among the padded faces
+        group_sizes : tuple
+            (num_faces,) padded number of faces of each local face
+        """
+        face_inds = boundary_inds[:, 1]
+        counts = onp.bincount(face_inds, minlength=self.num_faces)
+        group_sizes = tuple(1 << int(c - 1).bit_length() if c > 0 else 0 for c in counts)
+        if len(face_inds) == 0:
+            # A single padded face, so that the kernels see no empty arrays
+            group_sizes = (1,) + group_sizes[1:]
+        group_starts = onp.cumsum((0,) + group_sizes)[:-1]
+        # Rank of each selected face within its group, in the order of boundary_inds
+        order = onp.argsort(face_inds, kind='stable')
+        ranks = onp.empty(len(face_inds), dtype=onp.int64)
+        ranks[order] = onp.arange(len(face_inds)) - onp.repeat(onp.cumsum(counts) - counts, counts)
+        positions = group_starts[face_inds] + ranks
+        face_cells = onp.full((sum(group_sizes), self.num_nodes), self.num_total_nodes, dtype=onp.int32)
+        face_cells[positions] = self.cells[boundary_inds[:, 0]]
+        return face_cells, positions, group_sizes
+
+    def map_face_groups(self, fn, face_shape_vals, group_sizes, *face_data):
+        """Concatenate fn(face_shape_vals[face], *group_data) over the groups of padded faces, see pad_faces
+        """
+        outputs, start = [], 0
+        for face, size in enumerate(group_sizes):
+            if size > 0:
+                outputs.append(fn(face_shape_vals[face], *[x[start:start + size] for x in face_data]))
+                start += size
+        return np.concatenate(outputs, axis=0)
+
+    def integrate_over_faces(self, quad_vals, nanson_scale, boundary_inds):
+        """(quad_vals, v) * ds over the selected faces. Each local face is contracted with its own reference 
+        face shape values, so no (num_selected_faces, num_face_quads, num_nodes) data are gathered.
+
+        Parameters
+        ----------
+        quad_vals : np.DeviceArray
+            (num_selected_faces, num_face_quads, vec)
+        nanson_scale : onp.ndarray
+            (num_selected_faces, num_face_quads)
+        boundary_inds : onp.ndarray
+            (num_selected_faces, 2)
+
+        Returns
+        -------
+        integral : np.DeviceArray
+            (num_total_nodes, vec)
+        """
+        face_cells, positions, group_sizes = self.pad_faces(boundary_inds)
+        quad_vals = np.zeros((len(face_cells),) + quad_vals.shape[1:], dtype=quad_vals.dtype).at[positions].set(
+                    quad_vals*nanson_scale[:, :, None])
+
+        def make_fn():
+            def fn(quad_vals, face_cells, face_shape_vals):
+                # (num_face_quads, num_nodes), (group_size, num_face_quads, vec) -> (group_size, num_nodes, vec)
+                contract = lambda shape_vals, quad_vals: np.einsum('qn,fqv->fnv', shape_vals, quad_vals)
+                face_vals = self.map_face_groups(contract, face_shape_vals, group_sizes, quad_vals)
+                return jax.ops.segment_sum(face_vals.reshape(-1, self.vec), face_cells.reshape(-1), 
+                                           num_segments=self.num_total_nodes)
+            return fn
+
+        args = (quad_vals, face_cells, self.face_shape_vals)
+        return self.get_cached_kernel(('face_integral', group_sizes), make_fn, args)(*args)
+
+    def interpolate_to_face_quads(self, sol, boundary_inds):
+        """Values of the solution at the quadrature points of the selected faces
+
+        Returns
+        -------
+        u : np.DeviceArray
+            (num_selected_faces, num_face_quads, vec)
+        """
+        face_cells, positions, group_sizes = self.pad_faces(boundary_inds)
+
+        def make_fn():
+            def fn(sol, face_cells, face_shape_vals):
+                # Padded faces read node num_total_nodes, which is clamped by the gather and dropped below
+                cells_sol = sol[face_cells] # (num_padded_faces, num_nodes, vec)
+                # (num_face_quads, num_nodes), (group_size, num_nodes, vec) -> (group_size, num_face_quads, vec)
+                interpolate = lambda shape_vals, cells_sol: np.einsum('qn,fnv->fqv', shape_vals, cells_sol)
+                return self.map_face_groups(interpolate, face_shape_vals, group_sizes, cells_sol)
+            return fn
+
+        args = (sol, face_cells, self.face_shape_vals)
+        return self.get_cached_kernel(('face_interpolation', group_sizes), make_fn, args)(*args)[positions]
+
+    def get_neumann_face_data(self, i, boundary_inds):
+        """Physical quadrature points and Nanson scale of the faces of Neumann boundary i.
+        Reused as long as the faces do not change, so that loads updated every step only cost a face kernel.
+        """
+        if not hasattr(self, 'neumann_face_data'):
+            self.neumann_face_data = {}
+        cached = self.neumann_face_data.get(i)
+        if cached is None or not onp.array_equal(cached[0], boundary_inds):
+            self.neumann_face_data[i] = (onp.array(boundary_inds), self.get_physical_surface_quad_points(boundary_inds),
+                                         self.get_face_nanson_scale(boundary_inds))
+        return self.neumann_face_data[i][1:]
+
     def compute_Neumann_integral_vars(self, *internal_vars):
         """In the weak form, we have the Neumann integral: (traction, v) * ds, and this function computes this.
 
@@ -332,21 +754,13 @@ class FEM:
         """
         integral = np.zeros((self.num_total_nodes, self.vec))
         if self.neumann_bc_info is not None:
-            integral = np.zeros((self.num_total_nodes, self.vec))
             for i, boundary_inds in enumerate(self.neumann_boundary_inds_list):
-                # (num_cells, num_faces, num_face_quads, dim) -> (num_selected_faces, num_face_quads, dim)
-                subset_quad_points = self.get_physical_surface_quad_points(boundary_inds)
+                # (num_selected_faces, num_face_quads, dim), (num_selected_faces, num_face_quads)
+                subset_quad_points, nanson_scale = self.get_neumann_face_data(i, boundary_inds)
                 int_vars = [x[i] for x in internal_vars]
                 traction = jax.vmap(jax.vmap(self.neumann_value_fns[i]))(subset_quad_points, *int_vars) # (num_selected_faces, num_face_quads, vec)
                 assert len(traction.shape) == 3
-                _, nanson_scale = self.get_face_shape_grads(boundary_inds) # (num_selected_faces, num_face_quads)
-                # (num_faces, num_face_quads, num_nodes) ->  (num_selected_faces, num_face_quads, num_nodes)
-                v_vals = np.take(self.face_shape_vals, boundary_inds[:, 1], axis=0)
-                v_vals = np.repeat(v_vals[:, :, :, None], self.vec, axis=-1) # (num_selected_faces, num_face_quads, num_nodes, vec)
-                subset_cells = np.take(self.cells, boundary_inds[:, 0], axis=0) # (num_selected_faces, num_nodes)
-                # (num_selected_faces, num_nodes, vec) -> (num_selected_faces*num_nodes, vec)
-                int_vals = np.sum(v_vals * traction[:, :, None, :] * nanson_scale[:, :, None, None], axis=1).reshape(-1, self.vec) 
-                integral = integral.at[subset_cells.reshape(-1)].add(int_vals)   
+                integral = integral + self.integrate_over_faces(traction, nanson_scale, boundary_inds)
         return integral
 
     def compute_Neumann_integral(self):
@@ -374,11 +788,7 @@ class FEM:
             physical_quad_points = self.get_physical_quad_points() # (num_cells, num_quads, dim) 
             body_force = jax.vmap(jax.vmap(body_force_fn))(physical_quad_points) # (num_cells, num_quads, vec) 
             assert len(body_force.shape) == 3
-            v_vals = np.repeat(self.shape_vals[None, :, :, None], self.num_cells, axis=0) # (num_cells, num_quads, num_nodes, 1)
-            v_vals = np.repeat(v_vals, self.vec, axis=-1) # (num_cells, num_quads, num_nodes, vec)
-            # (num_cells, num_nodes, vec) -> (num_cells*num_nodes, vec)
-            rhs_vals = np.sum(v_vals * body_force[:, :, None, :] * self.JxW[:, :, None, None], axis=1).reshape(-1, self.vec) 
-            rhs = rhs.at[self.cells.reshape(-1)].add(rhs_vals) 
+            rhs = self.integrate_over_cells(body_force)
         return rhs
 
     def compute_body_force_by_sol(self, sol, mass_map):
@@ -396,15 +806,14 @@ class FEM:
         body_force : np.DeviceArray
             (num_total_nodes, vec)
         """
-        mass_kernel = self.get_mass_kernel(mass_map)
-        cells_sol = sol[self.cells] # (num_cells, num_nodes, vec)
-        val = jax.vmap(mass_kernel)(cells_sol, self.JxW) # (num_cells, num_nodes, vec)
-        val = val.reshape(-1, self.vec) # (num_cells*num_nodes, vec)
-        body_force = np.zeros_like(sol)
-        body_force = body_force.at[self.cells.reshape(-1)].add(val) 
-        return body_force 
+        u = self.interpolate_to_quads(sol) # (num_cells, num_quads, vec)
+        u_physics = jax.vmap(jax.vmap(mass_map))(u) # (num_cells, num_quads, vec)
+        return self.integrate_over_cells(u_physics)
 
     def get_laplace_kernel(self, tensor_map):
+        if self.sum_factorization:
+            return self.get_laplace_kernel_sum_factorization(tensor_map)
+
         def laplace_kernel(cell_sol, cell_shape_grads, cell_v_grads_JxW, *cell_internal_vars):
             # (1, num_nodes, vec, 1) * (num_quads, num_nodes, 1, dim) -> (num_quads, num_nodes, vec, dim)
             u_grads = cell_sol[None, :, :, None] * cell_shape_grads[:, :, None, :] 
@@ -417,6 +826,44 @@ class FEM:
             return val
         return laplace_kernel
 
+    def get_laplace_kernel_sum_factorization(self, tensor_map):
+        """Same as get_laplace_kernel, but with the reference gradients evaluated by sum factorization:
+        the 3D contraction over (num_quads, num_nodes) is replaced by three 1D contractions per direction, 
+        i.e., O(p^3 q + p^2 q^2 + p q^3) instead of O(p^3 q^3) with p nodes and q quadrature points per direction.
+        """
+        vals_1d, grads_1d = np.array(self.shape_vals_1d), np.array(self.shape_grads_1d)
+        num_nodes_1d, num_quads_1d = vals_1d.shape[1], vals_1d.shape[0]
+        tensor_to_node = onp.argsort(self.node_tensor_inds)
+        tensor_to_quad = onp.argsort(self.quad_tensor_inds)
+        factors = [[grads_1d, vals_1d, vals_1d], [vals_1d, grads_1d, vals_1d], [vals_1d, vals_1d, grads_1d]]
+
+        def interpolate(u, a, b, c):
+            # (p, p, p, vec) -> (q, q, q, vec)
+            u = np.einsum('ai,ijkv->ajkv', a, u)
+            u = np.einsum('bj,ajkv->abkv', b, u)
+            return np.einsum('ck,abkv->abcv', c, u)
+
+        def integrate(u, a, b, c):
+            # (q, q, q, vec) -> (p, p, p, vec)
+            u = np.einsum('ai,abcv->ibcv', a, u)
+            u = np.einsum('bj,ibcv->ijcv', b, u)
+            return np.einsum('ck,ijcv->ijkv', c, u)
+
+        def laplace_kernel(cell_sol, cell_inv_jacobians, cell_inv_jacobians_JxW, *cell_internal_vars):
+            # (num_nodes, vec) -> (p, p, p, vec)
+            u = cell_sol[tensor_to_node].reshape(num_nodes_1d, num_nodes_1d, num_nodes_1d, self.vec)
+            # (q, q, q, vec, dim) -> (num_quads, vec, dim)
+            u_grads_ref = np.stack([interpolate(u, *f) for f in factors], axis=-1)
+            u_grads_ref = u_grads_ref.reshape(-1, self.vec, self.dim)[self.quad_tensor_inds]
+            u_grads = np.einsum('qve,qed->qvd', u_grads_ref, cell_inv_jacobians) # (num_quads, vec, dim)
+            u_physics = jax.vmap(tensor_map)(u_grads, *cell_internal_vars).reshape(u_grads.shape)
+            v_physics = np.einsum('qvd,qed->qve', u_physics, cell_inv_jacobians_JxW) # (num_quads, vec, dim)
+            v_physics = v_physics[tensor_to_quad].reshape(num_quads_1d, num_quads_1d, num_quads_1d, self.vec, self.dim)
+            # (p, p, p, vec) -> (num_nodes, vec)
+            val = sum(integrate(v_physics[..., i], *f) for i, f in enumerate(factors))
+            return val.reshape(-1, self.vec)[self.node_tensor_inds]
+        return laplace_kernel
+
     def get_mass_kernel(self, mass_map):
         def mass_kernel(cell_sol, cell_JxW, *cell_internal_vars):
             # (1, num_nodes, vec) * (num_quads, num_nodes, 1) -> (num_quads, num_nodes, vec) -> (num_quads, vec)
@@ -450,7 +897,41 @@ class FEM:
 
         return [mass_internal_vars, laplace_internal_vars]        
 
-    def split_and_compute_cell(self, cells_sol, np_version, jac_flag, **internal_vars):
+    def get_cached_kernel(self, name, make_fn, args):
+        """Return a jitted kernel from self.kernel_cache, creating it with make_fn() on a miss.
+
+        The cache key consists of the kernel name, the tensor/mass maps defining the weak form, and the
+        shapes and dtypes of args. A hit means no retracing and no recompilation.
+        Note that attributes of self read inside get_tensor_map/get_mass_map are baked in when the kernel 
+        is first traced; quantities that change between solves should be passed as internal variables,
+        or self.clear_kernel_cache() should be called.
+        """
+        def map_key(map_name):
+            map_fn = getattr(self, map_name, None)
+            return getattr(map_fn, '__func__', map_fn)
+
+        leaves, treedef = jax.tree_util.tree_flatten(args)
+        signature = tuple((np.shape(x), np.result_type(x)) for x in leaves)
+        key = (name, map_key('get_tensor_map'), map_key('get_mass_map'), treedef, signature)
+        if key in self.kernel_cache:
+            self.kernel_cache_hits += 1
+        else:
+            self.kernel_cache_misses += 1
+            self.kernel_cache[key] = jax.jit(make_fn())
+        return self.kernel_cache[key]
+
+    def clear_kernel_cache(self):
+        self.kernel_cache = {}
+        self.kernel_cache_hits = 0
+        self.kernel_cache_misses = 0
+
+    def kernel_cache_info(self):
+        """Hit/miss counters of the kernel cache. 
+        In steady state (e.g., later Newton iterations or load steps), only hits should be added.
+        """
+        return {'hits': self.kernel_cache_hits, 'misses': self.kernel_cache_misses, 'size': len(self.kernel_cache)}
+
+    def get_kernel_fn_cell(self):
         def value_and_jacrev(f, x):
             y, pullback = jax.vjp(f, x)
             basis = np.eye(len(y.reshape(-1)), dtype=y.dtype).reshape(-1, *y.shape)
@@ -463,72 +944,249 @@ class FEM:
             y, jac = jax.vmap(pushfwd, out_axes=(None, -1))((basis,))
             return y, jac.reshape(self.num_nodes, self.vec, self.num_nodes, self.vec)
 
-        def get_kernel_fn_cell():
-            def kernel(cell_sol, cell_shape_grads, cell_JxW, cell_v_grads_JxW, cell_mass_internal_vars, cell_laplace_internal_vars):
-                if hasattr(self, 'get_mass_map'):
-                    mass_kernel = self.get_mass_kernel(self.get_mass_map())
-                    mass_val = mass_kernel(cell_sol, cell_JxW, *cell_mass_internal_vars)
-                else:
-                    mass_val = 0.
-
-                if hasattr(self, 'get_tensor_map'):
-                    laplace_kernel = self.get_laplace_kernel(self.get_tensor_map())
-                    laplace_val = laplace_kernel(cell_sol, cell_shape_grads, cell_v_grads_JxW, *cell_laplace_internal_vars)
-                else:
-                    laplace_val = 0.
-                
-                return laplace_val + mass_val
+        def kernel(cell_sol, cell_shape_grads, cell_JxW, cell_v_grads_JxW, cell_mass_internal_vars, cell_laplace_internal_vars):
+            if hasattr(self, 'get_mass_map'):
+                mass_kernel = self.get_mass_kernel(self.get_mass_map())
+                mass_val = mass_kernel(cell_sol, cell_JxW, *cell_mass_internal_vars)
+            else:
+                mass_val = 0.
+
+            if hasattr(self, 'get_tensor_map'):
+                if self.on_the_fly_geometry:
+                    cell_shape_grads, cell_v_grads_JxW = self.get_cell_shape_grads_on_the_fly(cell_shape_grads, cell_JxW)
+                laplace_kernel = self.get_laplace_kernel(self.get_tensor_map())
+                laplace_val = laplace_kernel(cell_sol, cell_shape_grads, cell_v_grads_JxW, *cell_laplace_internal_vars)
+            else:
+                laplace_val = 0.
+            
+            return laplace_val + mass_val
+
+        def kernel_jac(cell_sol, *args):
+            if self.precision == 'mixed':
+                # float64 residual, float32 Jacobian
+                cell_sol_32, args_32 = self.to_jacobian_dtype((cell_sol, args))
+                _, jac = value_and_jacfwd(lambda cell_sol: kernel(cell_sol, *args_32), cell_sol_32)
+                return kernel(cell_sol, *args), jac
+            kernel_partial = lambda cell_sol: kernel(cell_sol, *args)
+            return value_and_jacfwd(kernel_partial, cell_sol) # kernel(cell_sol, *args), jax.jacfwd(kernel)(cell_sol, *args)
+
+        return kernel, kernel_jac
+
+    def to_jacobian_dtype(self, inputs):
+        """Cast the floating point arrays of a pytree to self.jacobian_dtype
+        """
+        def cast(x):
+            return x.astype(self.jacobian_dtype) if np.issubdtype(x.dtype, np.floating) else x
+        return jax.tree_util.tree_map(cast, inputs)
+
+    def get_cell_batch_size(self, fn, input_collection):
+        """Number of cells per batch such that one batch fits in self.cell_batch_memory.
+        The per-cell footprint is estimated from the per-cell input and output sizes (via jax.eval_shape), 
+        with a safety factor for kernel intermediates.
+        """
+        def nbytes(x):
+            return x.size*x.dtype.itemsize
+
+        num_cells = len(jax.tree_util.tree_leaves(input_collection)[0])
+        cell_in = jax.tree_util.tree_map(lambda x: jax.ShapeDtypeStruct(x.shape[1:], x.dtype), input_collection)
+        cell_out = jax.eval_shape(fn, *cell_in)
+        bytes_per_cell = sum(nbytes(x) for x in jax.tree_util.tree_leaves((cell_in, cell_out)))
+        intermediate_factor = 4
+        batch_size = int(self.cell_batch_memory // (intermediate_factor*bytes_per_cell))
+        return max(1, min(batch_size, num_cells))
+
+    def map_cell_batches(self, fn, input_collection):
+        """vmap fn over the leading (cell) axis of input_collection, batch by batch inside a lax.map. 
+        All batches have the same shape: instead of padding the inputs, the last batch is shifted back to end 
+        at the last cell (overlapping the previous batch), so that no input, e.g., the cell geometry, is copied.
+        """
+        num_cells = len(jax.tree_util.tree_leaves(input_collection)[0])
+        batch_size = self.get_cell_batch_size(fn, input_collection)
+        num_batches = -(-num_cells // batch_size)
+        overlap = num_batches*batch_size - num_cells
+
+        def batch_fn(i):
+            start = np.minimum(i*batch_size, num_cells - batch_size)
+            inputs = jax.tree_map(lambda x: jax.lax.dynamic_slice_in_dim(x, start, batch_size), input_collection)
+            return jax.vmap(fn)(*inputs)
+
+        def unbatch(x):
+            # The first overlap cells of the last batch were already computed by the previous one
+            return np.concatenate((x[:-1].reshape(-1, *x.shape[2:]), x[-1, overlap:]), axis=0)
+
+        outputs = jax.lax.map(batch_fn, np.arange(num_batches))
+        return jax.tree_map(unbatch, outputs)
+
+    def compute_cell_batches(self, name, fn, cell_inputs, np_version, **internal_vars):
+        """Evaluate a cell kernel fn(*cell_inputs, cell_shape_grads, cell_JxW, cell_v_grads_JxW, *cell_internal_vars) 
+        over all cells, batch by batch to limit memory usage.
+
+        All batches have the same shape (see map_cell_batches), and the batch loop runs inside a single 
+        jitted lax.map, so exactly one device program is dispatched.
+        The jitted program is cached under name, see get_cached_kernel.
+        """
+        kernal_vars = self.unpack_kernels_vars(**internal_vars)
+        input_collection = [*cell_inputs, *self.get_cell_geometry(), *kernal_vars]
 
-            def kernel_jac(cell_sol, *args):
-                kernel_partial = lambda cell_sol: kernel(cell_sol, *args)
-                return value_and_jacfwd(kernel_partial, cell_sol) # kernel(cell_sol, *args), jax.jacfwd(kernel)(cell_sol, *args)
+        def make_batched_fn():
+            def batched_fn(input_collection):
+                return self.map_cell_batches(fn, input_collection)
+            return batched_fn
 
-            return kernel, kernel_jac
+        outputs = self.get_cached_kernel(name, make_batched_fn, input_collection)(input_collection)
 
-        kernel, kernel_jac = get_kernel_fn_cell()
-        fn = kernel_jac if jac_flag else kernel
-        vmap_fn = jax.jit(jax.vmap(fn))
-        kernal_vars = self.unpack_kernels_vars(**internal_vars)
-        num_cuts = 20
-        if num_cuts > len(self.cells):
-            num_cuts = len(self.cells)
-        batch_size = len(self.cells) // num_cuts
-        input_collection = [cells_sol, self.shape_grads, self.JxW, self.v_grads_JxW, *kernal_vars]
+        # The outputs of all batches are stacked on the device. np_version set to jax.numpy keeps them there 
+        # (e.g., for auto diff), ordinary numpy copies them to the host (e.g., for host-side processing).
+        return jax.tree_map(np_version.asarray, outputs)
 
+    def get_cell_kernel(self, jac_flag):
+        """The cell kernel and its cache name. With jac_flag, the kernel returns the cell residual and 
+        the cell Jacobian in the layout of self.assembly_plan.cell_slots.
+        """
+        kernel, kernel_jac = self.get_kernel_fn_cell()
+        if jac_flag and self.symmetric:
+            def kernel_jac_triu(cell_sol, *args):
+                val, jac = kernel_jac(cell_sol, *args)
+                return val, jac.reshape(self.num_nodes*self.vec, -1)[self.assembly_plan.cell_triu_inds]
+            return 'cell_jac_triu', kernel_jac_triu
         if jac_flag:
-            values = []
-            jacs = []
-            for i in range(num_cuts):
-                if i < num_cuts - 1:
-                    input_col = jax.tree_map(lambda x: x[i*batch_size:(i + 1)*batch_size], input_collection)
-                else:
-                    input_col = jax.tree_map(lambda x: x[i*batch_size:], input_collection)
-
-                val, jac = vmap_fn(*input_col)
-
-                values.append(val)
-                jacs.append(jac)
-
-            # np_version set to jax.numpy allows for auto diff, but uses GPU memory
-            # np_version set to ordinary numpy saves GPU memory, but can't use auto diff 
-            values = np_version.vstack(values)
-            jacs = np_version.vstack(jacs)
-            return values, jacs
-        else:
-            values = []
-            for i in range(num_cuts):
-                if i < num_cuts - 1:
-                    input_col = jax.tree_map(lambda x: x[i*batch_size:(i + 1)*batch_size], input_collection)
-                else:
-                    input_col = jax.tree_map(lambda x: x[i*batch_size:], input_collection)
+            return 'cell_jac', kernel_jac
+        return 'cell_res', kernel
+
+    def split_and_compute_cell(self, cells_sol, np_version, jac_flag, **internal_vars):
+        name, fn = self.get_cell_kernel(jac_flag)
+        return self.compute_cell_batches(name, fn, [cells_sol], np_version, **internal_vars)
+
+    def get_shard_data(self):
+        """Device mesh over all devices, and cells, assembly plan slots and cell geometry (see get_cell_geometry) 
+        padded to a multiple of the number of devices and placed shard by shard, once per FEM instance. 
+        Padded cells point to node num_total_nodes and slot nnz, which are out of range and dropped by segment_sum, 
+        and repeat the geometry of the last cell.
+        """
+        if not hasattr(self, 'shard_data'):
+            devices = onp.array(jax.devices())
+            device_mesh = DeviceMesh(devices, ('cells',))
+            num_pads = -self.num_cells % len(devices)
+            sharding = NamedSharding(device_mesh, PartitionSpec('cells'))
+            cells = onp.vstack((self.cells, onp.full((num_pads, self.num_nodes), self.num_total_nodes)))
+            cell_slots = self.assembly_plan.cell_slots
+            cell_slots = onp.vstack((cell_slots, onp.full((num_pads, cell_slots.shape[1]), self.assembly_plan.nnz)))
+            geometry = [None if x is None else onp.concatenate((x, onp.repeat(x[-1:], num_pads, axis=0)), axis=0) 
+                        for x in self.get_cell_geometry()]
+            self.shard_data = {'mesh': device_mesh, 'num_pads': num_pads,
+                               'cells': jax.device_put(cells.astype(cell_slots.dtype), sharding),
+                               'cell_slots': jax.device_put(cell_slots, sharding),
+                               'geometry': [None if x is None else jax.device_put(x, sharding) for x in geometry]}
+        return self.shard_data
+
+    def compute_cell_sharded(self, cells_sol, jac_flag, **internal_vars):
+        """Sharded counterpart of split_and_compute_cell followed by assembly, see shard_cells.
+        Every device runs the batched cell kernel (map_cell_batches) on its own cells only.
+
+        Returns
+        -------
+        res : np.DeviceArray
+            (num_total_nodes, vec) cell contributions to the residual
+        A_data : np.DeviceArray
+            (nnz,) CSR data of the assembly plan, in float64. Only returned if jac_flag.
+        """
+        name, fn = self.get_cell_kernel(jac_flag)
+        shard_data = self.get_shard_data()
+        num_pads = shard_data['num_pads']
+        kernal_vars = self.unpack_kernels_vars(**internal_vars)
 
-                val = vmap_fn(*input_col)
-                values.append(val)
-            values = np_version.vstack(values)
-            return values
+        def make_sharded_fn():
+            def local_fn(cells, cell_slots, cells_sol, geometry, kernal_vars):
+                outputs = self.map_cell_batches(fn, [cells_sol, *geometry, *kernal_vars])
+                val, jac = outputs if jac_flag else (outputs, None)
+                res = jax.ops.segment_sum(val.reshape(-1, self.vec), cells.reshape(-1), num_segments=self.num_total_nodes)
+                if not jac_flag:
+                    return jax.lax.psum(res, 'cells')
+                A_data = jax.ops.segment_sum(jac.reshape(-1).astype(np.float64), cell_slots.reshape(-1), 
+                                             num_segments=self.assembly_plan.nnz)
+                return jax.lax.psum(res, 'cells'), jax.lax.psum(A_data, 'cells')
+
+            spec = PartitionSpec('cells')
+            out_specs = (PartitionSpec(), PartitionSpec()) if jac_flag else PartitionSpec()
+            # Outputs are replicated by psum; check_rep is off since some kernel primitives (e.g., cumprod in det) 
+            # have no replication rule
+            sharded_fn = shard_map(local_fn, mesh=shard_data['mesh'], in_specs=(spec,)*5, out_specs=out_specs, 
+                                   check_rep=False)
+
+            def padded_fn(cells, cell_slots, cells_sol, geometry, kernal_vars):
+                # Only the inputs that change between calls are padded here, the geometry is padded once
+                pad = lambda x: np.concatenate((x, np.repeat(x[-1:], num_pads, axis=0)), axis=0)
+                return sharded_fn(cells, cell_slots, pad(cells_sol), geometry, jax.tree_map(pad, kernal_vars))
+            return padded_fn
+
+        args = (shard_data['cells'], shard_data['cell_slots'], cells_sol, shard_data['geometry'], kernal_vars)
+        return self.get_cached_kernel(('sharded', name), make_sharded_fn, args)(*args)
+
+    def compute_cell_jac_diag(self, cells_sol, np_version, **internal_vars):
+        """Cell residual and the diagonal of the cell Jacobian, through one JVP per cell dof (the kernel is 
+        linearized once, see jax.linearize). Unlike jacfwd, the full cell Jacobian is never formed, 
+        so intermediates stay (num_nodes, vec) per cell and the batch size estimate of get_cell_batch_size holds.
 
+        Returns
+        -------
+        values : ndarray
+            (num_cells, num_nodes, vec)
+        jac_diags : ndarray
+            (num_cells, num_nodes, vec)
+        """
+        kernel, _ = self.get_kernel_fn_cell()
+        def kernel_jac_diag(cell_sol, *args):
+            val, kernel_jvp = jax.linearize(lambda cell_sol: kernel(cell_sol, *args), cell_sol)
+            def diag_entry(i):
+                unit = np.zeros(cell_sol.size, dtype=cell_sol.dtype).at[i].set(1.).reshape(cell_sol.shape)
+                return kernel_jvp(unit).reshape(-1)[i]
+            jac_diag = jax.lax.map(diag_entry, np.arange(cell_sol.size)).reshape(cell_sol.shape)
+            return val, jac_diag
+        return self.compute_cell_batches('cell_jac_diag', kernel_jac_diag, [cells_sol], np_version, **internal_vars)
+
+    def get_cell_jvp_fn(self, args, high_precision=False):
+        """Jitted cell Jacobian-vector products, scattered to nodes with segment_sum. Used by the matrix-free solver.
+        Cells are processed batch by batch, see map_cell_batches.
+        Mesh data are passed as arguments rather than closed over, so that XLA does not constant-fold them.
+        The kernels are linearized in self.jacobian_dtype, or in float64 if high_precision.
 
-    def compute_face(self, cells_sol, np_version, jac_flag):
+        Returns
+        -------
+        cell_jvp_fn : Callable
+            (sol, inc, cells, shape_grads, JxW, v_grads_JxW, kernal_vars) -> (num_total_nodes, vec)
+        """
+        def make_cell_jvp_fn():
+            kernel, _ = self.get_kernel_fn_cell()
+            def kernel_cast(cell_sol, *args):
+                if not high_precision:
+                    cell_sol, args = self.to_jacobian_dtype((cell_sol, args))
+                return kernel(cell_sol, *args)
+
+            def cell_jvp_fn(sol, inc, cells, shape_grads, JxW, v_grads_JxW, kernal_vars):
+                # The batched kernel is differentiated as a whole rather than batching the cell JVPs: the JVP of 
+                # the lax.map is linear in inc, which keeps this function transposable for the jax Krylov solvers
+                def cells_kernel(cells_sol):
+                    return self.map_cell_batches(kernel_cast, [cells_sol, shape_grads, JxW, v_grads_JxW, *kernal_vars])
+                # (num_cells, num_nodes, vec)
+                _, cells_jvp = jax.jvp(cells_kernel, (sol[cells],), (inc[cells],))
+                return jax.ops.segment_sum(cells_jvp.reshape(-1, self.vec), cells.reshape(-1), 
+                                           num_segments=self.num_total_nodes)
+            return cell_jvp_fn
+
+        return self.get_cached_kernel(('cell_jvp', high_precision), make_cell_jvp_fn, args)
+
+    def compute_face(self, cells_sol, np_version, jac_flag, cells_inc=None):
+        """Cauchy boundary integrals over all Cauchy boundaries, evaluated by one fused jitted kernel 
+        on the face data precomputed by Cauchy_boundary_conditions.
+        If cells_inc is given, Jacobian-vector products with cells_inc are computed instead.
+
+        Returns
+        -------
+        values : ndarray
+            (num_selected_faces, num_nodes, vec), or (num_selected_faces, num_nodes, vec, num_nodes, vec) if jac_flag
+        selected_cell_inds : onp.ndarray
+            (num_selected_faces,)
+        """
         def get_kernel_fn_face(cauchy_map): 
             def kernel(cell_sol, face_shape_vals, face_nanson_scale):
                 cauchy_kernel = self.get_cauchy_kernel(cauchy_map)
@@ -538,48 +1196,64 @@ class FEM:
             def kernel_jac(cell_sol, *args):
                 return jax.jacfwd(kernel)(cell_sol, *args)
 
-            return kernel, kernel_jac
-
-        # TODO: Better to move the following to __init__ function?
-        location_fns, value_fns = self.cauchy_bc_info
-        boundary_inds_list = self.get_boundary_conditions_inds(location_fns)
-        values = []
-        selected_cells = []
-        for i, boundary_inds in enumerate(boundary_inds_list):
-            selected_cell_sols = cells_sol[boundary_inds[:, 0]] # (num_selected_faces, num_nodes, vec))
-            selected_face_shape_vals = self.face_shape_vals[boundary_inds[:, 1]] # (num_selected_faces, num_face_quads, num_nodes)
-            _, nanson_scale = self.get_face_shape_grads(boundary_inds) # (num_selected_faces, num_face_quads)
-            kernel, kernel_jac = get_kernel_fn_face(value_fns[i])
-            fn = kernel_jac if jac_flag else kernel
-            vmap_fn = jax.jit(jax.vmap(fn))
-            val = vmap_fn(selected_cell_sols, selected_face_shape_vals, nanson_scale)   
-            values.append(val)
-            selected_cells.append(self.cells[boundary_inds[:, 0]])
-        
-        values = np_version.vstack(values)
-        selected_cells = onp.vstack(selected_cells)
-
-        assert len(values) == len(selected_cells)
-
-        return values, selected_cells
+            def kernel_jvp(cell_sol, cell_inc, *args):
+                kernel_partial = lambda cell_sol: kernel(cell_sol, *args)
+                _, tangent = jax.jvp(kernel_partial, (cell_sol,), (cell_inc,))
+                return tangent
+
+            if cells_inc is not None:
+                return kernel_jvp
+            return kernel_jac if jac_flag else kernel
+
+        value_fns = self.cauchy_value_fns
+        splits = self.cauchy_face_splits
+
+        def make_fused_fn():
+            def fused_fn(cells_sol, cells_inc, face_cell_inds, face_shape_vals, nanson_scale):
+                selected_cell_sols = cells_sol[face_cell_inds] # (num_selected_faces, num_nodes, vec)
+                values = []
+                for i in range(len(value_fns)):
+                    face_slice = slice(splits[i], splits[i + 1])
+                    args = (face_shape_vals[face_slice], nanson_scale[face_slice])
+                    if cells_inc is not None:
+                        args = (cells_inc[face_cell_inds][face_slice],) + args
+                    values.append(jax.vmap(get_kernel_fn_face(value_fns[i]))(selected_cell_sols[face_slice], *args))
+                return np.concatenate(values, axis=0)
+            return fused_fn
+
+        args = (cells_sol, cells_inc, self.cauchy_cell_inds, self.cauchy_face_shape_vals, self.cauchy_nanson_scale)
+        kernel_name = ('face_jvp' if cells_inc is not None else 'face_jac' if jac_flag else 'face_res', tuple(value_fns))
+        values = self.get_cached_kernel(kernel_name, make_fused_fn, args)(*args)
+        values = np_version.asarray(values)
+        selected_cell_inds = self.cauchy_cell_inds
+
+        assert len(values) == len(selected_cell_inds)
+
+        return values, selected_cell_inds
 
     def compute_residual_vars_helper(self, sol, weak_form):
         res = np.zeros((self.num_total_nodes, self.vec))
         weak_form = weak_form.reshape(-1, self.vec) # (num_cells*num_nodes, vec)
         res = res.at[self.cells.reshape(-1)].add(weak_form) 
+        return self.add_face_and_source_terms(sol, res)
 
+    def add_face_and_source_terms(self, sol, res):
+        """Add Cauchy boundary integrals and subtract body force and Neumann terms from the assembled cell residual
+        """
         if self.cauchy_bc_info is not None:
             cells_sol = sol[self.cells]
-            values, selected_cells = self.compute_face(cells_sol, np, False)
+            values, selected_cell_inds = self.compute_face(cells_sol, np, False)
             values = values.reshape(-1, self.vec)
-            res = res.at[selected_cells.reshape(-1)].add(values) 
+            res = res.at[self.cells[selected_cell_inds].reshape(-1)].add(values) 
 
         res = res - self.body_force - self.neumann
         return res
 
     def compute_residual_vars(self, sol, **internal_vars):
-        print(f"Compute cell residual...")
+        logger.info(f"Compute cell residual...")
         cells_sol = sol[self.cells] # (num_cells, num_nodes, vec)
+        if self.shard_cells:
+            return self.add_face_and_source_terms(sol, self.compute_cell_sharded(cells_sol, False, **internal_vars))
         weak_form = self.split_and_compute_cell(cells_sol, np, False, **internal_vars) # (num_cells, num_nodes, vec)
         return self.compute_residual_vars_helper(sol, weak_form)
     
@@ -589,30 +1263,134 @@ class FEM:
         return self.compute_residual_vars(sol)
 
     def newton_vars(self, sol, **internal_vars):
-        print(f"Compute cell Jacobian...")
+        if getattr(self, 'matrix_free', False):
+            return self.newton_vars_matrix_free(sol, **internal_vars)
+
+        logger.info(f"Compute cell Jacobian...")
         cells_sol = sol[self.cells] # (num_cells, num_nodes, vec)
-        # (num_cells, num_nodes, vec), (num_cells, num_nodes, vec, num_nodes, vec)
-        weak_form, cells_jac = self.split_and_compute_cell(cells_sol, onp, True, **internal_vars)
-        V = cells_jac.reshape(-1)
-        inds = (self.vec * self.cells[:, :, None] + onp.arange(self.vec)[None, None, :]).reshape(len(self.cells), -1)
-        I = onp.repeat(inds[:, :, None], self.num_nodes*self.vec, axis=2).reshape(-1)
-        J = onp.repeat(inds[:, None, :], self.num_nodes*self.vec, axis=1).reshape(-1)
-        self.I = I
-        self.J = J
-        self.V = V
+        if self.shard_cells:
+            res, A_data = self.compute_cell_sharded(cells_sol, True, **internal_vars)
+            self.A_data = onp.asarray(A_data)
+        else:
+            # (num_cells, num_nodes, vec), (num_cells, num_nodes, vec, num_nodes, vec) or (num_cells, cell_triu_size)
+            weak_form, cells_jac = self.split_and_compute_cell(cells_sol, onp, True, **internal_vars)
+            # Only the CSR data is filled here; the sparsity pattern comes from self.assembly_plan
+            self.A_data = self.assembly_plan.assemble(cells_jac)
+
+        if self.cauchy_bc_info is not None:
+            D_face, selected_cell_inds = self.compute_face(cells_sol, onp, True)
+            if self.symmetric:
+                D_face = D_face.reshape(len(selected_cell_inds), self.num_nodes*self.vec, -1)
+                D_face = D_face[:, self.assembly_plan.cell_triu_inds[0], self.assembly_plan.cell_triu_inds[1]]
+            self.A_data = self.A_data + self.assembly_plan.assemble(D_face, selected_cell_inds)
+
+        # Accumulated in float64, stored in self.jacobian_dtype
+        self.A_data = self.A_data.astype(self.jacobian_dtype)
+        # With precision='mixed', iterative refinement applies the float64 Jacobian at this point matrix-free
+        self.linearization_point = (sol, internal_vars)
+        if self.shard_cells:
+            return self.add_face_and_source_terms(sol, res)
+        return self.compute_residual_vars_helper(sol, weak_form) 
+
+    def get_assembly_data(self):
+        """Mesh data read by assemble_weak_form: cells, assembly plan slots and cell geometry (see get_cell_geometry).
+        Jitted callers take them as arguments rather than closing over them, so that XLA does not constant-fold them.
+        """
+        return {'cells': self.cells, 'cell_slots': self.assembly_plan.cell_slots, 'geometry': list(self.get_cell_geometry())}
+
+    def assemble_weak_form(self, sol, jac_flag, assembly_data, **internal_vars):
+        """Traceable counterpart of compute_residual_vars (jac_flag False) and newton_vars (jac_flag True),
+        for use inside jax.jit: cell and Cauchy boundary contributions are scattered with segment_sum,
+        and the CSR data of self.assembly_plan is filled on device. Body force and Neumann terms are not included.
+        Used by the device-resident Newton solver, see jax_am.fem.solver.solver_jit.
+
+        Parameters
+        ----------
+        sol : np.DeviceArray
+            (num_total_nodes, vec)
+        assembly_data : dict
+            See get_assembly_data
+
+        Returns
+        -------
+        res : np.DeviceArray
+            (num_total_nodes, vec)
+        A_data : np.DeviceArray
+            (nnz,) in float64, only returned if jac_flag
+        """
+        cells, cell_slots = assembly_data['cells'], assembly_data['cell_slots']
+        cells_sol = sol[cells] # (num_cells, num_nodes, vec)
+        _, fn = self.get_cell_kernel(jac_flag)
+        kernal_vars = self.unpack_kernels_vars(**internal_vars)
+        outputs = self.map_cell_batches(fn, [cells_sol, *assembly_data['geometry'], *kernal_vars])
+        val, jac = outputs if jac_flag else (outputs, None)
+        res = jax.ops.segment_sum(val.reshape(-1, self.vec), cells.reshape(-1), num_segments=self.num_total_nodes)
+        if jac_flag:
+            A_data = jax.ops.segment_sum(jac.reshape(-1).astype(np.float64), cell_slots.reshape(-1),
+                                         num_segments=self.assembly_plan.nnz)
 
         if self.cauchy_bc_info is not None:
-            D_face, selected_cells = self.compute_face(cells_sol, onp, True)
-            V_face = D_face.reshape(-1)
-            inds_face = (self.vec * selected_cells[:, :, None] + onp.arange(self.vec)[None, None, :]).reshape(len(selected_cells), -1)
-            I_face = onp.repeat(inds_face[:, :, None], self.num_nodes*self.vec, axis=2).reshape(-1)
-            J_face = onp.repeat(inds_face[:, None, :], self.num_nodes*self.vec, axis=1).reshape(-1)
-            self.I = onp.hstack((self.I, I_face))
-            self.J = onp.hstack((self.J, J_face))
-            self.V = onp.hstack((self.V, V_face))
+            values, selected_cell_inds = self.compute_face(cells_sol, np, False)
+            res = res + jax.ops.segment_sum(values.reshape(-1, self.vec), cells[selected_cell_inds].reshape(-1),
+                                            num_segments=self.num_total_nodes)
+            if jac_flag:
+                D_face, _ = self.compute_face(cells_sol, np, True)
+                if self.symmetric:
+                    D_face = D_face.reshape(len(selected_cell_inds), self.num_nodes*self.vec, -1)
+                    D_face = D_face[:, self.assembly_plan.cell_triu_inds[0], self.assembly_plan.cell_triu_inds[1]]
+                A_data = A_data + jax.ops.segment_sum(D_face.reshape(-1), cell_slots[selected_cell_inds].reshape(-1),
+                                                      num_segments=self.assembly_plan.nnz)
+
+        return (res, A_data) if jac_flag else res
+
+    def newton_vars_matrix_free(self, sol, **internal_vars):
+        """Matrix-free counterpart of newton_vars: neither cell Jacobians nor the global matrix are stored. 
+        Only the linearization point and the Jacobian diagonal (for the Jacobi preconditioner) are kept.
+        """
+        logger.info(f"Compute cell Jacobian diagonal...")
+        cells_sol = sol[self.cells] # (num_cells, num_nodes, vec)
+        # (num_cells, num_nodes, vec), (num_cells, num_nodes, vec)
+        weak_form, cells_jac_diag = self.compute_cell_jac_diag(cells_sol, np, **internal_vars)
+        A_diag = jax.ops.segment_sum(cells_jac_diag.reshape(-1, self.vec), self.cells.reshape(-1), 
+                                     num_segments=self.num_total_nodes)
 
+        if self.cauchy_bc_info is not None:
+            D_face, selected_cell_inds = self.compute_face(cells_sol, np, True)
+            D_face = D_face.reshape(len(selected_cell_inds), self.num_nodes*self.vec, -1)
+            D_face_diag = np.diagonal(D_face, axis1=1, axis2=2).reshape(-1, self.vec)
+            A_diag = A_diag + jax.ops.segment_sum(D_face_diag, self.cells[selected_cell_inds].reshape(-1), 
+                                                  num_segments=self.num_total_nodes)
+
+        self.A_diag = A_diag.reshape(-1)
+        self.linearization_point = (sol, internal_vars)
         return self.compute_residual_vars_helper(sol, weak_form) 
 
+    def compute_linearized_residual(self, inc, high_precision=False):
+        """Apply the Jacobian at the linearization point stored by newton_vars or newton_vars_matrix_free to inc.
+        
+        Parameters
+        ----------
+        inc : np.DeviceArray
+            (num_total_nodes, vec)
+        high_precision : bool
+            Linearize in float64 regardless of self.precision, e.g., for the residuals of iterative refinement
+
+        Returns
+        -------
+        val : np.DeviceArray
+            (num_total_nodes, vec)
+        """
+        sol, internal_vars = self.linearization_point
+        kernal_vars = self.unpack_kernels_vars(**internal_vars)
+        args = (sol, inc, self.cells, *self.get_cell_geometry(), kernal_vars)
+        val = self.get_cell_jvp_fn(args, high_precision)(*args)
+
+        if self.cauchy_bc_info is not None:
+            values, selected_cell_inds = self.compute_face(sol[self.cells], np, False, inc[self.cells])
+            val = val + jax.ops.segment_sum(values.reshape(-1, self.vec), self.cells[selected_cell_inds].reshape(-1), 
+                                            num_segments=self.num_total_nodes)
+        return val
+
     def newton_update(self, sol):
         """Child class should override if internal variables exist
         """
@@ -1,19 +1,146 @@
 import os
-import gmsh
+import itertools
+import basix
 import numpy as onp
-import meshio
+
+# gmsh and meshio are only needed for mesh generation and are imported on first use,
+# so that importing Mesh (e.g., from core.py) does not load them
 
 from jax_am.fem.basis import get_elements
 
 
 class Mesh():
     """A custom mesh manager might be better than just use third-party packages like meshio?
+
+    If the mesh was renumbered (see renumber_mesh), node_perm and cell_perm hold the original indices of 
+    the new nodes and cells, i.e., points = original_points[node_perm] and the cells are relabeled accordingly.
     """
     def __init__(self, points, cells):
         # TODO: Assert that cells must have correct orders
         # TODO: first cells, then points?
         self.points = points
         self.cells = cells
+        self.node_perm = None
+        self.cell_perm = None
+
+    def to_original_order(self, data, location='node'):
+        """Map node (e.g., a solution) or cell (e.g., internal variables) data back to the original numbering.
+
+        Parameters
+        ----------
+        data : ndarray
+            (num_total_nodes, ...) or (num_cells, ...)
+        location : str
+            'node' or 'cell'
+        """
+        perm = self.node_perm if location == 'node' else self.cell_perm
+        if perm is None:
+            return data
+        original_data = onp.empty_like(onp.asarray(data))
+        original_data[perm] = data
+        return original_data
+
+    def from_original_order(self, data, location='node'):
+        """Map node or cell data given in the original numbering (e.g., an initial guess) to this mesh.
+        Node indices of the original mesh i map to onp.argsort(node_perm)[i].
+        """
+        perm = self.node_perm if location == 'node' else self.cell_perm
+        if perm is None:
+            return data
+        return onp.asarray(data)[perm]
+
+
+def morton_codes(points):
+    """Morton (Z-order) codes of points: the bits of the quantized coordinates are interleaved, 
+    so that sorting by the code walks the domain along a space-filling curve.
+
+    Returns
+    -------
+    codes : onp.ndarray
+        (num_points,) uint64
+    """
+    points = onp.asarray(points, dtype=onp.float64)
+    dim = points.shape[1]
+    bits = 63 // dim
+    lower, upper = onp.min(points, axis=0), onp.max(points, axis=0)
+    scale = (2**bits - 1)/onp.where(upper > lower, upper - lower, 1.)
+    quantized = ((points - lower)*scale).astype(onp.uint64)
+    codes = onp.zeros(len(points), dtype=onp.uint64)
+    for b in range(bits):
+        for d in range(dim):
+            codes |= ((quantized[:, d] >> onp.uint64(b)) & onp.uint64(1)) << onp.uint64(b*dim + d)
+    return codes
+
+
+def rcm_node_permutation(cells, num_total_nodes):
+    """Reverse Cuthill-McKee ordering of the node graph (nodes sharing a cell are connected), 
+    which reduces the bandwidth of the global matrix.
+
+    Returns
+    -------
+    node_perm : onp.ndarray
+        (num_total_nodes,) original index of each new node
+    """
+    import scipy.sparse
+    from scipy.sparse.csgraph import reverse_cuthill_mckee
+    cells = onp.asarray(cells)
+    num_nodes = cells.shape[1]
+    rows = onp.repeat(cells, num_nodes, axis=1).reshape(-1)
+    cols = onp.tile(cells, (1, num_nodes)).reshape(-1)
+    graph = scipy.sparse.csr_matrix((onp.ones(len(rows), dtype=onp.int8), (rows, cols)), 
+                                    shape=(num_total_nodes, num_total_nodes))
+    return onp.asarray(reverse_cuthill_mckee(graph, symmetric_mode=True), dtype=onp.int64)
+
+
+def renumber_mesh(mesh, node_order='rcm', cell_order='morton'):
+    """Renumber nodes and cells for memory locality: the gather sol[cells], the scatter of cell residuals and 
+    the sparse matrix-vector products then access nearby memory. 
+
+    Parameters
+    ----------
+    mesh : Mesh
+    node_order : str
+        'rcm' (reverse Cuthill-McKee, minimizes the matrix bandwidth), 'morton' (space-filling curve on the points) 
+        or None to keep the node numbering
+    cell_order : str
+        'morton' (space-filling curve on the cell centroids), 'nodes' (sorted by the smallest new node index) 
+        or None to keep the cell order
+
+    Returns
+    -------
+    renumbered_mesh : Mesh
+        With node_perm and cell_perm set (composed with those of mesh if it was already renumbered). 
+        Use renumbered_mesh.to_original_order to map solutions back.
+    """
+    points = onp.asarray(mesh.points)
+    cells = onp.asarray(mesh.cells)
+    num_total_nodes = len(points)
+
+    if node_order == 'rcm':
+        node_perm = rcm_node_permutation(cells, num_total_nodes)
+    elif node_order == 'morton':
+        node_perm = onp.argsort(morton_codes(points), kind='stable')
+    elif node_order is None:
+        node_perm = onp.arange(num_total_nodes)
+    else:
+        raise ValueError(f"Unknown node_order {node_order}")
+    node_inv_perm = onp.empty_like(node_perm)
+    node_inv_perm[node_perm] = onp.arange(num_total_nodes)
+    new_cells = node_inv_perm[cells]
+
+    if cell_order == 'morton':
+        cell_perm = onp.argsort(morton_codes(onp.mean(points[cells], axis=1)), kind='stable')
+    elif cell_order == 'nodes':
+        cell_perm = onp.argsort(onp.min(new_cells, axis=1), kind='stable')
+    elif cell_order is None:
+        cell_perm = onp.arange(len(cells))
+    else:
+        raise ValueError(f"Unknown cell_order {cell_order}")
+
+    renumbered_mesh = Mesh(points[node_perm], new_cells[cell_perm].astype(cells.dtype))
+    renumbered_mesh.node_perm = node_perm if mesh.node_perm is None else mesh.node_perm[node_perm]
+    renumbered_mesh.cell_perm = cell_perm if mesh.cell_perm is None else mesh.cell_perm[cell_perm]
+    return renumbered_mesh
 
 
 def get_meshio_cell_type(ele_type):
@@ -39,12 +166,75 @@ def get_meshio_cell_type(ele_type):
     return cell_type
 
 
+def structured_box_mesh(Nx, Ny, Nz, Lx=1., Ly=1., Lz=1., ele_type='HEX8'):
+    """Structured mesh of the box [0, Lx] x [0, Ly] x [0, Lz] with Nx x Ny x Nz hexahedra, built with numpy only 
+    (no gmsh, no files). For tetrahedral elements, each hexahedron is split into 6 positively oriented tetrahedra 
+    sharing its main diagonal (Kuhn triangulation), which is conforming across hexahedra.
+
+    Parameters
+    ----------
+    Nx, Ny, Nz : int
+        Number of hexahedra along each axis
+    Lx, Ly, Lz : float
+        Box size
+    ele_type : str
+        'HEX8', 'HEX27', 'TET4' or 'TET10'
+
+    Returns
+    -------
+    mesh : Mesh
+        points (num_total_nodes, 3), cells (num_cells, num_nodes)
+    """
+    if ele_type not in ['HEX8', 'HEX27', 'TET4', 'TET10']:
+        raise NotImplementedError(f"structured_box_mesh does not support {ele_type}")
+    element_family, basix_ele, _, _, degree, re_order = get_elements(ele_type)
+    # Nodes of the element as offsets on the lattice of spacing 1/degree, (num_nodes, 3)
+    ref_points = basix.create_element(element_family, basix_ele, degree).points[re_order]
+
+    if ele_type.startswith('HEX'):
+        local_offsets = (degree*ref_points)[None, :, :]
+    else:
+        local_offsets = []
+        for perm in itertools.permutations(range(3)):
+            e = onp.eye(3)[list(perm)]
+            edges = onp.stack([e[0], e[0] + e[1], onp.ones(3)], axis=1) # (3, 3), columns are v1, v2, v3 (v0 = 0)
+            if onp.linalg.det(edges) < 0.:
+                edges = edges[:, [1, 0, 2]]
+            local_offsets.append(degree*ref_points @ edges.T)
+        local_offsets = onp.stack(local_offsets) # (6, num_nodes, 3)
+    local_offsets = onp.rint(local_offsets).astype(onp.int64)
+
+    Ns = onp.array([Nx, Ny, Nz])
+    corners = degree*onp.stack(onp.meshgrid(*[onp.arange(N) for N in Ns], indexing='ij'), axis=-1).reshape(-1, 1, 1, 3)
+    lattice_inds = (corners + local_offsets[None, :, :, :]).reshape(-1, local_offsets.shape[1], 3)
+    cells = onp.ravel_multi_index(tuple(onp.moveaxis(lattice_inds, -1, 0)), tuple(degree*Ns + 1))
+
+    # Drop lattice points that are not element nodes
+    used, cells = onp.unique(cells, return_inverse=True)
+    cells = cells.reshape(lattice_inds.shape[:2])
+    lattice_points = onp.stack(onp.unravel_index(used, tuple(degree*Ns + 1)), axis=1)
+    points = lattice_points*(onp.array([Lx, Ly, Lz])/(degree*Ns))[None, :]
+    return Mesh(points, cells)
+
+
+def scrambled_box_mesh(N, ele_type, seed=0):
+    """Box mesh with randomly permuted nodes and cells, as a stand-in for the numbering of unstructured mesh generators
+    """
+    mesh = structured_box_mesh(N, N, N, ele_type=ele_type)
+    rng = onp.random.default_rng(seed)
+    node_perm = rng.permutation(len(mesh.points))
+    cells = onp.argsort(node_perm)[mesh.cells][rng.permutation(len(mesh.cells))]
+    return Mesh(mesh.points[node_perm], cells)
+
+
 def box_mesh(Nx, Ny, Nz, Lx, Ly, Lz, data_dir, ele_type='HEX8'):
     """References:
     https://gitlab.onelab.info/gmsh/gmsh/-/blob/master/examples/api/hex.py
     https://gitlab.onelab.info/gmsh/gmsh/-/blob/gmsh_4_7_1/tutorial/python/t1.py
     https://gitlab.onelab.info/gmsh/gmsh/-/blob/gmsh_4_7_1/tutorial/python/t3.py
     """
+    import gmsh
+    import meshio
 
     assert ele_type != 'HEX20', f"gmsh cannot produce HEX20 mesh?"
 
@@ -98,6 +288,7 @@ def cylinder_mesh(data_dir, R=5, H=10, circle_mesh=5, hight_mesh=20, rect_ratio=
     hight_mesh:num of meshs in hight
     rect_ratio: rect length/R
     """
+    import meshio
     rect_coor = R*rect_ratio
     msh_dir = os.path.join(data_dir, 'msh')
     os.makedirs(msh_dir, exist_ok=True)
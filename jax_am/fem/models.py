@@ -23,9 +23,7 @@ class LinearPoisson(FEM):
         cells_sol = sol[self.cells] # (num_cells, num_nodes, vec)
         # (num_cells, 1, num_nodes, vec) * (1, num_quads, num_nodes, 1) -> (num_cells, num_quads, vec)
         u = np.sum(cells_sol[:, None, :, :] * self.shape_vals[None, :, :, None], axis=2)
-        # (num_cells, 1, num_nodes, vec, 1) * (num_cells, num_quads, num_nodes, 1, dim) -> (num_cells, num_quads, num_nodes, vec, dim)
-        u_grads = cells_sol[:, None, :, :, None] * self.shape_grads[:, :, :, None, :] 
-        u_grads = np.sum(u_grads, axis=2) # (num_cells, num_quads, vec, dim)
+        u_grads = self.get_u_grads(sol) # (num_cells, num_quads, vec, dim)
         physical_quad_points = self.get_physical_quad_points() # (num_cells, num_quads, dim) 
         true_u = jax.vmap(jax.vmap(true_u_fn))(physical_quad_points) # (num_cells, num_quads, vec)
         true_u_grads = jax.vmap(jax.vmap(jax.jacrev(true_u_fn)))(physical_quad_points) # (num_cells, num_quads, vec, dim)
@@ -192,9 +190,7 @@ class Plasticity(Mechanics):
         return vmap_strain, vmap_stress_return_map
 
     def update_stress_strain(self, sol):
-        # (num_cells, 1, num_nodes, vec, 1) * (num_cells, num_quads, num_nodes, 1, dim) -> (num_cells, num_quads, num_nodes, vec, dim) 
-        u_grads = np.take(sol, self.cells, axis=0)[:, None, :, :, None] * self.shape_grads[:, :, :, None, :] 
-        u_grads = np.sum(u_grads, axis=2) # (num_cells, num_quads, vec, dim)
+        u_grads = self.get_u_grads(sol) # (num_cells, num_quads, vec, dim)
         vmap_strain, vmap_stress_rm = self.stress_strain_fns()
         self.sigmas_old = vmap_stress_rm(u_grads, self.sigmas_old, self.epsilons_old)
         self.epsilons_old = vmap_strain(u_grads)
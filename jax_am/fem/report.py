@@ -0,0 +1,164 @@
+import jax
+import numpy as onp
+import time
+
+
+_compile_stats = {'count': 0, 'time': 0.}
+_compile_listener_registered = False
+
+
+def _register_compile_listener():
+    """Count XLA compilations through jax.monitoring. Registered on first use, not at import time.
+    """
+    global _compile_listener_registered
+    if _compile_listener_registered:
+        return
+    def listener(event, duration, **kwargs):
+        if event == '/jax/core/compile/backend_compile_duration':
+            _compile_stats['count'] += 1
+            _compile_stats['time'] += duration
+    jax.monitoring.register_event_duration_secs_listener(listener)
+    _compile_listener_registered = True
+
+
+def block_until_ready(outputs):
+    """Wait for all JAX arrays in a pytree, so that wall times are not skewed by asynchronous dispatch.
+    """
+    jax.tree_util.tree_map(lambda x: x.block_until_ready() if hasattr(x, 'block_until_ready') else x, outputs)
+    return outputs
+
+
+class MatvecCounter():
+    """Counts executions of a linearized operator inside jitted Krylov loops, through a host callback.
+    The callback synchronizes with the host on every matvec, so counting is opt-in (SolveReport.count_matvecs).
+    """
+    def __init__(self):
+        self.count = 0
+
+    def increment(self):
+        self.count += 1
+
+    def wrap(self, A_fn):
+        def A_fn_counted(x):
+            jax.debug.callback(self.increment)
+            return A_fn(x)
+        return A_fn_counted
+
+    def read(self):
+        jax.effects_barrier()
+        return self.count
+
+
+class SolveReport():
+    """Telemetry of one solver call, stored as problem.solve_report (and returned by solver(..., return_report=True)).
+
+    Attributes
+    ----------
+    phase_times : dict
+        Accumulated wall time [s] per phase, e.g., 'newton_update' (cell kernels and assembly), 'assemble_matrix',
+        'linear_solve'. Outputs are waited for with block_until_ready.
+    phase_counts : dict
+        Number of times each phase ran
+    newton_res_history : List[float]
+        l_2 norm of the residual before the first and after each Newton update
+    newton_step_lengths : List[float]
+        Accepted step length of each Newton iteration (only recorded with line search)
+    linear_solves : List[dict]
+        One entry per linear solve: 'method', 'matvecs', 'iterations', 'res' (true residual l_2 norm), 'converged',
+        and 'factorization_reused' for direct solves. 'matvecs' and 'iterations' of JAX Krylov solves are None 
+        unless count_matvecs.
+    count_matvecs : bool
+        Count matvecs of JAX Krylov solves through host callbacks, set by solver(..., return_report=True)
+    converged : bool
+        True if the Newton loop met its tolerance and all linear solves converged
+    batch_converged : List[bool]
+        Convergence of each problem of a batched solve (see jax_am.fem.solver.solver_batch), where 
+        newton_res_history holds the largest residual over the batch
+    nnz : int
+        Nonzeros of the stored global matrix (0 in matrix-free mode)
+    memory : dict
+        Estimated bytes of the global matrix, the cell Jacobians of one Newton step, and stored geometric data
+    compiles : int
+        XLA compilations during the solve
+    compile_time : float
+        Backend compile time [s] during the solve
+    kernel_cache : dict
+        Hits and misses of problem.kernel_cache during the solve
+    setup_time : float
+        Precomputation time [s] of the FEM object
+    total_time : float
+        Wall time [s] of the solve
+    """
+    def __init__(self, problem):
+        _register_compile_listener()
+        self.phase_times = {}
+        self.phase_counts = {}
+        self.newton_res_history = []
+        self.newton_step_lengths = []
+        self.linear_solves = []
+        self.count_matvecs = getattr(problem, 'count_matvecs', False)
+        self.converged = None
+        self.batch_converged = []
+        self.nnz = 0
+        self.memory = {}
+        self.compiles = 0
+        self.compile_time = 0.
+        self.kernel_cache = {}
+        self.setup_time = getattr(problem, 'setup_time', None)
+        self.total_time = None
+        self._start_time = time.time()
+        self._start_compiles = dict(_compile_stats)
+        self._start_kernel_cache = problem.kernel_cache_info()
+
+    def timed(self, phase, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs), wait for its outputs and add the elapsed time to phase.
+        """
+        start = time.time()
+        outputs = block_until_ready(fn(*args, **kwargs))
+        self.phase_times[phase] = self.phase_times.get(phase, 0.) + time.time() - start
+        self.phase_counts[phase] = self.phase_counts.get(phase, 0) + 1
+        return outputs
+
+    def record_linear_solve(self, method, matvecs, iterations, res, converged, **info):
+        self.linear_solves.append({'method': method, 'matvecs': matvecs, 'iterations': iterations,
+                                   'res': float(res), 'converged': bool(converged), **info})
+
+    def finalize(self, problem, newton_converged):
+        self.total_time = time.time() - self._start_time
+        self.compiles = _compile_stats['count'] - self._start_compiles['count']
+        self.compile_time = _compile_stats['time'] - self._start_compiles['time']
+        kernel_cache = problem.kernel_cache_info()
+        self.kernel_cache = {'hits': kernel_cache['hits'] - self._start_kernel_cache['hits'],
+                             'misses': kernel_cache['misses'] - self._start_kernel_cache['misses']}
+        self.converged = bool(newton_converged) and all(s['converged'] for s in self.linear_solves)
+
+        def nbytes(name):
+            x = getattr(problem, name, None)
+            return 0 if x is None else int(onp.asarray(x).nbytes)
+
+        matrix_free = getattr(problem, 'matrix_free', False)
+        plan = problem.assembly_plan
+        jac_itemsize = onp.dtype(problem.jacobian_dtype).itemsize
+        self.nnz = 0 if matrix_free else int(plan.nnz)
+        self.memory = {'matrix': 0 if matrix_free else
+                       int(plan.nnz*(jac_itemsize + plan.indices.itemsize) + plan.indptr.nbytes),
+                       'cell_jacobians': 0 if matrix_free else int(plan.cell_slots.size*jac_itemsize),
+                       'geometry': sum(nbytes(name) for name in ['shape_grads', 'JxW', 'v_grads_JxW',
+                                                                 'inv_jacobians', 'inv_jacobians_JxW'])}
+
+    def summary(self):
+        """Plain dict (JSON serializable) of all metrics
+        """
+        return {'converged': self.converged, 'batch_converged': self.batch_converged, 'total_time': self.total_time, 'setup_time': self.setup_time,
+                'phase_times': self.phase_times, 'phase_counts': self.phase_counts,
+                'newton_res_history': [float(r) for r in self.newton_res_history],
+                'newton_step_lengths': self.newton_step_lengths,
+                'linear_solves': self.linear_solves, 'nnz': self.nnz, 'memory': self.memory,
+                'compiles': self.compiles, 'compile_time': self.compile_time, 'kernel_cache': self.kernel_cache}
+
+    def __repr__(self):
+        phases = ', '.join(f"{k} {v:.3f} s" for k, v in self.phase_times.items())
+        iterations = [s['iterations'] for s in self.linear_solves]
+        return (f"SolveReport(converged={self.converged}, total_time={self.total_time:.3f} s, {phases}, "
+                f"newton_iterations={max(len(self.newton_res_history) - 1, 0)}, krylov_iterations={iterations}, "
+                f"nnz={self.nnz}, compiles={self.compiles})")
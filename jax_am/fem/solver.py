@@ -3,21 +3,26 @@ import jax.numpy as np
 import numpy as onp
 from jax.experimental.sparse import BCOO
 import scipy
+import scipy.sparse.csgraph
+import scipy.sparse.linalg
 import time
+import logging
 from functools import partial
 
+from jax_am.fem.report import SolveReport, MatvecCounter
+from jax_am.fem.amg import SmoothedAggregationAMG, near_nullspace
+
+
+logger = logging.getLogger(__name__)
+
 
 ################################################################################
 # "row elimination" solver
 
 def apply_bc_vec(res_vec, dofs, problem):
-    sol = dofs.reshape((problem.num_total_nodes, problem.vec))
-    res = res_vec.reshape(sol.shape)
-    for i in range(len(problem.node_inds_list)):
-        res = (res.at[problem.node_inds_list[i], problem.vec_inds_list[i]].set
-               (sol[problem.node_inds_list[i], problem.vec_inds_list[i]], unique_indices=True))
-        res = res.at[problem.node_inds_list[i], problem.vec_inds_list[i]].add(-problem.vals_list[i])
-    return res.reshape(-1)
+    dofs = dofs.reshape(-1)
+    return res_vec.reshape(-1).at[problem.bc_dof_inds].set(dofs[problem.bc_dof_inds] - problem.bc_vals, 
+                                                           indices_are_sorted=True, unique_indices=True)
 
 
 def apply_bc(res_fn, problem):
@@ -31,36 +36,253 @@ def apply_bc(res_fn, problem):
 
 def row_elimination(res_fn, problem):
     def fn_dofs_row(dofs):
-        sol = dofs.reshape((problem.num_total_nodes, problem.vec))
-        res = res_fn(dofs).reshape(sol.shape)
-        for i in range(len(problem.node_inds_list)):
-            res = (res.at[problem.node_inds_list[i], problem.vec_inds_list[i]].set
-                   (sol[problem.node_inds_list[i], problem.vec_inds_list[i]], unique_indices=True))
-        return res.reshape(-1)
+        res = res_fn(dofs).reshape(-1)
+        return res.at[problem.bc_dof_inds].set(dofs[problem.bc_dof_inds], indices_are_sorted=True, unique_indices=True)
     return fn_dofs_row
 
 
+def symmetric_elimination(A_fn, problem):
+    """Symmetric counterpart of row_elimination: both rows and columns of Dirichlet dofs are eliminated,
+    so the operator stays symmetric and CG can be used. 
+    The eliminated columns are moved to the right-hand side by lift_rhs, which maps the right-hand side b 
+    of the row elimination system (with B.C. values on Dirichlet rows) to that of the symmetric system.
+    """
+    bc_mask = copy_bc(np.ones(problem.num_total_dofs), problem)
+
+    def fn_dofs_sym(dofs):
+        return (1. - bc_mask)*A_fn((1. - bc_mask)*dofs) + bc_mask*dofs
+
+    def lift_rhs(b):
+        return b - (1. - bc_mask)*A_fn(bc_mask*b)
+
+    return fn_dofs_sym, lift_rhs
+
+
+def get_linear_system(A_fn, problem):
+    """Impose Dirichlet B.C. on the linearized operator.
+
+    Returns
+    -------
+    A_fn : Callable
+        The constrained operator
+    rhs_fn : Callable
+        Transformation of the row elimination right-hand side
+    """
+    if problem.symmetric:
+        return symmetric_elimination(A_fn, problem)
+    return row_elimination(A_fn, problem), lambda b: b
+
+
+def get_active_report(problem):
+    """The solve report of a solver call in progress, or None (finalized reports are not appended to).
+    """
+    report = getattr(problem, 'solve_report', None)
+    if report is None or report.total_time is not None:
+        return None
+    return report
+
+
+def run_krylov(problem, method, A_fn, b, x0, pc, tol, atol, maxiter=10000):
+    """Call jax.scipy.sparse.linalg.cg or bicgstab, recording the true residual and convergence 
+    in problem.solve_report (if a solve report is active). Matvecs and iterations are only counted 
+    if report.count_matvecs, since counting costs a host callback per matvec.
+    """
+    krylov = getattr(jax.scipy.sparse.linalg, method)
+    report = get_active_report(problem)
+    if report is None:
+        return krylov(A_fn, b, x0=x0, M=pc, tol=tol, atol=atol, maxiter=maxiter)
+
+    if report.count_matvecs:
+        counter = MatvecCounter()
+        x, info = krylov(counter.wrap(A_fn), b, x0=x0, M=pc, tol=tol, atol=atol, maxiter=maxiter)
+        matvecs = counter.read()
+        # One matvec for the initial residual, then one (CG) or two (BiCGSTAB) per iteration
+        iterations = matvecs - 1 if method == 'cg' else (matvecs - 1) // 2
+    else:
+        x, info = krylov(A_fn, b, x0=x0, M=pc, tol=tol, atol=atol, maxiter=maxiter)
+        matvecs, iterations = None, None
+    res = np.linalg.norm(A_fn(x) - b)
+    # The stopping criterion of jax.scipy.sparse.linalg, checked on the true residual
+    converged = res <= max(tol*np.linalg.norm(b), atol)
+    report.record_linear_solve(method, matvecs, iterations, res, converged)
+    return x, info
+
+
+def get_krylov_method(problem, pc):
+    """CG for symmetric problems, BiCGSTAB otherwise, or if the preconditioner is flagged as not symmetric positive 
+    definite (pc.spd = False, e.g., ILU).
+    """
+    return 'cg' if problem.symmetric and getattr(pc, 'spd', True) else 'bicgstab'
+
+
+def krylov_solve(problem, A_fn, b, x0, pc, tol=1e-10):
+    """CG for symmetric problems, BiCGSTAB otherwise, to the relative tolerance tol.
+    With problem.precision = 'mixed', the Krylov iterations run in float32 (to the accuracy float32 allows), 
+    optionally followed by problem.iterative_refinement sweeps whose residuals b - A x are computed in float64, 
+    with the float64 Jacobian (see get_A_fn_high_precision).
+    """
+    method = get_krylov_method(problem, pc)
+    if problem.precision != 'mixed':
+        return run_krylov(problem, method, A_fn, b, x0, pc, tol=tol, atol=1e-10)
+
+    dtype = problem.jacobian_dtype
+    A_fn_low = lambda x: A_fn(x).astype(dtype)
+    pc_low = None if pc is None else lambda x: pc(x).astype(dtype)
+
+    def solve_low(r, x0):
+        x, info = run_krylov(problem, method, A_fn_low, r.astype(dtype), x0.astype(dtype), pc_low, tol=max(tol, 1e-6), atol=1e-10)
+        return x.astype(b.dtype), info
+
+    x, info = solve_low(b, x0)
+    A_fn_high = get_A_fn_high_precision(problem) if problem.iterative_refinement > 0 else None
+    for i in range(problem.iterative_refinement):
+        r = b - A_fn_high(x)
+        res_val = np.linalg.norm(r)
+        logger.info(f"Iterative refinement {i}, res = {res_val}")
+        if res_val < max(tol*np.linalg.norm(b), 1e-10):
+            break
+        dx, info = solve_low(r, np.zeros_like(r))
+        x = x + dx
+    return x, info
+
+
+################################################################################
+# Linear solver backends
+#
+# 'jax_krylov': CG/BiCGSTAB of jax.scipy.sparse.linalg on the JAX operator (default, also the only matrix-free option)
+# 'scipy_krylov': CG/BiCGSTAB of scipy.sparse.linalg on the host, with the assembled matrix
+# 'scipy_direct': sparse LU (SuperLU through scipy.sparse.linalg.splu) of the assembled matrix. 
+#                 The factorization is cached on the problem and reused as long as the matrix values are unchanged, 
+#                 e.g., linear time steps with a fixed dt, or the adjoint solve following a linear forward solve.
+
+LINEAR_SOLVERS = ['jax_krylov', 'scipy_krylov', 'scipy_direct']
+
+
+def get_constrained_matrix(problem, symmetric):
+    """Assembled global matrix with Dirichlet B.C. imposed as in get_linear_system: 
+    rows (and columns, if symmetric) of Dirichlet dofs are replaced by those of the identity.
+
+    Returns
+    -------
+    A : scipy.sparse.csr_array
+        (num_total_dofs, num_total_dofs)
+    """
+    bc_mask = onp.ones(problem.num_total_dofs)
+    bc_mask[onp.asarray(problem.bc_dof_inds)] = 0.
+    keep = scipy.sparse.diags(bc_mask)
+    A = keep @ get_host_matrix(problem).astype(onp.float64)
+    if symmetric:
+        A = A @ keep
+    return scipy.sparse.csr_array(A + scipy.sparse.diags(1. - bc_mask))
+
+
+def get_factorization(problem, kind, get_matrix):
+    """LU factorization of the matrix returned by get_matrix(), one cached entry per kind of constrained system 
+    ('row_elimination', 'symmetric', 'lagrange_multiplier') in problem.factorization_cache.
+    The entry is reused if the assembled values problem.A_data, the Dirichlet dofs and the periodic master dofs 
+    (see get_periodic_master_inds) are unchanged.
+
+    Returns
+    -------
+    entry : dict
+        'A' (the factorized matrix) and 'lu' (scipy.sparse.linalg.SuperLU)
+    reused : bool
+    """
+    A_data = onp.asarray(problem.A_data)
+    bc_dof_inds = onp.asarray(problem.bc_dof_inds)
+    master_inds = getattr(problem, 'periodic_master_inds', None)
+    if getattr(problem, 'factorization_cache', None) is None:
+        problem.factorization_cache = {}
+    entry = problem.factorization_cache.get(kind)
+    if entry is not None and onp.array_equal(entry['A_data'], A_data) and \
+       onp.array_equal(entry['bc_dof_inds'], bc_dof_inds) and \
+       onp.array_equal(entry['periodic_master_inds'], master_inds):
+        logger.info(f"Reusing cached LU factorization ({kind})")
+        return entry, True
+
+    logger.info(f"Computing sparse LU factorization ({kind})...")
+    A = scipy.sparse.csc_array(get_matrix())
+    entry = {'A_data': A_data.copy(), 'bc_dof_inds': bc_dof_inds, 'periodic_master_inds': master_inds, 'A': A, 'lu': scipy.sparse.linalg.splu(A)}
+    problem.factorization_cache[kind] = entry
+    return entry, False
+
+
+def direct_solve(problem, kind, get_matrix, b, transpose=False):
+    """Solve A x = b (or A^T x = b) with the cached LU factorization of A = get_matrix().
+    """
+    entry, reused = get_factorization(problem, kind, get_matrix)
+    b = onp.asarray(b, dtype=onp.float64)
+    x = entry['lu'].solve(b, trans='T' if transpose else 'N')
+    A = entry['A'].T if transpose else entry['A']
+    res = onp.linalg.norm(A @ x - b)
+    report = get_active_report(problem)
+    if report is not None:
+        report.record_linear_solve('splu', 0, 0, res, onp.isfinite(res), factorization_reused=reused)
+    return np.array(x), 0
+
+
+def scipy_krylov_solve(problem, method, A, b, x0, pc, transpose=False, tol=1e-10, atol=1e-10, maxiter=10000):
+    """Call scipy.sparse.linalg.cg or bicgstab on the host with the assembled matrix A.
+    The preconditioner pc (a JAX function or None) is wrapped as a scipy LinearOperator.
+    """
+    A = A.T if transpose else A
+    b = onp.asarray(b, dtype=onp.float64)
+    x0 = None if x0 is None else onp.asarray(x0, dtype=onp.float64)
+    M = None if pc is None else scipy.sparse.linalg.LinearOperator(A.shape, 
+        matvec=lambda x: onp.asarray(pc(np.asarray(x)), dtype=onp.float64))
+
+    iterations = [0]
+    def callback(xk):
+        iterations[0] += 1
+
+    krylov = getattr(scipy.sparse.linalg, method)
+    x, info = krylov(A, b, x0=x0, M=M, rtol=tol, atol=atol, maxiter=maxiter, callback=callback)
+    res = onp.linalg.norm(A @ x - b)
+    report = get_active_report(problem)
+    if report is not None:
+        matvecs = 1 + iterations[0]*(1 if method == 'cg' else 2)
+        report.record_linear_solve(f"scipy_{method}", matvecs, iterations[0], res, info == 0 and onp.isfinite(res))
+    return np.array(x), info
+
+
+def solve_with_backend(problem, method, A_fn, b, x0, pc, kind, get_matrix, transpose=False, tol=1e-10):
+    """Dispatch a linear solve to problem.linear_solver, see LINEAR_SOLVERS.
+    A_fn is the JAX operator (only used by 'jax_krylov', which does not support transpose), 
+    get_matrix() returns the same operator as an assembled scipy matrix.
+    tol is the relative tolerance of the Krylov backends, direct solves are exact.
+    """
+    linear_solver = getattr(problem, 'linear_solver', 'jax_krylov')
+    if linear_solver == 'scipy_direct':
+        return direct_solve(problem, kind, get_matrix, b, transpose)
+    if linear_solver == 'scipy_krylov':
+        return scipy_krylov_solve(problem, method, get_matrix(), b, x0, pc, transpose, tol=tol)
+    assert not transpose, f"Transposed solves are not supported by the jax_krylov backend"
+    return run_krylov(problem, method, A_fn, b, x0, pc, tol=tol, atol=1e-10)
+
+
+def linear_solve(problem, A_fn, b, x0, pc, tol=1e-10):
+    """Solve the linearized system of the row elimination solver with problem.linear_solver.
+    """
+    if getattr(problem, 'linear_solver', 'jax_krylov') == 'jax_krylov':
+        return krylov_solve(problem, A_fn, b, x0, pc, tol)
+    method = get_krylov_method(problem, pc)
+    kind = 'symmetric' if problem.symmetric else 'row_elimination'
+    get_matrix = lambda: get_constrained_matrix(problem, problem.symmetric)
+    return solve_with_backend(problem, method, A_fn, b, x0, pc, kind, get_matrix, tol=tol)
+
+
 def assign_bc(dofs, problem):
-    sol = dofs.reshape((problem.num_total_nodes, problem.vec))
-    for i in range(len(problem.node_inds_list)):
-        sol = sol.at[problem.node_inds_list[i], problem.vec_inds_list[i]].set(problem.vals_list[i])
-    return sol.reshape(-1)
+    return dofs.reshape(-1).at[problem.bc_dof_inds].set(problem.bc_vals, indices_are_sorted=True, unique_indices=True)
 
  
 def assign_ones_bc(dofs, problem):
-    sol = dofs.reshape((problem.num_total_nodes, problem.vec))
-    for i in range(len(problem.node_inds_list)):
-        sol = sol.at[problem.node_inds_list[i], problem.vec_inds_list[i]].set(1.)
-    return sol.reshape(-1)
+    return dofs.reshape(-1).at[problem.bc_dof_inds].set(1., indices_are_sorted=True, unique_indices=True)
 
 
 def copy_bc(dofs, problem):
-    sol = dofs.reshape((problem.num_total_nodes, problem.vec))
-    new_sol = np.zeros_like(sol)
-    for i in range(len(problem.node_inds_list)):
-        new_sol = (new_sol.at[problem.node_inds_list[i], problem.vec_inds_list[i]].set(sol[problem.node_inds_list[i], 
-            problem.vec_inds_list[i]]))
-    return new_sol.reshape(-1)
+    dofs = dofs.reshape(-1)
+    return np.zeros_like(dofs).at[problem.bc_dof_inds].set(dofs[problem.bc_dof_inds], 
+                                                           indices_are_sorted=True, unique_indices=True)
 
 
 def get_flatten_fn(fn_sol, problem):
@@ -102,8 +324,13 @@ def operator_to_matrix(operator_fn, problem):
 
 
 def jacobi_preconditioner(problem):
-    print(f"Compute and use jacobi preconditioner")
-    jacobi = np.array(problem.A_sp_scipy.diagonal())
+    logger.info(f"Compute and use jacobi preconditioner")
+    if getattr(problem, 'matrix_free', False):
+        jacobi = np.array(problem.A_diag)
+    else:
+        master_inds = getattr(problem, 'periodic_master_inds', None)
+        periodic_data = None if master_inds is None else get_periodic_data(problem, master_inds)
+        jacobi = assembled_diagonal(problem.assembly_plan, np.array(problem.A_data), periodic_data)
     jacobi = assign_ones_bc(jacobi.reshape(-1), problem) 
     return jacobi
 
@@ -114,115 +341,490 @@ def get_jacobi_precond(jacobi):
     return jacobi_precond
 
 
+def amg_preconditioner(problem):
+    """Smoothed aggregation AMG V-cycle, set up on the host from the assembled matrix with Dirichlet B.C. imposed.
+    The near-nullspace are rigid body modes of problem.points for mechanics (vec == dim), constants otherwise.
+
+    The hierarchy is cached in problem.amg_cache. The sparsity pattern is fixed by problem.assembly_plan, 
+    so if the Dirichlet dofs and the periodic master dofs are unchanged (e.g., later Newton iterations), 
+    only its values are recomputed, see SmoothedAggregationAMG.update.
+    """
+    logger.info(f"Compute and use smoothed aggregation AMG preconditioner")
+    if getattr(problem, 'matrix_free', False):
+        raise NotImplementedError(f"The AMG preconditioner needs the assembled matrix, not available in matrix-free mode.")
+    A = get_constrained_matrix(problem, problem.symmetric)
+    bc_dof_inds = onp.asarray(problem.bc_dof_inds)
+    master_inds = getattr(problem, 'periodic_master_inds', None)
+    cache = getattr(problem, 'amg_cache', None)
+    if cache is not None and onp.array_equal(cache['bc_dof_inds'], bc_dof_inds) and \
+       onp.array_equal(cache['periodic_master_inds'], master_inds):
+        logger.info(f"Reusing the AMG aggregates, updating values")
+        amg = cache['amg'].update(A)
+    else:
+        B = near_nullspace(problem.points, problem.vec, problem.dim)
+        B[bc_dof_inds] = 0.
+        if master_inds is not None:
+            B[onp.asarray(get_slave_mask(problem)) == 1.] = 0.
+        amg = SmoothedAggregationAMG(A, B, dof_to_node=onp.arange(problem.num_total_dofs)//problem.vec)
+        problem.amg_cache = {'bc_dof_inds': bc_dof_inds, 'periodic_master_inds': master_inds, 'amg': amg}
+    logger.info(amg)
+    return amg.get_precond()
+
+
+def block_jacobi_preconditioner(problem):
+    """Inverses of the vec x vec node-diagonal blocks of the Jacobian, extracted from the assembled data.
+    Rows (and columns, if symmetric) of Dirichlet dofs are replaced by those of the identity, as in get_linear_system.
+
+    Returns
+    -------
+    inv_blocks : np.DeviceArray
+        (num_total_nodes, vec, vec)
+    """
+    logger.info(f"Compute and use node-block jacobi preconditioner")
+    if getattr(problem, 'matrix_free', False):
+        raise NotImplementedError(f"The block jacobi preconditioner needs the assembled matrix, not available in matrix-free mode.")
+    if getattr(problem, 'periodic_master_inds', None) is not None:
+        blocks = np.array(node_blocks(get_host_matrix(problem), problem.vec))
+    else:
+        blocks = np.array(problem.assembly_plan.block_diagonal(problem.A_data), dtype=np.float64)
+    bc_mask = copy_bc(np.ones(problem.num_total_dofs), problem)
+    return invert_node_blocks(blocks, bc_mask, problem.symmetric)
+
+
+def invert_node_blocks(blocks, bc_mask, symmetric):
+    """Batched inverse of node-diagonal blocks (num_total_nodes, vec, vec) after imposing Dirichlet B.C., 
+    where bc_mask (num_total_dofs,) is one on Dirichlet dofs
+    """
+    bc_mask = bc_mask.reshape(blocks.shape[:2])
+    blocks = blocks*(1. - bc_mask)[:, :, None]
+    if symmetric:
+        blocks = blocks*(1. - bc_mask)[:, None, :]
+    blocks = blocks + jax.vmap(np.diag)(bc_mask)
+    return np.linalg.inv(blocks)
+
+
+def get_block_jacobi_precond(inv_blocks):
+    def block_jacobi_precond(x):
+        x = x.reshape(inv_blocks.shape[:2])
+        return np.einsum('nab,nb->na', inv_blocks.astype(x.dtype), x).reshape(-1)
+    return block_jacobi_precond
+
+
+def ilu_preconditioner(problem):
+    """Incomplete LU factorization (scipy.sparse.linalg.spilu without fill beyond the nonzeros of A, i.e., ILU(0)-like)
+    of the assembled matrix with Dirichlet B.C. imposed, applied on the host through jax.pure_callback.
+
+    scipy provides no incomplete Cholesky, and the ILU inverse (or its symmetric part) is not guaranteed to be 
+    symmetric positive definite, so the preconditioner is flagged with spd = False and symmetric problems are 
+    solved with BiCGSTAB instead of CG, see get_krylov_method.
+    """
+    logger.info(f"Compute and use ILU preconditioner")
+    if getattr(problem, 'matrix_free', False):
+        raise NotImplementedError(f"The ILU preconditioner needs the assembled matrix, not available in matrix-free mode.")
+    A = scipy.sparse.csc_array(get_constrained_matrix(problem, problem.symmetric))
+    # Symmetric fill-reducing ordering and no pivoting, so that the factors keep the structure of A
+    ilu = scipy.sparse.linalg.spilu(A, drop_tol=0., fill_factor=1., permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0., 
+                                    options={'SymmetricMode': True})
+
+    def ilu_solve(x):
+        return ilu.solve(onp.asarray(x, dtype=onp.float64)).astype(x.dtype)
+
+    def ilu_precond(x):
+        return jax.pure_callback(ilu_solve, jax.ShapeDtypeStruct(x.shape, x.dtype), x)
+
+    ilu_precond.spd = False
+    return ilu_precond
+
+
+PRECONDITIONERS = ['jacobi', 'block_jacobi', 'ilu', 'amg']
+
+
+def get_preconditioner(problem, precond):
+    """precond is a bool (True means 'jacobi') or one of PRECONDITIONERS.
+    """
+    if precond is True:
+        precond = 'jacobi'
+    if not precond:
+        return None
+    if precond == 'jacobi':
+        return get_jacobi_precond(jacobi_preconditioner(problem))
+    if precond == 'block_jacobi':
+        return get_block_jacobi_precond(block_jacobi_preconditioner(problem))
+    if precond == 'ilu':
+        return ilu_preconditioner(problem)
+    if precond == 'amg':
+        return amg_preconditioner(problem)
+    raise ValueError(f"Unknown preconditioner {precond}, choose from {PRECONDITIONERS}")
+
+
 def test_jacobi_precond(problem, jacobi, A_fn):
     num_total_dofs = problem.num_total_nodes*problem.vec
     for ind in range(500):
         test_vec = np.zeros(num_total_dofs)
         test_vec = test_vec.at[ind].set(1.)
-        print(f"{A_fn(test_vec)[ind]}, {jacobi[ind]}, ratio = {A_fn(test_vec)[ind]/jacobi[ind]}")
+        logger.debug(f"{A_fn(test_vec)[ind]}, {jacobi[ind]}, ratio = {A_fn(test_vec)[ind]/jacobi[ind]}")
 
-    print(f"test jacobi preconditioner")
-    print(f"np.min(jacobi) = {np.min(jacobi)}, np.max(jacobi) = {np.max(jacobi)}")
-    print(f"finish jacobi preconditioner")
+    logger.debug(f"test jacobi preconditioner")
+    logger.debug(f"np.min(jacobi) = {np.min(jacobi)}, np.max(jacobi) = {np.max(jacobi)}")
+    logger.debug(f"finish jacobi preconditioner")
  
 
-def linear_guess_solve(problem, A_fn, precond):
-    print(f"Linear guess solve...")
+def linear_guess_solve(problem, A_fn, precond, rhs_fn=lambda b: b):
+    logger.info(f"Linear guess solve...")
 
     # b = np.zeros((problem.num_total_nodes, problem.vec))
-    b = problem.body_force + problem.neumann
+    b = condense_vec(problem, problem.body_force + problem.neumann)
     b = assign_bc(b, problem)
-    pc = get_jacobi_precond(jacobi_preconditioner(problem)) if precond else None
+    x0 = b
+    b = rhs_fn(b)
+    pc = get_preconditioner(problem, precond)
 
-    dofs, info = jax.scipy.sparse.linalg.bicgstab(A_fn, b, x0=b, M=pc, tol=1e-10, atol=1e-10, maxiter=10000)
-    print(f"Linear guess solve res = {np.linalg.norm(A_fn(dofs) - b)}")
+    dofs, info = linear_solve(problem, A_fn, b, x0, pc)
+    logger.info(f"Linear guess solve res = {np.linalg.norm(A_fn(dofs) - b)}")
 
-    return dofs
+    return expand_vec(problem, dofs)
 
 
-def linear_incremental_solver(problem, res_vec, A_fn, dofs, precond):
+def linear_incremental_solver(problem, res_vec, A_fn, dofs, precond, rhs_fn=lambda b: b, tol=1e-10):
     """Lift solver
+    precond is either an option of get_preconditioner or an already built preconditioner (a callable).
+    tol is the relative tolerance of the linear solve.
     """
-    b = -res_vec
-    pc = get_jacobi_precond(jacobi_preconditioner(problem)) if precond else None
+    b = rhs_fn(-res_vec)
+    pc = precond if callable(precond) else get_preconditioner(problem, precond)
 
     x0_1 = assign_bc(np.zeros_like(b), problem) 
     x0_2 = copy_bc(dofs, problem)
     x0 = x0_1 - x0_2
 
-    print(f"Solving linear system with lift solver...")
-    inc, info = jax.scipy.sparse.linalg.bicgstab(A_fn, b, x0=x0, M=pc, tol=1e-10, atol=1e-10, maxiter=10000) # bicgstab, gmres
-    print(f"Lift linear solver res = {np.linalg.norm(A_fn(inc) - b)}, inc norm = {np.linalg.norm(inc)}")
+    logger.info(f"Solving linear system with lift solver...")
+    inc, info = linear_solve(problem, A_fn, b, x0, pc, tol)
+    logger.info(f"Lift linear solver res = {np.linalg.norm(A_fn(inc) - b)}, inc norm = {np.linalg.norm(inc)}")
 
-    dofs = dofs + inc
+    dofs = dofs + expand_vec(problem, inc)
     return dofs
 
 
 def get_A_fn(problem):
-    print(f"Creating sparse matrix with scipy...")
-    A_sp_scipy = scipy.sparse.csc_array((problem.V, (problem.I, problem.J)), shape=(problem.num_total_dofs, problem.num_total_dofs))
-    print(f"Creating sparse matrix from scipy using JAX BCOO...")
-    A_sp = BCOO.from_scipy_sparse(A_sp_scipy).sort_indices()
-    print(f"self.A_sp.data.shape = {A_sp.data.shape}")
-    print(f"Global sparse matrix takes about {A_sp.data.shape[0]*8*3/2**30} G memory to store.")
-    problem.A_sp_scipy = A_sp_scipy
+    """Sparse matrix-vector product with the assembled data problem.A_data (condensed with periodic B.C.).
+    The host scipy matrix is only built when needed, see get_host_matrix.
+    """
+    logger.info(f"self.A_sp.data.shape = {problem.A_data.shape}")
+    logger.info(f"Global sparse matrix takes about {problem.A_data.shape[0]*8*3/2**30} G memory to store.")
+    compute_linearized_residual = problem.assembly_plan.get_matvec(problem.A_data)
+    if getattr(problem, 'periodic_master_inds', None) is not None:
+        logger.info(f"Condensing periodic B.C.: P^T A P")
+        compute_linearized_residual = condense_operator(compute_linearized_residual, problem)
+    problem.A_sp_scipy = None
+    return compute_linearized_residual
+
+
+def get_host_matrix(problem):
+    """Assembled global matrix as a scipy matrix on the host (condensed as P^T A P with periodic B.C.), 
+    for the scipy linear solvers and the ILU and AMG preconditioners. In symmetric mode, the full matrix is 
+    formed from the stored upper triangle, so it is only built on first use after each get_A_fn (never by 
+    the JAX Krylov solvers and the jacobi preconditioners) and cached in problem.A_sp_scipy.
+
+    Returns
+    -------
+    A : scipy.sparse.csr_array
+        (num_total_dofs, num_total_dofs)
+    """
+    if getattr(problem, 'A_sp_scipy', None) is None:
+        logger.info(f"Creating sparse matrix from assembly plan...")
+        A_sp_scipy = problem.assembly_plan.to_scipy(problem.A_data)
+        if getattr(problem, 'periodic_master_inds', None) is not None:
+            A_sp_scipy = condense_matrix(A_sp_scipy, problem)
+        problem.A_sp_scipy = A_sp_scipy
+    return problem.A_sp_scipy
+
+
+def get_A_fn_matrix_free(problem, high_precision=False):
+    """Jacobian-vector products through per-cell JVPs of the kernels, without forming any global matrix.
+    Must be called after problem.newton_update, which stores the linearization point.
+    """
+    logger.info(f"Using matrix-free linearized operator...")
+    sol_shape = (problem.num_total_nodes, problem.vec)
 
     def compute_linearized_residual(dofs):
-        return A_sp @ dofs
+        return problem.compute_linearized_residual(dofs.reshape(sol_shape), high_precision).reshape(-1)
 
     return compute_linearized_residual
 
 
-def solver_row_elimination(problem, linear=False, precond=True, initial_guess=None):
+def get_A_fn_high_precision(problem):
+    """float64 counterpart of the constrained operator of the row elimination solver (periodic condensation 
+    and Dirichlet elimination included), for the residuals of iterative refinement with precision='mixed'. 
+    The stored Jacobian is float32, so the float64 Jacobian is applied matrix-free at the linearization point.
+    """
+    A_fn = get_A_fn_matrix_free(problem, high_precision=True)
+    if getattr(problem, 'periodic_master_inds', None) is not None:
+        A_fn = condense_operator(A_fn, problem)
+    A_fn, _ = get_linear_system(A_fn, problem)
+    return A_fn
+
+
+NEWTON_OPTIONS = {'tol': 1e-6, 'rel_tol': 0., 'max_iter': 50, 'forcing': 'constant', 'linear_tol': 1e-10, 
+                  'line_search': False, 'jacobian_lag': 1, 'divergence_factor': 1e6}
+
+
+def get_newton_options(newton_options):
+    """NEWTON_OPTIONS overridden by newton_options, checked
+    """
+    options = {**NEWTON_OPTIONS, **(newton_options or {})}
+    unknown = set(options).difference(NEWTON_OPTIONS)
+    assert not unknown, f"Unknown newton_options {unknown}, choose from {list(NEWTON_OPTIONS)}"
+    assert options['forcing'] in ['constant', 'eisenstat_walker'], f"Unknown forcing {options['forcing']}"
+    return options
+
+
+def eisenstat_walker(eta_prev, res_val, res_prev, target, eta_0=0.3, eta_max=0.9, gamma=1., 
+                     alpha=(1. + 5.**0.5)/2., threshold=0.1):
+    """Forcing term (relative tolerance of the next linear solve) of an inexact Newton method, 
+    choice 2 of Eisenstat and Walker with safeguards (the defaults follow PETSc's KSP_EW).
+
+    Reference:
+    Eisenstat, Stanley C., and Homer F. Walker. 
+    "Choosing the forcing terms in an inexact Newton method." 
+    SIAM Journal on Scientific Computing 17.1 (1996): 16-32.
+    """
+    if eta_prev is None:
+        return eta_0
+    # jax.numpy operations, so that the same function runs inside solver_jit
+    eta = gamma*(res_val/res_prev)**alpha
+    safeguard = gamma*eta_prev**alpha
+    eta = np.where(safeguard > threshold, np.maximum(eta, safeguard), eta)
+    # Solving much below the nonlinear tolerance is wasted work
+    eta = np.maximum(eta, 0.5*target/res_val)
+    return np.minimum(eta, eta_max)
+
+
+def solver_row_elimination(problem, linear=False, precond=True, initial_guess=None, matrix_free=False, 
+                           newton_options=None):
     """Imposing Dirichlet B.C. with "row elimination" method.
+
+    If matrix_free is True, the Jacobian is only applied through JVPs (Newton–Krylov), 
+    and the Jacobi preconditioner is built from the Jacobian diagonal alone.
+    This trades extra kernel evaluations per Krylov iteration for not storing cell Jacobians.
+
+    newton_options overrides entries of NEWTON_OPTIONS:
+    tol, rel_tol : float
+        Newton stops when the residual l_2 norm is below max(tol, rel_tol*initial residual)
+    max_iter : int
+        Maximum number of Newton iterations. If reached, the solution is returned with solve_report.converged False.
+    forcing : str
+        'constant' solves every linear system to the relative tolerance linear_tol, 
+        'eisenstat_walker' adapts it to the Newton convergence, so that early iterations are solved loosely.
+    linear_tol : float
+    line_search : bool
+        Backtracking (halving the step) until the residual norm decreases sufficiently
+    jacobian_lag : int
+        Modified Newton: the Jacobian and preconditioner are only updated every jacobian_lag iterations.
+    divergence_factor : float
+        A RuntimeError is raised if the residual norm becomes non-finite or exceeds divergence_factor times 
+        the initial one.
+
+    Line search and jacobian_lag > 1 evaluate residuals alone with problem.compute_residual, 
+    which must then be consistent with problem.newton_update.
     """
-    print(f"Calling the row elimination solver for imposing Dirichlet B.C.")
-    print("Start timing")
+    logger.info(f"Calling the row elimination solver for imposing Dirichlet B.C.")
+    logger.info("Start timing")
     start = time.time()
     sol_shape = (problem.num_total_nodes, problem.vec)
     dofs = np.zeros(sol_shape).reshape(-1)
+    problem.matrix_free = matrix_free
+    report = problem.solve_report = SolveReport(problem)
 
     def newton_update_helper(dofs):
-        res_vec = problem.newton_update(dofs.reshape(sol_shape)).reshape(-1)
-        res_vec = apply_bc_vec(res_vec, dofs, problem)
-        A_fn = get_A_fn(problem)
-        A_fn = row_elimination(A_fn, problem)
-        return res_vec, A_fn
+        res_vec = report.timed('newton_update', problem.newton_update, dofs.reshape(sol_shape)).reshape(-1)
+        res_vec = apply_bc_vec(condense_vec(problem, res_vec), dofs, problem)
+        if matrix_free:
+            A_fn = get_A_fn_matrix_free(problem)
+        else:
+            A_fn = report.timed('assemble_matrix', get_A_fn, problem)
+        A_fn, rhs_fn = get_linear_system(A_fn, problem)
+        return res_vec, A_fn, rhs_fn
+
+    options = get_newton_options(newton_options)
 
-    # TODO: detect np.nan and assert
+    def residual_helper(dofs):
+        res_vec = report.timed('residual', problem.compute_residual, dofs.reshape(sol_shape)).reshape(-1)
+        return apply_bc_vec(condense_vec(problem, res_vec), dofs, problem)
+
+    def line_search(dofs, inc, res_val, eta, max_halvings=10):
+        """Backtracking with the sufficient decrease condition of inexact Newton methods
+        """
+        step = 1.
+        for i in range(max_halvings):
+            res_vec = residual_helper(dofs + step*inc)
+            res_trial = np.linalg.norm(res_vec)
+            if res_trial <= (1. - 1e-4*step*(1. - eta))*res_val:
+                break
+            step = step/2.
+        logger.info(f"Line search step = {step}, res l_2 = {res_trial}")
+        return dofs + step*inc, res_vec, step
+
+    newton_converged = True
     if linear:
         dofs = assign_bc(dofs, problem)
-        res_vec, A_fn = newton_update_helper(dofs)
-        dofs = linear_incremental_solver(problem, res_vec, A_fn, dofs, precond)
+        res_vec, A_fn, rhs_fn = newton_update_helper(dofs)
+        report.newton_res_history.append(np.linalg.norm(res_vec))
+        dofs = report.timed('linear_solve', linear_incremental_solver, problem, res_vec, A_fn, dofs, precond, rhs_fn)
     else:
         if initial_guess is None:
-            res_vec, A_fn = newton_update_helper(dofs)
+            res_vec, A_fn, rhs_fn = newton_update_helper(dofs)
             # TODO: If dofs not satisfying B.C., nan occurs. Why?
-            dofs = linear_guess_solve(problem, A_fn, precond)
+            dofs = report.timed('linear_solve', linear_guess_solve, problem, A_fn, precond, rhs_fn)
         else:
-            dofs = initial_guess.reshape(-1)
+            dofs = expand_vec(problem, initial_guess.reshape(-1))
 
-        res_vec, A_fn = newton_update_helper(dofs)
+        res_vec, A_fn, rhs_fn = newton_update_helper(dofs)
+        pc = report.timed('precond', get_preconditioner, problem, precond)
         res_val = np.linalg.norm(res_vec)
-        print(f"Before, res l_2 = {res_val}") 
-        tol = 1e-6
-        while res_val > tol:
-            dofs = linear_incremental_solver(problem, res_vec, A_fn, dofs, precond)
-            res_vec, A_fn = newton_update_helper(dofs)
+        report.newton_res_history.append(res_val)
+        logger.info(f"Before, res l_2 = {res_val}") 
+        res_0 = res_val
+        target = max(options['tol'], options['rel_tol']*res_0)
+        eta, res_prev = None, None
+        num_iter = 0
+        while res_val > target:
+            if num_iter == options['max_iter']:
+                logger.warning(f"Newton solver reached max_iter = {num_iter} with res l_2 = {res_val} > {target}")
+                newton_converged = False
+                break
+
+            if options['forcing'] == 'eisenstat_walker':
+                eta = float(eisenstat_walker(eta, res_val, res_prev, target))
+            else:
+                eta = options['linear_tol']
+            dofs_new = report.timed('linear_solve', linear_incremental_solver, problem, res_vec, A_fn, dofs, pc, rhs_fn, eta)
+            num_iter += 1
+            if options['line_search']:
+                dofs, res_vec, step = line_search(dofs, dofs_new - dofs, res_val, eta)
+                report.newton_step_lengths.append(step)
+            else:
+                dofs = dofs_new
+
+            if num_iter % options['jacobian_lag'] == 0:
+                res_vec, A_fn, rhs_fn = newton_update_helper(dofs)
+                pc = report.timed('precond', get_preconditioner, problem, precond)
+            elif not options['line_search']:
+                res_vec = residual_helper(dofs)
+
             # test_jacobi_precond(problem, jacobi_preconditioner(problem, dofs), A_fn)
-            res_val = np.linalg.norm(res_vec)
-            print(f"res l_2 = {res_val}") 
-            
+            res_prev, res_val = res_val, np.linalg.norm(res_vec)
+            report.newton_res_history.append(res_val)
+            logger.info(f"res l_2 = {res_val}") 
+            if not np.isfinite(res_val) or res_val > options['divergence_factor']*res_0:
+                report.finalize(problem, newton_converged=False)
+                raise RuntimeError(f"Newton solver diverged: res l_2 = {res_val}, initial res l_2 = {res_0}")
+
     sol = dofs.reshape(sol_shape)
     end = time.time()
     solve_time = end - start
-    print(f"Solve took {solve_time} [s]")
-    print(f"max of sol = {np.max(sol)}")
-    print(f"min of sol = {np.min(sol)}")
+    report.finalize(problem, newton_converged=newton_converged)
+    logger.info(f"Solve took {solve_time} [s]")
+    logger.info(f"max of sol = {np.max(sol)}")
+    logger.info(f"min of sol = {np.min(sol)}")
+    logger.info(report)
 
     return sol
 
 
+################################################################################
+# Master-slave elimination of periodic B.C.
+#
+# Each periodic pair u_A = u_B ties dofs into groups. One dof of each group (a Dirichlet dof if the group has one) 
+# is kept as the master, the others are slaves: u = P u_m, where P has a single one per row. 
+# The condensed system P^T A P is kept in the full dof numbering, with identity rows and columns on slave dofs, 
+# so that Dirichlet B.C. elimination, preconditioners and linear solver backends apply unchanged.
+
+def get_periodic_master_inds(problem):
+    """Master dof of each dof from the periodic pairs of problem.periodic_bc_info, i.e., the column of P.
+
+    Returns
+    -------
+    master_inds : onp.ndarray
+        (num_total_dofs,) master_inds[i] == i for dofs that are not slaves
+    """
+    num_dofs = problem.num_total_dofs
+    dofs_A = [problem.vec*onp.asarray(node_inds, dtype=onp.int64) + vec_inds 
+              for node_inds, vec_inds in zip(problem.p_node_inds_list_A, problem.p_vec_inds_list)]
+    dofs_B = [problem.vec*onp.asarray(node_inds, dtype=onp.int64) + vec_inds 
+              for node_inds, vec_inds in zip(problem.p_node_inds_list_B, problem.p_vec_inds_list)]
+    dofs_A = onp.hstack(dofs_A + [onp.zeros(0, dtype=onp.int64)])
+    dofs_B = onp.hstack(dofs_B + [onp.zeros(0, dtype=onp.int64)])
+    # Groups are the connected components of the pair graph, e.g., a corner node paired along several directions
+    graph = scipy.sparse.csr_array((onp.ones(len(dofs_A)), (dofs_A, dofs_B)), shape=(num_dofs, num_dofs))
+    num_groups, labels = scipy.sparse.csgraph.connected_components(graph, directed=False)
+    # Master: the Dirichlet dof with the smallest index if any, otherwise the smallest index
+    keys = onp.arange(num_dofs) + num_dofs
+    keys[onp.asarray(problem.bc_dof_inds)] -= num_dofs
+    master_keys = onp.full(num_groups, 2*num_dofs)
+    onp.minimum.at(master_keys, labels, keys)
+    return master_keys[labels] % num_dofs
+
+
+def condense_vec(problem, vec):
+    """P^T vec in the full dof numbering (zero on slave dofs), identity if periodic B.C. are not condensed
+    """
+    master_inds = getattr(problem, 'periodic_master_inds', None)
+    if master_inds is None:
+        return vec
+    return jax.ops.segment_sum(vec.reshape(-1), master_inds, num_segments=problem.num_total_dofs)
+
+
+def expand_vec(problem, vec):
+    """P vec: slave dofs take the values of their masters
+    """
+    master_inds = getattr(problem, 'periodic_master_inds', None)
+    if master_inds is None:
+        return vec
+    return vec.reshape(-1)[master_inds]
+
+
+def get_slave_mask(problem):
+    return np.array(problem.periodic_master_inds != onp.arange(problem.num_total_dofs), dtype=np.float64)
+
+
+def condense_operator(A_fn, problem):
+    """P^T A P with identity on slave dofs, from the product with A
+    """
+    slave_mask = get_slave_mask(problem)
+
+    def condensed_A_fn(dofs):
+        return condense_vec(problem, A_fn(expand_vec(problem, dofs))) + slave_mask*dofs
+
+    return condensed_A_fn
+
+
+def condense_matrix(A, problem):
+    """Assembled counterpart of condense_operator
+
+    Returns
+    -------
+    A : scipy.sparse.csr_array
+        (num_total_dofs, num_total_dofs)
+    """
+    num_dofs = problem.num_total_dofs
+    P = scipy.sparse.csr_array((onp.ones(num_dofs), (onp.arange(num_dofs), problem.periodic_master_inds)), 
+                               shape=(num_dofs, num_dofs))
+    A = P.T @ A @ P + scipy.sparse.diags(onp.asarray(get_slave_mask(problem)))
+    A = scipy.sparse.csr_array(A)
+    A.sort_indices()
+    return A
+
+
+def node_blocks(A, vec):
+    """Node-diagonal blocks (num_nodes, vec, vec) of an assembled scipy matrix
+    """
+    A = A.tocoo()
+    on_block = A.row//vec == A.col//vec
+    blocks = onp.zeros((A.shape[0]//vec, vec, vec))
+    onp.add.at(blocks, (A.row[on_block]//vec, A.row[on_block] % vec, A.col[on_block] % vec), A.data[on_block])
+    return blocks
+
+
 ################################################################################
 # Lagrangian multiplier solver
 
@@ -244,23 +846,25 @@ def aug_dof_w_bc(problem, dofs, p_num_eps):
     return np.hstack((dofs, aug_d))
 
 
-def linear_guess_solve_lm(problem, A_fn_aug, p_num_eps):
+def linear_guess_solve_lm(problem, A_fn_aug, p_num_eps, pc=None):
     x0 = np.zeros((problem.num_total_nodes, problem.vec))
     x0 = assign_bc(x0, problem)
     x0 = aug_dof_w_zero_bc(problem, x0)
     b = np.zeros(problem.num_total_dofs)
     b_aug = aug_dof_w_bc(problem, b, p_num_eps)
-    dofs_aug, info = jax.scipy.sparse.linalg.bicgstab(A_fn_aug, b_aug, x0=x0, M=None, tol=1e-10, atol=1e-10, maxiter=10000)
+    dofs_aug, info = solve_with_backend(problem, 'bicgstab', A_fn_aug, b_aug, x0, pc, 'lagrange_multiplier', 
+                                        lambda: problem.A_sp_scipy_aug)
     return dofs_aug
 
 
-def linear_incremental_solver_lm(problem, res_fn, A_fn_aug, dofs_aug, p_num_eps):
+def linear_incremental_solver_lm(problem, res_fn, A_fn_aug, dofs_aug, p_num_eps, pc=None, tol=1e-10):
     """
     Lift solver
     dofs must already satisfy Dirichlet boundary conditions
     """
     b_aug = -compute_residual_lm(problem, res_fn, dofs_aug, p_num_eps)
-    inc_aug, info = jax.scipy.sparse.linalg.bicgstab(A_fn_aug, b_aug, x0=None, M=None, tol=1e-10, atol=1e-10, maxiter=10000) # bicgstab
+    inc_aug, info = solve_with_backend(problem, 'bicgstab', A_fn_aug, b_aug, None, pc, 'lagrange_multiplier', 
+                                       lambda: problem.A_sp_scipy_aug, tol=tol)
     dofs_aug = dofs_aug + inc_aug
     return dofs_aug
 
@@ -343,16 +947,18 @@ def get_A_fn_aug(problem, p_num_eps):
         group_index += group_size
     I_p_sym, J_p_sym, V_p_sym = symmetry(I_p, J_p, V_p)
 
-    I = onp.hstack((problem.I, I_d_sym, I_p_sym))
-    J = onp.hstack((problem.J, J_d_sym, J_p_sym))
-    V = onp.hstack((problem.V, V_d_sym, V_p_sym))
+    problem.A_sp_scipy = None
+    A_sp_scipy = get_host_matrix(problem).tocoo()
+    I = onp.hstack((A_sp_scipy.row, I_d_sym, I_p_sym))
+    J = onp.hstack((A_sp_scipy.col, J_d_sym, J_p_sym))
+    V = onp.hstack((A_sp_scipy.data, V_d_sym, V_p_sym))
 
-    print(f"Aug - Creating sparse matrix with scipy...")
+    logger.info(f"Aug - Creating sparse matrix with scipy...")
     A_sp_scipy_aug = scipy.sparse.csc_array((V, (I, J)), shape=(group_index, group_index))
-    print(f"Aug - Creating sparse matrix from scipy using JAX BCOO...")
+    logger.info(f"Aug - Creating sparse matrix from scipy using JAX BCOO...")
     A_sp_aug = BCOO.from_scipy_sparse(A_sp_scipy_aug).sort_indices()
-    print(f"Aug - self.A_sp.data.shape = {A_sp_aug.data.shape}")
-    print(f"Aug - Global sparse matrix takes about {A_sp_aug.data.shape[0]*8*3/2**30} G memory to store.")
+    logger.info(f"Aug - self.A_sp.data.shape = {A_sp_aug.data.shape}")
+    logger.info(f"Aug - Global sparse matrix takes about {A_sp_aug.data.shape[0]*8*3/2**30} G memory to store.")
     problem.A_sp_scipy_aug = A_sp_scipy_aug
 
     def compute_linearized_residual(dofs_aug):
@@ -361,99 +967,609 @@ def get_A_fn_aug(problem, p_num_eps):
     return compute_linearized_residual
 
 
-def solver_lagrange_multiplier(problem, linear=False):
+def default_p_num_eps(problem):
+    """Scaling of the constraint blocks of the augmented matrix: the mean magnitude of the diagonal of A, 
+    so that constraint rows and columns are commensurate with those of A
+    """
+    diag = onp.abs(onp.asarray(problem.assembly_plan.diagonal(problem.A_data), dtype=onp.float64))
+    diag = diag[diag > 0.]
+    return float(onp.mean(diag)) if len(diag) > 0 else 1.
+
+
+def lagrange_multiplier_preconditioner(problem, precond):
+    """Block upper triangular preconditioner of the augmented matrix [A C; C^T 0], with C = p_num_eps*B:
+    M = [A_hat  C
+         0     -S_hat]
+    where A_hat is the preconditioner precond of A (see PRECONDITIONERS) 
+    and S_hat = diag(C^T diag(A)^{-1} C) approximates the Schur complement C^T A^{-1} C of the constraint block.
+    Must be called after get_A_fn_aug.
+
+    Reference:
+    Benzi, Michele, Gene H. Golub, and Jörg Liesen. 
+    "Numerical solution of saddle point problems." 
+    Acta Numerica 14 (2005): 1-137.
+    """
+    if precond is True:
+        precond = 'jacobi'
+    if not precond:
+        return None
+    logger.info(f"Compute and use block triangular preconditioner for the augmented system")
+    num_dofs = problem.num_total_dofs
+    C = scipy.sparse.csr_array(problem.A_sp_scipy_aug)[:num_dofs, num_dofs:]
+    diag = onp.abs(problem.A_sp_scipy.diagonal())
+    diag = onp.where(diag > 0., diag, 1.)
+    schur = np.array((C**2).T @ (1./diag))
+    C = BCOO.from_scipy_sparse(C).sort_indices()
+    # Dirichlet dofs are constrained by multipliers, so the diagonal (blocks) of A itself are used. 
+    # The host preconditioners need a nonsingular matrix and are built with Dirichlet B.C. eliminated.
+    if precond == 'jacobi':
+        pc_A = get_jacobi_precond(np.array(diag))
+    elif precond == 'block_jacobi':
+        blocks = np.array(problem.assembly_plan.block_diagonal(problem.A_data), dtype=np.float64)
+        pc_A = get_block_jacobi_precond(np.linalg.inv(blocks))
+    else:
+        pc_A = get_preconditioner(problem, precond)
+
+    def lagrange_multiplier_precond(x):
+        y_lmbda = -x[num_dofs:]/schur
+        y_dofs = pc_A(x[:num_dofs] - C @ y_lmbda)
+        return np.hstack((y_dofs, y_lmbda))
+
+    return lagrange_multiplier_precond
+
+
+def solver_lagrange_multiplier(problem, linear=False, precond=True, newton_options=None):
     """Imposing Dirichlet B.C. and periodic B.C. with lagrangian multiplier method.
 
     The global matrix is of the form 
     [A   B 
      B^T 0]
-    and a good preconditioner is needed.
-    The problem is well studied, though.
-    However, in the current code, there is no trick applied. 
+    with constraint blocks scaled by problem.p_num_eps (by default, the mean magnitude of the diagonal of A). 
+    BiCGSTAB is preconditioned by a block triangular preconditioner built on precond, 
+    see lagrange_multiplier_preconditioner.
+
+    The Newton iterations stop as in solver_row_elimination, with the options tol, rel_tol, max_iter, 
+    linear_tol and divergence_factor of NEWTON_OPTIONS. Forcing terms, line search and Jacobian lagging 
+    are not supported.
 
     Reference:
     https://ethz.ch/content/dam/ethz/special-interest/baug/ibk/structural-mechanics-dam/education/femI/Presentation.pdf
     """
-    print(f"Calling the lagrange multiplier solver for imposing Dirichlet B.C. and periodic B.C.")
-    print("Start timing")
+    logger.info(f"Calling the lagrange multiplier solver for imposing Dirichlet B.C. and periodic B.C.")
+    options = get_newton_options(newton_options)
+    unsupported = [key for key in ['forcing', 'line_search', 'jacobian_lag'] if options[key] != NEWTON_OPTIONS[key]]
+    if unsupported:
+        raise NotImplementedError(f"newton_options {unsupported} are not supported by the lagrange multiplier solver")
+    logger.info("Start timing")
     start = time.time()
 
-    # Ad-hoc parameter to get a better conditioned global matrix.
-    # Currently, this parameter needs to be manually tuned.
-    # We need a (much) better way to deal with this type of saddle-point problem.
-    # Will interfacing with PETSc be a good idea?
-    if hasattr(problem, 'p_num_eps'):
-        p_num_eps = problem.p_num_eps
-    else:
-        p_num_eps = 1.
-
-    print(f"Setting p_num_eps = {p_num_eps}. If periodic B.C. fails to be applied, consider modifying this parameter.")
-
     sol = np.zeros((problem.num_total_nodes, problem.vec))
     dofs = sol.reshape(-1)
+    report = problem.solve_report = SolveReport(problem)
 
     res_fn = problem.compute_residual
     res_fn = get_flatten_fn(res_fn, problem)
 
-    problem.newton_update(dofs.reshape(sol.shape))
-    A_fn_aug = get_A_fn_aug(problem, p_num_eps)
+    report.timed('newton_update', problem.newton_update, dofs.reshape(sol.shape))
+    p_num_eps = getattr(problem, 'p_num_eps', None)
+    if p_num_eps is None:
+        p_num_eps = default_p_num_eps(problem)
+    logger.info(f"Setting p_num_eps = {p_num_eps}")
+
+    A_fn_aug = report.timed('assemble_matrix', get_A_fn_aug, problem, p_num_eps)
+    pc = report.timed('precond', lagrange_multiplier_preconditioner, problem, precond)
 
+    newton_converged = True
     if linear:
         # If we know the problem is linear, this way of solving seems faster.
         dofs = assign_bc(dofs, problem)
         dofs_aug = aug_dof_w_zero_bc(problem, dofs)
-        dofs_aug = linear_incremental_solver_lm(problem, res_fn, A_fn_aug, dofs_aug, p_num_eps)
-        print(f"Linear problem res l_2 = {np.linalg.norm(compute_residual_lm(problem, res_fn, dofs_aug, p_num_eps))}")
+        dofs_aug = report.timed('linear_solve', linear_incremental_solver_lm, problem, res_fn, A_fn_aug, dofs_aug, 
+                                p_num_eps, pc, options['linear_tol'])
+        res_val = np.linalg.norm(compute_residual_lm(problem, res_fn, dofs_aug, p_num_eps))
+        report.newton_res_history.append(res_val)
+        logger.info(f"Linear problem res l_2 = {res_val}")
     else:
-        dofs_aug = linear_guess_solve_lm(problem, A_fn_aug, p_num_eps)
+        dofs_aug = report.timed('linear_solve', linear_guess_solve_lm, problem, A_fn_aug, p_num_eps, pc)
         res_val = np.linalg.norm(compute_residual_lm(problem, res_fn, dofs_aug, p_num_eps))
-        print(f"Before, res l_2 = {res_val}") 
-        tol = 1e-6
-        while res_val > tol:
-            problem.newton_update(dofs_aug[:problem.num_total_dofs].reshape(sol.shape))
-            A_fn_aug = get_A_fn_aug(problem, p_num_eps)
-            dofs_aug = linear_incremental_solver_lm(problem, res_fn, A_fn_aug, dofs_aug, p_num_eps)
+        report.newton_res_history.append(res_val)
+        logger.info(f"Before, res l_2 = {res_val}") 
+        res_0 = res_val
+        target = max(options['tol'], options['rel_tol']*res_0)
+        num_iter = 0
+        while res_val > target:
+            if num_iter == options['max_iter']:
+                logger.warning(f"Newton solver reached max_iter = {num_iter} with res l_2 = {res_val} > {target}")
+                newton_converged = False
+                break
+            report.timed('newton_update', problem.newton_update, dofs_aug[:problem.num_total_dofs].reshape(sol.shape))
+            A_fn_aug = report.timed('assemble_matrix', get_A_fn_aug, problem, p_num_eps)
+            pc = report.timed('precond', lagrange_multiplier_preconditioner, problem, precond)
+            dofs_aug = report.timed('linear_solve', linear_incremental_solver_lm, problem, res_fn, A_fn_aug, dofs_aug, 
+                                    p_num_eps, pc, options['linear_tol'])
+            num_iter += 1
             res_val = np.linalg.norm(compute_residual_lm(problem, res_fn, dofs_aug, p_num_eps))
-            print(f"res l_2 dofs_aug = {res_val}") 
+            report.newton_res_history.append(res_val)
+            logger.info(f"res l_2 dofs_aug = {res_val}") 
+            if not np.isfinite(res_val) or res_val > options['divergence_factor']*res_0:
+                report.finalize(problem, newton_converged=False)
+                raise RuntimeError(f"Newton solver diverged: res l_2 = {res_val}, initial res l_2 = {res_0}")
  
     sol = dofs_aug[:problem.num_total_dofs].reshape(sol.shape)
     end = time.time()
     solve_time = end - start
-    print(f"Solve took {solve_time} [s]")
-    print(f"max of sol = {np.max(sol)}")
-    print(f"min of sol = {np.min(sol)}")
+    report.finalize(problem, newton_converged=newton_converged)
+    logger.info(f"Solve took {solve_time} [s]")
+    logger.info(report)
+    logger.info(f"max of sol = {np.max(sol)}")
+    logger.info(f"min of sol = {np.min(sol)}")
+
+    return sol
+
+
+################################################################################
+# Device-resident Newton solver
+
+def get_newton_fn(problem, precond, options):
+    """The whole Newton solve as one function of device arrays, to be jitted: residual, Jacobian data fill 
+    on the fixed sparsity pattern of problem.assembly_plan, Dirichlet B.C., Krylov solve and (optionally) line search 
+    run inside a lax.while_loop, without host round-trips.
+
+    Periodic B.C. are imposed by master-slave elimination, with the data of get_periodic_data 
+    (None without periodic B.C.).
+
+    Returns
+    -------
+    newton_fn : Callable
+        (dofs, bc_dof_inds, bc_vals, body_force, neumann, internal_vars, assembly_data, periodic_data) -> 
+        (dofs, res_history, num_iter), where res_history (max_iter + 1,) is padded with np.nan
+    """
+    sol_shape = (problem.num_total_nodes, problem.vec)
+    plan = problem.assembly_plan
+    symmetric = problem.symmetric
+    krylov = jax.scipy.sparse.linalg.cg if symmetric else jax.scipy.sparse.linalg.bicgstab
+    max_iter = options['max_iter']
+    lag = options['jacobian_lag']
+
+    def newton_fn(dofs, bc_dof_inds, bc_vals, body_force, neumann, internal_vars, assembly_data, periodic_data):
+        bc_mask = np.zeros_like(dofs).at[bc_dof_inds].set(1.)
+        if periodic_data is None:
+            condense, expand = (lambda x: x), (lambda x: x)
+        else:
+            master_inds = periodic_data['master_inds']
+            slave_mask = (master_inds != np.arange(len(master_inds))).astype(dofs.dtype)
+            condense = lambda x: jax.ops.segment_sum(x, master_inds, num_segments=len(master_inds))
+            expand = lambda x: x[master_inds]
+        dofs = expand(dofs)
+
+        def apply_bc(res, dofs):
+            res = condense((res - body_force - neumann).reshape(-1))
+            return res.at[bc_dof_inds].set(dofs[bc_dof_inds] - bc_vals)
+
+        def get_matvec(A_data):
+            matvec = plan.get_matvec(A_data)
+            if periodic_data is None:
+                return matvec
+            return lambda x: condense(matvec(expand(x))) + slave_mask*x
+
+        def residual(dofs):
+            res = problem.assemble_weak_form(dofs.reshape(sol_shape), False, assembly_data, **internal_vars)
+            return apply_bc(res, dofs)
+
+        def residual_and_jacobian(dofs):
+            res, A_data = problem.assemble_weak_form(dofs.reshape(sol_shape), True, assembly_data, **internal_vars)
+            return apply_bc(res, dofs), A_data
+
+        def get_pc(A_data):
+            if precond in [True, 'jacobi']:
+                jacobi = np.where(bc_mask == 1., 1., assembled_diagonal(plan, A_data, periodic_data))
+                return get_jacobi_precond(jacobi)
+            if precond == 'block_jacobi':
+                return get_block_jacobi_precond(invert_node_blocks(plan.block_diagonal(A_data), bc_mask, symmetric))
+            return None
+
+        def linear_solve(res_vec, A_data, tol):
+            # Same constrained systems as get_linear_system. On Dirichlet dofs, b holds B.C. values minus current dofs.
+            matvec = get_matvec(A_data)
+            b = -res_vec
+            if symmetric:
+                A_fn = lambda x: (1. - bc_mask)*matvec((1. - bc_mask)*x) + bc_mask*x
+                b = b - (1. - bc_mask)*matvec(bc_mask*b)
+            else:
+                A_fn = lambda x: (1. - bc_mask)*matvec(x) + bc_mask*x
+            inc, _ = krylov(A_fn, b, x0=bc_mask*b, M=get_pc(A_data), tol=tol, atol=1e-10, maxiter=10000)
+            return expand(inc)
+
+        def line_search(dofs, inc, res_val, eta):
+            def trial(step):
+                res_vec = residual(dofs + step*inc)
+                return step, res_vec, np.linalg.norm(res_vec), 0
+
+            def cond_fn(carry):
+                step, res_vec, res_trial, i = carry
+                return (res_trial > (1. - 1e-4*step*(1. - eta))*res_val) & (i < 10)
+
+            def body_fn(carry):
+                step, res_vec, res_trial, i = carry
+                step, res_vec, res_trial, _ = trial(step/2.)
+                return step, res_vec, res_trial, i + 1
+
+            step, res_vec, _, _ = jax.lax.while_loop(cond_fn, body_fn, trial(1.))
+            return dofs + step*inc, res_vec
+
+        res_vec, A_data = residual_and_jacobian(dofs)
+        res_0 = np.linalg.norm(res_vec)
+        target = np.maximum(options['tol'], options['rel_tol']*res_0)
+        res_history = np.full(max_iter + 1, np.nan).at[0].set(res_0)
+
+        def cond_fn(carry):
+            dofs, res_vec, A_data, res_val, res_prev, eta, num_iter, res_history = carry
+            return (res_val > target) & (num_iter < max_iter) & np.isfinite(res_val) & \
+                   (res_val <= options['divergence_factor']*res_0)
+
+        def body_fn(carry):
+            dofs, res_vec, A_data, res_val, res_prev, eta, num_iter, res_history = carry
+            if options['forcing'] == 'eisenstat_walker':
+                eta = np.where(num_iter == 0, eisenstat_walker(None, res_val, res_prev, target), 
+                               eisenstat_walker(eta, res_val, res_prev, target))
+            else:
+                eta = np.array(options['linear_tol'])
+            inc = linear_solve(res_vec, A_data, eta)
+            if options['line_search']:
+                dofs, res_vec = line_search(dofs, inc, res_val, eta)
+            else:
+                dofs = dofs + inc
+
+            if lag == 1:
+                res_vec, A_data = residual_and_jacobian(dofs)
+            else:
+                keep = (lambda dofs, A_data: (res_vec, A_data)) if options['line_search'] else \
+                       (lambda dofs, A_data: (residual(dofs), A_data))
+                res_vec, A_data = jax.lax.cond((num_iter + 1) % lag == 0, 
+                    lambda dofs, A_data: residual_and_jacobian(dofs), keep, dofs, A_data)
+
+            res_prev, res_val = res_val, np.linalg.norm(res_vec)
+            res_history = res_history.at[num_iter + 1].set(res_val)
+            return dofs, res_vec, A_data, res_val, res_prev, eta, num_iter + 1, res_history
+
+        carry = (dofs, res_vec, A_data, res_0, res_0, np.array(options['linear_tol']), 0, res_history)
+        dofs, _, _, _, _, _, num_iter, res_history = jax.lax.while_loop(cond_fn, body_fn, carry)
+        return dofs, res_history, num_iter
+
+    return newton_fn
+
+
+def get_periodic_data(problem, master_inds=None):
+    """Master-slave data of get_newton_fn, None without periodic B.C.: the master dofs (see get_periodic_master_inds, 
+    unless given), and for the diagonal of P^T A P, the CSR slots of entries whose row and column have the same master, 
+    that master, and the multiplicity of the entry (2 for off-diagonal entries of the upper triangle in symmetric mode).
+    """
+    if problem.periodic_bc_info is None:
+        return None
+    if master_inds is None:
+        master_inds = get_periodic_master_inds(problem)
+    master_inds = onp.asarray(master_inds)
+    plan = problem.assembly_plan
+    rows = onp.repeat(onp.arange(problem.num_total_dofs), onp.diff(plan.indptr))
+    same = master_inds[rows] == master_inds[plan.indices]
+    weights = onp.where(plan.symmetric & (rows != plan.indices), 2., 1.)
+    return {'master_inds': np.array(master_inds, dtype=np.int32), 
+            'diag_slots': np.array(onp.flatnonzero(same), dtype=np.int32),
+            'diag_rows': np.array(master_inds[rows[same]], dtype=np.int32), 
+            'diag_weights': np.array(weights[same])}
+
+
+def assembled_diagonal(plan, A_data, periodic_data=None):
+    """Diagonal of the matrix assembled by plan, or with periodic_data (see get_periodic_data) 
+    of P^T A P, whose rows of slave dofs are those of the identity
+    """
+    if periodic_data is None:
+        return plan.diagonal(A_data)
+    master_inds = periodic_data['master_inds']
+    slave_mask = (master_inds != np.arange(len(master_inds))).astype(A_data.dtype)
+    # Entries of A coupling dofs with the same master add up on the diagonal of P^T A P
+    return jax.ops.segment_sum(A_data[periodic_data['diag_slots']]*periodic_data['diag_weights'], 
+                               periodic_data['diag_rows'], num_segments=len(master_inds)) + slave_mask
+
+
+def get_newton_args(problem, precond, newton_options):
+    """Checks and default arguments of get_newton_fn shared by solver_jit and solver_batch
+
+    Returns
+    -------
+    options : dict
+    args : tuple
+        Zero initial dofs, Dirichlet B.C., loads of problem, no internal variables, assembly and periodic data
+    """
+    assert precond in [True, False, None, 'jacobi', 'block_jacobi'], f"Unsupported precond {precond}"
+    if problem.periodic_bc_info is not None and precond == 'block_jacobi':
+        raise NotImplementedError(f"The block jacobi preconditioner is not supported with periodic B.C.")
+    options = get_newton_options(newton_options)
+    problem.matrix_free = False
+    args = (np.zeros(problem.num_total_dofs), np.array(problem.bc_dof_inds, dtype=np.int32), 
+            np.array(problem.bc_vals, dtype=np.float64), np.array(problem.body_force), np.array(problem.neumann), {}, 
+            problem.get_assembly_data(), get_periodic_data(problem))
+    return options, args
+
+
+def solver_jit(problem, initial_guess=None, precond=True, internal_vars=None, newton_options=None, return_report=False):
+    """Device-resident Newton solver: one compiled call per solve, see get_newton_fn.
+
+    The compiled solve is cached in problem.kernel_cache and reused as long as shapes and options do not change. 
+    Dirichlet B.C. (problem.bc_dof_inds, problem.bc_vals), problem.body_force, problem.neumann and internal_vars 
+    are arguments, so load steps do not recompile. Since problem.newton_update is not called, internal variables 
+    (e.g., {'laplace': [sigmas_old, epsilons_old]} for Plasticity) must be passed as internal_vars.
+
+    Compared to solver, only the row elimination method (with master-slave periodic B.C.), the JAX Krylov solvers, 
+    and the 'jacobi' and 'block_jacobi' (not with periodic B.C.) preconditioners (or none) are supported. 
+    The Jacobian is assembled in float64. newton_options are those of solver_row_elimination, see NEWTON_OPTIONS.
+    """
+    logger.info(f"Calling the device-resident Newton solver")
+    options, args = get_newton_args(problem, precond, newton_options)
+    report = problem.solve_report = SolveReport(problem)
+    sol_shape = (problem.num_total_nodes, problem.vec)
+    dofs = args[0] if initial_guess is None else np.array(initial_guess).reshape(-1)
+    args = (dofs, *args[1:5], internal_vars or {}, *args[6:])
+    name = ('newton', precond, tuple(sorted(options.items())))
+    newton_fn = problem.get_cached_kernel(name, lambda: get_newton_fn(problem, precond, options), args)
+    dofs, res_history, num_iter = report.timed('newton', newton_fn, *args)
+
+    num_iter = int(num_iter)
+    report.newton_res_history = [float(r) for r in res_history[:num_iter + 1]]
+    res_0, res_val = report.newton_res_history[0], report.newton_res_history[-1]
+    if not onp.isfinite(res_val) or res_val > options['divergence_factor']*res_0:
+        report.finalize(problem, newton_converged=False)
+        raise RuntimeError(f"Newton solver diverged: res l_2 = {res_val}, initial res l_2 = {res_0}")
+    newton_converged = res_val <= max(options['tol'], options['rel_tol']*res_0)
+    if not newton_converged:
+        logger.warning(f"Newton solver reached max_iter = {num_iter} with res l_2 = {res_val}")
+    report.finalize(problem, newton_converged=newton_converged)
+    logger.info(f"Newton iterations = {num_iter}, res l_2 = {res_val}")
+    logger.info(report)
+
+    sol = dofs.reshape(sol_shape)
+    if return_report:
+        return sol, report
+    return sol
+
 
+################################################################################
+# Batched solves
+
+def solve_linear_batch(problem, bc_vals, body_force, neumann, precond, linear_solver, report):
+    """Linear problems sharing one matrix, assembled once. Arguments are batched, see solver_batch. 
+    linear_solver is one of LINEAR_SOLVERS: with 'scipy_direct', the matrix is LU factorized once and the batch 
+    is solved as multiple right-hand sides; the Krylov backends solve the right-hand sides one after the other, 
+    preconditioned by precond. problem.periodic_master_inds, problem.linear_solver and problem.matrix_free 
+    are set for the solve and restored afterwards.
+
+    Returns
+    -------
+    dofs : np.DeviceArray
+        (batch, num_total_dofs)
+    converged : onp.ndarray
+        (batch,)
+    """
+    attrs = ['periodic_master_inds', 'linear_solver', 'matrix_free']
+    saved = {attr: getattr(problem, attr) for attr in attrs if hasattr(problem, attr)}
+    problem.periodic_master_inds = None if problem.periodic_bc_info is None else get_periodic_master_inds(problem)
+    problem.linear_solver = linear_solver
+    problem.matrix_free = False
+    try:
+        sol_shape = (problem.num_total_nodes, problem.vec)
+        res_vec = report.timed('newton_update', problem.newton_update, np.zeros(sol_shape))
+        A_fn = report.timed('assemble_matrix', get_A_fn, problem)
+        # Residual of the zero solution without loads, then right-hand sides of the row elimination systems
+        res_vec = (res_vec + problem.body_force + problem.neumann).reshape(1, -1)
+        b = jax.vmap(partial(condense_vec, problem))(body_force.reshape(len(bc_vals), -1) + 
+                                                     neumann.reshape(len(bc_vals), -1) - res_vec)
+        b = b.at[:, problem.bc_dof_inds].set(bc_vals)
+        if linear_solver == 'scipy_direct':
+            get_matrix = lambda: get_constrained_matrix(problem, False)
+            dofs, _ = report.timed('linear_solve', direct_solve, problem, 'row_elimination', get_matrix, b.T)
+            dofs = dofs.T
+        else:
+            A_fn, rhs_fn = get_linear_system(A_fn, problem)
+            pc = report.timed('precond', get_preconditioner, problem, precond)
+            bc_mask = copy_bc(np.ones(problem.num_total_dofs), problem)
+            dofs, converged = [], []
+            for b_i in b:
+                num_solves = len(report.linear_solves)
+                dofs_i, _ = report.timed('linear_solve', linear_solve, problem, A_fn, rhs_fn(b_i), bc_mask*b_i, pc)
+                dofs.append(dofs_i)
+                converged.append(all(s['converged'] for s in report.linear_solves[num_solves:]))
+            dofs = np.stack(dofs)
+        dofs = jax.vmap(partial(expand_vec, problem))(dofs)
+    finally:
+        for attr in attrs:
+            if attr in saved:
+                setattr(problem, attr, saved[attr])
+            else:
+                delattr(problem, attr)
+    finite = onp.all(onp.isfinite(onp.asarray(dofs)), axis=1)
+    return dofs, finite if linear_solver == 'scipy_direct' else finite & onp.array(converged)
+
+
+def solver_batch(problem, bc_vals=None, body_force=None, neumann=None, internal_vars=None, initial_guess=None, 
+                 linear=False, precond=True, newton_options=None, return_report=False, internal_vars_axes=0, 
+                 linear_solver=None):
+    """Solve a batch of problems sharing the mesh, the B.C. locations and the weak form of problem, 
+    which differ in B.C. values, loads or material parameters, e.g., load cases of a design or samples of a data set.
+
+    Each of bc_vals (batch, num_bc_dofs) (ordered as problem.bc_dof_inds), body_force, neumann and initial_guess 
+    (batch, num_total_nodes, vec), and internal_vars is either batched or None, in which case problem.bc_vals, 
+    problem.body_force, problem.neumann, zeros or no internal variables are used for all problems. 
+    internal_vars_axes is 0 (a leading batch axis on all arrays of internal_vars) or, as the in_axes of jax.vmap, 
+    a prefix tree of internal_vars with 0 for batched and None for shared leaves, 
+    e.g., {'laplace': [None, 0]} for a material parameter field shared by a batch of loads.
+
+    The device-resident Newton solver of solver_jit (with its restrictions) is vmapped over the batch: 
+    the assembly plan, the cell kernels and the compiled solve are shared, and the whole batch runs in one call. 
+    Problems that diverge or reach max_iter are reported in solve_report.batch_converged instead of raising.
+    If linear and internal_vars is None, all problems share one matrix, assembled with problem.newton_update 
+    and solved with linear_solver, one of LINEAR_SOLVERS (by default 'scipy_direct': factorized once, 
+    reused across calls, see get_factorization, and the batch is solved as multiple right-hand sides), 
+    see solve_linear_batch; initial_guess and newton_options do not apply, nor does precond with 
+    'scipy_direct', and are rejected. Otherwise, linear_solver must be None. 
+    Periodic B.C. are imposed by master-slave elimination.
+
+    Returns
+    -------
+    sol : np.DeviceArray
+        (batch, num_total_nodes, vec)
+    """
+    if internal_vars is None:
+        batched_internal_vars = None
+    else:
+        batched_internal_vars = jax.tree_util.tree_map(lambda axis, x: x if axis == 0 else None, 
+                                                       internal_vars_axes, internal_vars, is_leaf=lambda x: x is None)
+    batched = {'bc_vals': bc_vals, 'body_force': body_force, 'neumann': neumann, 
+               'internal_vars': batched_internal_vars, 'initial_guess': initial_guess}
+    batch_sizes = {len(x) for x in jax.tree_util.tree_leaves(batched)}
+    assert len(batch_sizes) == 1, f"Inconsistent or missing batch axes, got batch sizes {batch_sizes}"
+    batch_size = batch_sizes.pop()
+    logger.info(f"Calling the batched solver, batch size = {batch_size}")
+    report = problem.solve_report = SolveReport(problem)
+    sol_shape = (problem.num_total_nodes, problem.vec)
+
+    def get_batch(x, default):
+        return np.broadcast_to(default, (batch_size,) + np.shape(default)) if x is None else np.array(x)
+
+    if linear and internal_vars is None:
+        linear_solver = 'scipy_direct' if linear_solver is None else linear_solver
+        assert linear_solver in LINEAR_SOLVERS, f"Unknown linear_solver {linear_solver}, choose from {LINEAR_SOLVERS}"
+        unused = {'initial_guess': initial_guess is not None, 'newton_options': newton_options is not None, 
+                  'precond': linear_solver == 'scipy_direct' and precond is not True}
+        unused = [arg for arg, given in unused.items() if given]
+        if unused:
+            raise ValueError(f"{unused} are not used by the batched linear solve with a shared matrix " 
+                             f"and linear_solver {linear_solver}")
+        bc_vals = get_batch(bc_vals, np.array(problem.bc_vals, dtype=np.float64))
+        body_force = get_batch(body_force, problem.body_force)
+        neumann = get_batch(neumann, problem.neumann)
+        dofs, batch_converged = solve_linear_batch(problem, bc_vals, body_force, neumann, precond, linear_solver, report)
+    else:
+        if linear_solver is not None:
+            raise ValueError(f"linear_solver is only used by the batched linear solve with a shared matrix, "
+                             f"the batched Newton solver uses the JAX Krylov solvers")
+        options, args = get_newton_args(problem, precond, newton_options)
+        args = list(args)
+        in_axes = [None]*len(args)
+        for i, x in zip([0, 2, 3, 4, 5], [initial_guess, bc_vals, body_force, neumann, internal_vars]):
+            if x is not None:
+                args[i] = jax.tree_util.tree_map(np.array, x)
+                in_axes[i] = internal_vars_axes if i == 5 else 0
+        args[0] = args[0].reshape(batch_size, -1) if initial_guess is not None else args[0]
+        args[3] = args[3].reshape(batch_size, *sol_shape) if body_force is not None else args[3]
+        args[4] = args[4].reshape(batch_size, *sol_shape) if neumann is not None else args[4]
+        args, in_axes = tuple(args), tuple(in_axes)
+        # Hashable in_axes for the kernel cache: which internal variables are batched
+        batched_leaves = jax.tree_util.tree_leaves(batched_internal_vars, is_leaf=lambda x: x is None)
+        key_axes = in_axes[:5] + (tuple(x is not None for x in batched_leaves),) + in_axes[6:]
+        name = ('newton_batch', precond, tuple(sorted(options.items())), key_axes)
+        newton_fn = problem.get_cached_kernel(name, 
+            lambda: jax.vmap(get_newton_fn(problem, precond, options), in_axes=in_axes), args)
+        dofs, res_history, num_iter = report.timed('newton', newton_fn, *args)
+
+        res_history, num_iter = onp.asarray(res_history), onp.asarray(num_iter)
+        res_0, res_val = res_history[:, 0], res_history[onp.arange(batch_size), num_iter]
+        batch_converged = onp.isfinite(res_val) & (res_val <= onp.maximum(options['tol'], options['rel_tol']*res_0))
+        # Worst residual over the batch at each iteration
+        report.newton_res_history = [float(r) for r in onp.nanmax(res_history[:, :onp.max(num_iter) + 1], axis=0)]
+        logger.info(f"Newton iterations = {onp.min(num_iter)} to {onp.max(num_iter)}, max res l_2 = {onp.max(res_val)}")
+
+    report.batch_converged = [bool(c) for c in batch_converged]
+    if not onp.all(batch_converged):
+        logger.warning(f"{onp.sum(~batch_converged)} of {batch_size} problems did not converge: "
+                       f"{onp.flatnonzero(~batch_converged).tolist()}")
+    report.finalize(problem, newton_converged=onp.all(batch_converged))
+    logger.info(report)
+
+    sol = dofs.reshape((batch_size,) + sol_shape)
+    if return_report:
+        return sol, report
     return sol
 
 
 ################################################################################
 # General
 
-def solver(problem, linear=False, precond=True, initial_guess=None):
-    """periodic B.C. is a special form of adding a linear constraint. 
-    Lagrange multiplier seems to be convenient to impose this constraint.
+PERIODIC_METHODS = ['lagrange_multiplier', 'master_slave']
+
+
+def solver(problem, linear=False, precond=True, initial_guess=None, matrix_free=False, return_report=False, 
+           linear_solver='jax_krylov', newton_options=None, periodic_method='lagrange_multiplier'):
+    """periodic B.C. is a special form of adding a linear constraint, imposed according to periodic_method, 
+    one of PERIODIC_METHODS: 'lagrange_multiplier' (augmented saddle-point system, see solver_lagrange_multiplier) 
+    or 'master_slave' (slave dofs are eliminated and the row elimination solver works on the condensed 
+    system P^T A P, which stays symmetric positive definite for symmetric problems, so that CG and all 
+    preconditioners and linear solver backends can be used).
+
+    linear_solver selects the backend of the linear solves, one of LINEAR_SOLVERS: 
+    'jax_krylov' (JAX CG/BiCGSTAB), 'scipy_krylov' (host scipy CG/BiCGSTAB) or 'scipy_direct' (sparse LU, 
+    reused across calls as long as the assembled matrix is unchanged). 
+    The scipy backends need the assembled matrix and cannot be combined with matrix_free.
+
+    precond is a bool (True means Jacobi) or one of PRECONDITIONERS: 'jacobi', 'block_jacobi' (inverses of the 
+    vec x vec node-diagonal blocks), 'ilu' (incomplete LU applied on the host) or 'amg' (smoothed aggregation 
+    algebraic multigrid, with rigid body modes as near-nullspace for mechanics). 
+    In the lagrange multiplier solver, it preconditions the A block, see lagrange_multiplier_preconditioner.
+
+    newton_options configures the Newton iterations of the row elimination solver (tolerances, iteration cap, 
+    Eisenstat-Walker forcing terms, line search, Jacobian lagging, divergence detection), see NEWTON_OPTIONS 
+    and solver_row_elimination. The lagrange multiplier solver supports the tolerances, the iteration cap 
+    and divergence detection.
+
+    Telemetry of the solve (phase times, residual history, Krylov iterations, etc.) is stored in 
+    problem.solve_report, see jax_am.fem.report.SolveReport, and also returned if return_report is True. 
+    Krylov matvecs and iterations are only counted with return_report, see SolveReport.count_matvecs.
     """
+    assert linear_solver in LINEAR_SOLVERS, f"Unknown linear_solver {linear_solver}, choose from {LINEAR_SOLVERS}"
+    assert precond in [True, False, None] + PRECONDITIONERS, f"Unknown precond {precond}, choose from {PRECONDITIONERS}"
+    if matrix_free and linear_solver != 'jax_krylov':
+        raise NotImplementedError(f"Matrix-free mode only supports the jax_krylov linear solver.")
+    assert periodic_method in PERIODIC_METHODS, f"Unknown periodic_method {periodic_method}, choose from {PERIODIC_METHODS}"
+    problem.linear_solver = linear_solver
+    problem.periodic_master_inds = None
+    problem.count_matvecs = return_report
+
     if problem.periodic_bc_info is None:
-        return solver_row_elimination(problem, linear, precond, initial_guess)
+        sol = solver_row_elimination(problem, linear, precond, initial_guess, matrix_free, newton_options)
+    elif periodic_method == 'master_slave':
+        if matrix_free:
+            raise NotImplementedError(f"Matrix-free mode is not supported with master-slave periodic B.C.")
+        problem.periodic_master_inds = get_periodic_master_inds(problem)
+        sol = solver_row_elimination(problem, linear, precond, initial_guess, matrix_free, newton_options)
     else:
-        return solver_lagrange_multiplier(problem, linear)
+        if matrix_free:
+            raise NotImplementedError(f"Matrix-free mode is not supported by the lagrange multiplier solver.")
+        problem.matrix_free = False
+        sol = solver_lagrange_multiplier(problem, linear, precond, newton_options)
+
+    if return_report:
+        return sol, problem.solve_report
+    return sol
 
 
 ################################################################################
 # Adjoint method for inverse problem
 
-def adjoint_method(problem, J_fn, output_sol, linear=False):
+def adjoint_method(problem, J_fn, output_sol, linear=False, linear_solver='jax_krylov'):
     """Adjoint method with automatic differentiation.
 
     Currently, the function cannot deal with periodic B.C.,
     but it should not be easy to add.
+
+    linear_solver is used for both the forward and the adjoint solves. With 'scipy_direct', the adjoint solve 
+    reuses the LU factorization of the forward solve when the matrix is unchanged (linear problems without 
+    symmetric elimination), as a transposed triangular solve.
     """
     def fn(params):
         """J(u(p), p)
         """
-        print(f"\nStep {fn.counter}")
+        logger.info(f"\nStep {fn.counter}")
         problem.params = params
-        sol = solver(problem, linear=linear)
+        sol = solver(problem, linear=linear, linear_solver=linear_solver)
         dofs = sol.reshape(-1)
         obj_val = J_fn(dofs, params)
         fn.dofs = dofs
@@ -535,9 +1651,14 @@ def adjoint_method(problem, J_fn, output_sol, linear=False):
         problem.newton_update(dofs.reshape((problem.num_total_nodes, problem.vec)))
         pc = get_jacobi_precond(jacobi_preconditioner(problem))
         start = time.time()
-        adjoint, info = jax.scipy.sparse.linalg.bicgstab(adjoint_linear_fn, partial_dJ_du, x0=None, M=pc, tol=1e-10, atol=1e-10, maxiter=10000)
+        if linear_solver == 'jax_krylov':
+            adjoint, info = jax.scipy.sparse.linalg.bicgstab(adjoint_linear_fn, partial_dJ_du, x0=None, M=pc, tol=1e-10, atol=1e-10, maxiter=10000)
+        else:
+            # The adjoint operator is the transpose of the row elimination matrix
+            adjoint, info = solve_with_backend(problem, 'bicgstab', None, partial_dJ_du, None, pc, 'row_elimination', 
+                                               lambda: get_constrained_matrix(problem, False), transpose=True)
         end = time.time()
-        print(f"Adjoint solve took {end - start} [s]")
+        logger.info(f"Adjoint solve took {end - start} [s]")
         total_dJ_dp = -vjp_linear_fn(adjoint) + partial_dJ_dp
         return total_dJ_dp
 
@@ -1,7 +1,11 @@
 import unittest
+import jax_am
 # from jax_am.fem.tests import __path__ # also works
 from . import __path__
 
+# FEM needs 64-bit floats, enabled before any test creates JAX arrays
+jax_am.enable_x64()
+
 suite = unittest.TestLoader().discover(__path__[0])
 print(f"Found test suite = {suite}")
 unittest.TextTestRunner(verbosity=2).run(suite)
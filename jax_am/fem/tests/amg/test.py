@@ -0,0 +1,70 @@
+import numpy as onp
+import jax.numpy as np
+import scipy
+import unittest
+
+from jax_am.fem.amg import SmoothedAggregationAMG, near_nullspace
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import LinearElasticity
+from jax_am.fem.solver import solver, get_A_fn, get_host_matrix
+
+
+class Test(unittest.TestCase):
+    """Test the smoothed aggregation AMG preconditioner
+    """
+    def test_rigid_body_modes(self):
+        """Rigid body modes are in the nullspace of the unconstrained elasticity matrix
+        """
+        mesh = structured_box_mesh(3, 3, 3, ele_type='HEX8')
+        problem = LinearElasticity(mesh, vec=3, dim=3)
+        problem.newton_update(np.zeros((problem.num_total_nodes, problem.vec)))
+        get_A_fn(problem)
+        A = get_host_matrix(problem)
+        B = near_nullspace(problem.points, problem.vec, problem.dim)
+        self.assertEqual(B.shape, (problem.num_total_dofs, 6))
+        onp.testing.assert_allclose(A @ B, 0., atol=1e-8*abs(A).max())
+
+    def test_amg_iterations(self):
+        """AMG preconditioned CG converges to the same solution in far fewer iterations than Jacobi
+        """
+        mesh = structured_box_mesh(8, 8, 8, ele_type='HEX8')
+        left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+        right = lambda point: np.isclose(point[0], 1., atol=1e-5)
+        zero = lambda point: 0.
+        shear = lambda point: 0.01
+        dirichlet_bc_info = [[left, left, left, right], [0, 1, 2, 1], [zero, zero, zero, shear]]
+        problem = LinearElasticity(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info, symmetric=True)
+        sol_jacobi, report = solver(problem, linear=True, precond='jacobi', return_report=True)
+        iterations_jacobi = report.linear_solves[-1]['iterations']
+        sol_amg, report = solver(problem, linear=True, precond='amg', return_report=True)
+        self.assertTrue(report.converged)
+        self.assertLess(report.linear_solves[-1]['iterations'], iterations_jacobi/3)
+        onp.testing.assert_allclose(sol_amg, sol_jacobi, atol=1e-8)
+
+    def test_hierarchy_reuse(self):
+        """Updating the values of a hierarchy gives the same V-cycle as a new setup, and tentative prolongators 
+        have orthonormal columns and reproduce the near-nullspace
+        """
+        mesh = structured_box_mesh(6, 6, 6, ele_type='HEX8')
+        problem = LinearElasticity(mesh, vec=3, dim=3)
+        problem.newton_update(np.zeros((problem.num_total_nodes, problem.vec)))
+        get_A_fn(problem)
+        A = scipy.sparse.csr_array(get_host_matrix(problem) + scipy.sparse.eye(problem.num_total_dofs))
+        B = near_nullspace(problem.points, problem.vec, problem.dim)
+        dof_to_node = onp.arange(problem.num_total_dofs)//problem.vec
+        amg = SmoothedAggregationAMG(A, B, dof_to_node=dof_to_node, max_coarse=50)
+        self.assertGreater(len(amg.levels), 2)
+        T = amg.levels[0]['T']
+        onp.testing.assert_allclose((T.T @ T).toarray(), onp.eye(T.shape[1]), atol=1e-12)
+
+        # New values, same pattern
+        scale = scipy.sparse.diags(1. + onp.random.default_rng(0).random(problem.num_total_dofs))
+        A_new = scipy.sparse.csr_array(scale @ A @ scale)
+        amg_ref = SmoothedAggregationAMG(A_new, B, dof_to_node=dof_to_node, max_coarse=50)
+        amg.update(A_new)
+        b = np.array(onp.random.default_rng(1).random(problem.num_total_dofs))
+        onp.testing.assert_allclose(amg.get_precond()(b), amg_ref.get_precond()(b), rtol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
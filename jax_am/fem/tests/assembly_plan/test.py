@@ -0,0 +1,109 @@
+import numpy as onp
+import numpy.testing as onptest
+import jax.numpy as np
+import scipy
+import unittest
+
+from jax_am.fem.assembly import AssemblyPlan
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import LinearElasticity
+from jax_am.fem.solver import solver
+
+
+def structured_hex_cells(Nx, Ny, Nz):
+    """Connectivity of a structured HEX8 grid, with randomly permuted node numbers.
+    """
+    node_ids = onp.arange((Nx + 1)*(Ny + 1)*(Nz + 1)).reshape(Nx + 1, Ny + 1, Nz + 1)
+    i, j, k = onp.meshgrid(onp.arange(Nx), onp.arange(Ny), onp.arange(Nz), indexing='ij')
+    i, j, k = i.reshape(-1), j.reshape(-1), k.reshape(-1)
+    cells = onp.stack([node_ids[i, j, k], node_ids[i + 1, j, k], node_ids[i + 1, j + 1, k], node_ids[i, j + 1, k],
+                       node_ids[i, j, k + 1], node_ids[i + 1, j, k + 1], node_ids[i + 1, j + 1, k + 1],
+                       node_ids[i, j + 1, k + 1]], axis=1)
+    perm = onp.random.default_rng(0).permutation(node_ids.size)
+    return perm[cells], node_ids.size
+
+
+class Test(unittest.TestCase):
+    """Test symbolic assembly plan
+    """
+    def test_assemble(self):
+        """Compare plan-based assembly with duplicated COO assembly
+        """
+        cells, num_total_nodes = structured_hex_cells(3, 4, 2)
+        num_cells, num_nodes = cells.shape
+        for vec in [1, 3]:
+            plan = AssemblyPlan(cells, vec, num_total_nodes)
+            cells_jac = onp.random.default_rng(1).random((num_cells, num_nodes, vec, num_nodes, vec))
+
+            inds = (vec*cells[:, :, None] + onp.arange(vec)[None, None, :]).reshape(num_cells, -1)
+            I = onp.repeat(inds[:, :, None], num_nodes*vec, axis=2).reshape(-1)
+            J = onp.repeat(inds[:, None, :], num_nodes*vec, axis=1).reshape(-1)
+            A_coo = scipy.sparse.csr_array((cells_jac.reshape(-1), (I, J)), shape=(plan.num_total_dofs, plan.num_total_dofs))
+            A_coo.sort_indices()
+
+            A_plan = plan.to_scipy(plan.assemble(cells_jac))
+            self.assertEqual(A_plan.nnz, A_coo.nnz)
+            onptest.assert_array_equal(A_plan.indptr, A_coo.indptr)
+            onptest.assert_array_equal(A_plan.indices, A_coo.indices)
+            onptest.assert_array_almost_equal(A_plan.data, A_coo.data)
+
+            # Subset of cells, as used by Cauchy boundary faces
+            cell_inds = onp.array([0, 5, 5, 7])
+            data = plan.assemble(cells_jac[cell_inds], cell_inds)
+            dense = onp.zeros((plan.num_total_dofs, plan.num_total_dofs))
+            onp.add.at(dense, (inds[cell_inds][:, :, None], inds[cell_inds][:, None, :]),
+                       cells_jac[cell_inds].reshape(len(cell_inds), num_nodes*vec, num_nodes*vec))
+            onptest.assert_array_almost_equal(plan.to_scipy(data).toarray(), dense)
+
+            x = onp.random.default_rng(2).random(plan.num_total_dofs)
+            onptest.assert_allclose(plan.to_bcoo(A_plan.data) @ x, A_coo @ x, rtol=1e-5)
+
+    def test_assemble_symmetric(self):
+        """Half-storage assembly of symmetric cell Jacobians recovers the full matrix
+        """
+        cells, num_total_nodes = structured_hex_cells(3, 2, 2)
+        num_cells, num_nodes = cells.shape
+        for vec in [1, 3]:
+            plan = AssemblyPlan(cells, vec, num_total_nodes)
+            plan_sym = AssemblyPlan(cells, vec, num_total_nodes, symmetric=True)
+            cells_jac = onp.random.default_rng(1).random((num_cells, num_nodes*vec, num_nodes*vec))
+            cells_jac = cells_jac + onp.transpose(cells_jac, axes=(0, 2, 1))
+            cells_jac_triu = cells_jac[:, plan_sym.cell_triu_inds[0], plan_sym.cell_triu_inds[1]]
+
+            data = plan.assemble(cells_jac)
+            data_sym = plan_sym.assemble(cells_jac_triu)
+            self.assertEqual(2*plan_sym.nnz - plan_sym.num_total_dofs, plan.nnz)
+            onptest.assert_array_almost_equal(plan_sym.to_scipy(data_sym).toarray(), plan.to_scipy(data).toarray())
+            onptest.assert_array_almost_equal(plan_sym.diagonal(data_sym), plan.diagonal(data))
+            dense = plan.to_scipy(data).toarray().reshape(num_total_nodes, vec, num_total_nodes, vec)
+            blocks = dense[onp.arange(num_total_nodes), :, onp.arange(num_total_nodes), :]
+            onptest.assert_array_almost_equal(plan.block_diagonal(data), blocks)
+            onptest.assert_array_almost_equal(plan_sym.block_diagonal(data_sym), blocks)
+
+            x = onp.random.default_rng(2).random(plan.num_total_dofs)
+            onptest.assert_allclose(plan_sym.get_matvec(data_sym)(x), plan.to_scipy(data) @ x, rtol=1e-5)
+
+    def test_symmetric_solve(self):
+        """A symmetric problem is solved by CG on the half-storage matrix, without building the full matrix 
+        on the host, and gives the solution of the non-symmetric mode
+        """
+        mesh = structured_box_mesh(4, 3, 3, ele_type='HEX8')
+        left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+        right = lambda point: np.isclose(point[0], 1., atol=1e-5)
+        zero = lambda point: 0.
+        shear = lambda point: 0.01
+        dirichlet_bc_info = [[left, left, left, right, right], [0, 1, 2, 0, 2], [zero, zero, zero, shear, shear]]
+        for precond in ['jacobi', 'block_jacobi']:
+            sols = []
+            for symmetric in [False, True]:
+                problem = LinearElasticity(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info, symmetric=symmetric)
+                sol, report = solver(problem, linear=True, precond=precond, return_report=True)
+                self.assertTrue(report.converged)
+                self.assertEqual(report.linear_solves[-1]['method'], 'cg' if symmetric else 'bicgstab')
+                self.assertIsNone(problem.A_sp_scipy)
+                sols.append(sol)
+            onptest.assert_allclose(sols[1], sols[0], atol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import LinearPoisson
+from jax_am.fem.solver import solver, solver_batch
+from jax_am.fem.tests.problems import BatchRVE, rve_problem, stretched_hyperelastic_box
+
+
+class Test(unittest.TestCase):
+    """Test batched solves
+    """
+    def test_parameter_sweep(self):
+        """A batch of macroscopic strains of a periodic RVE gives the solutions of separate solves
+        """
+        problem = rve_problem(4, BatchRVE)
+        H_bars = np.stack([problem.H_bar, -0.5*problem.H_bar, problem.H_bar.T])
+        # The modulus field is shared by the batch
+        internal_vars = {'laplace': [problem.E, np.broadcast_to(H_bars[:, None, None], (3,) + problem.E.shape + (3, 3))]}
+        sols, report = solver_batch(problem, internal_vars=internal_vars, internal_vars_axes={'laplace': [None, 0]}, 
+                                    return_report=True)
+        self.assertEqual(report.batch_converged, [True]*3)
+        for H_bar, sol in zip(H_bars, sols):
+            problem.H_bar = H_bar
+            onp.testing.assert_allclose(sol, solver(problem, periodic_method='master_slave'), atol=1e-8)
+
+    def test_bc_sweep(self):
+        """Batched Dirichlet values of a nonlinear problem reuse the compiled batched solve
+        """
+        problem = stretched_hyperelastic_box()
+        bc_vals = np.stack([scale*problem.bc_vals for scale in [0.5, 1., 1.5]])
+        sols = solver_batch(problem, bc_vals=bc_vals)
+        sols, report = solver_batch(problem, bc_vals=bc_vals[::-1], return_report=True)
+        self.assertEqual(report.kernel_cache['misses'], 0)
+        for vals, sol in zip(bc_vals[::-1], sols):
+            problem.bc_vals = vals
+            onp.testing.assert_allclose(sol, solver(problem), atol=1e-7)
+
+    def test_linear_load_cases(self):
+        """Load cases of a linear problem are solved as multiple right-hand sides of one factorization, 
+        or one after the other by the Krylov backends, without changing the solver state of the problem
+        """
+        mesh = structured_box_mesh(6, 6, 6, ele_type='HEX8')
+        left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+        right = lambda point: np.isclose(point[0], 1., atol=1e-5)
+        dirichlet_bc_info = [[left, right], [0, 0], [lambda point: 0., lambda point: 1.]]
+        problem = LinearPoisson(mesh, vec=1, dim=3, dirichlet_bc_info=dirichlet_bc_info)
+        body_force = np.stack([scale*problem.compute_body_force_by_fn() for scale in [0., 1., 2.]])
+        body_force = body_force.at[1:].add(1e-2)
+        bc_vals = np.stack([problem.bc_vals, -problem.bc_vals, 2.*problem.bc_vals])
+        solver_batch(problem, bc_vals=bc_vals, body_force=body_force, linear=True)
+        sols, report = solver_batch(problem, bc_vals=bc_vals, body_force=body_force, linear=True, return_report=True)
+        self.assertTrue(report.linear_solves[0]['factorization_reused'])
+        with self.assertRaises(ValueError):
+            solver_batch(problem, bc_vals=bc_vals, linear=True, precond='jacobi')
+        for linear_solver in ['jax_krylov', 'scipy_krylov']:
+            sols_krylov, report = solver_batch(problem, bc_vals=bc_vals, body_force=body_force, linear=True, 
+                                               linear_solver=linear_solver, return_report=True)
+            self.assertEqual(report.batch_converged, [True]*3)
+            onp.testing.assert_allclose(sols_krylov, sols, atol=1e-7)
+        self.assertFalse(hasattr(problem, 'periodic_master_inds') or hasattr(problem, 'linear_solver'))
+        for vals, force, sol in zip(bc_vals, body_force, sols):
+            problem.bc_vals, problem.body_force = vals, force
+            onp.testing.assert_allclose(sol, solver(problem, linear=True), atol=1e-7)
+
+
+if __name__ == '__main__':
+    unittest.main()
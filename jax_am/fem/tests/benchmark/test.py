@@ -0,0 +1,43 @@
+import numpy as onp
+import copy
+import json
+import unittest
+
+from jax_am.fem.benchmark import run_benchmarks, compare_to_baseline, TIME_METRICS
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import LinearPoisson
+
+
+class Test(unittest.TestCase):
+    """Test structured box meshes and the benchmark suite
+    """
+    def test_structured_box_mesh(self):
+        """All elements are positively oriented and fill the box
+        """
+        for ele_type, num_cells, num_nodes in [('HEX8', 24, 60), ('HEX27', 24, 315), ('TET4', 144, 60), ('TET10', 144, 315)]:
+            mesh = structured_box_mesh(2, 3, 4, 1., 2., 3., ele_type)
+            self.assertEqual(mesh.cells.shape[0], num_cells)
+            self.assertEqual(mesh.points.shape[0], num_nodes)
+            problem = LinearPoisson(mesh, vec=1, dim=3, ele_type=ele_type)
+            self.assertGreater(onp.min(problem.JxW), 0.)
+            onp.testing.assert_allclose(onp.sum(problem.JxW), 6., rtol=1e-12)
+
+    def test_benchmark(self):
+        """Results are JSON serializable and compare cleanly against themselves, but not against a faster baseline
+        """
+        results = run_benchmarks(['poisson'], ['HEX8'], [2], repeats=1)
+        json.dumps(results)
+        record = results['results'][0]
+        self.assertEqual(record['num_dofs'], 27)
+        self.assertTrue(record['converged'])
+        self.assertEqual(set(TIME_METRICS).difference(record['metrics']), set())
+
+        self.assertEqual(compare_to_baseline(results, results), [])
+        baseline = copy.deepcopy(results)
+        baseline['results'][0]['metrics']['solve'] = record['metrics']['solve']/10.
+        regressions = compare_to_baseline(results, baseline, min_time=0.)
+        self.assertEqual([r['metric'] for r in regressions], ['solve'])
+
+
+if __name__ == '__main__':
+    unittest.main()
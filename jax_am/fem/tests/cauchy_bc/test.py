@@ -0,0 +1,68 @@
+import numpy as onp
+import jax
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import LinearPoisson
+
+
+def scatter(problem, values, face_cells, jac_flag):
+    """Global residual (num_total_dofs,) or dense Jacobian (num_total_dofs, num_total_dofs) of face values
+    """
+    dofs = (face_cells[:, :, None]*problem.vec + onp.arange(problem.vec)[None, None, :]).reshape(len(face_cells), -1)
+    values = onp.asarray(values).reshape(len(face_cells), dofs.shape[1], -1)
+    if not jac_flag:
+        res = onp.zeros(problem.num_total_dofs)
+        onp.add.at(res, dofs, values[:, :, 0])
+        return res
+    A = onp.zeros((problem.num_total_dofs, problem.num_total_dofs))
+    onp.add.at(A, (dofs[:, :, None], dofs[:, None, :]), values)
+    return A
+
+
+def baseline_face(problem, cells_sol, jac_flag):
+    """Per-boundary evaluation of the Cauchy integrals, with the face data recomputed on every call
+    """
+    location_fns, value_fns = problem.cauchy_bc_info
+    values, face_cells = [], []
+    for i, boundary_inds in enumerate(problem.get_boundary_conditions_inds(location_fns)):
+        _, nanson_scale = problem.get_face_shape_grads(boundary_inds)
+        kernel = problem.get_cauchy_kernel(value_fns[i])
+        fn = jax.jacfwd(kernel) if jac_flag else kernel
+        values.append(jax.vmap(fn)(cells_sol[boundary_inds[:, 0]], problem.face_shape_vals[boundary_inds[:, 1]], 
+                                   nanson_scale))
+        face_cells.append(problem.cells[boundary_inds[:, 0]])
+    return np.vstack(values), onp.vstack(face_cells)
+
+
+class Test(unittest.TestCase):
+    """Test the precomputed face data and the fused kernel of Cauchy B.C. against a per-boundary evaluation
+    """
+    def test_residual_and_jacobian(self):
+        mesh = structured_box_mesh(3, 2, 2, ele_type='HEX8')
+        location_fns = [lambda point: np.isclose(point[0], 0., atol=1e-5), 
+                        lambda point: np.isclose(point[0], 1., atol=1e-5),
+                        lambda point: np.isclose(point[1], 0., atol=1e-5)]
+        value_fns = [lambda u: u**3, lambda u: 2.*u, lambda u: np.sin(u)]
+        problem = LinearPoisson(mesh, vec=1, dim=3, cauchy_bc_info=[location_fns, value_fns])
+        rng = onp.random.default_rng(0)
+        sol = rng.random((problem.num_total_nodes, problem.vec))
+        inc = rng.random((problem.num_total_nodes, problem.vec))
+        cells_sol, cells_inc = sol[problem.cells], inc[problem.cells]
+
+        for jac_flag in [False, True]:
+            values, face_cells = baseline_face(problem, cells_sol, jac_flag)
+            expected = scatter(problem, values, face_cells, jac_flag)
+            values, selected_cell_inds = problem.compute_face(cells_sol, np, jac_flag)
+            actual = scatter(problem, values, problem.cells[selected_cell_inds], jac_flag)
+            onp.testing.assert_allclose(actual, expected, rtol=1e-12, atol=1e-14)
+            self.assertGreater(onp.max(onp.abs(expected)), 0.)
+
+        values, selected_cell_inds = problem.compute_face(cells_sol, np, False, cells_inc)
+        jvp = scatter(problem, values, problem.cells[selected_cell_inds], False)
+        onp.testing.assert_allclose(jvp, expected @ inc.reshape(-1), rtol=1e-12, atol=1e-14)
+
+
+if __name__ == '__main__':
+    unittest.main()
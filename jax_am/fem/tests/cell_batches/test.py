@@ -0,0 +1,36 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import HyperElasticity
+
+
+class Test(unittest.TestCase):
+    """Test that evaluating cell kernels batch by batch does not change the results
+    """
+    def test_batched_equals_unbatched(self):
+        """Batch sizes that divide the number of cells or not (the last batch then overlaps the previous one)
+        """
+        mesh = structured_box_mesh(3, 2, 2, ele_type='HEX8')
+        problem = HyperElasticity(mesh, vec=3, dim=3)
+        sol = 0.05*onp.random.default_rng(0).random((problem.num_total_nodes, problem.vec))
+        res = problem.newton_vars(sol)
+        A_data = problem.A_data
+        res_diag, jac_diag = problem.compute_cell_jac_diag(sol[problem.cells], np)
+        inc = onp.random.default_rng(1).random((problem.num_total_nodes, problem.vec))
+        jvp = problem.compute_linearized_residual(inc)
+
+        for batch_size in [1, 5, 6, problem.num_cells - 1]:
+            problem.get_cell_batch_size = lambda fn, input_collection: batch_size
+            problem.clear_kernel_cache()
+            onp.testing.assert_allclose(problem.newton_vars(sol), res, rtol=1e-12, atol=1e-14)
+            onp.testing.assert_allclose(problem.A_data, A_data, rtol=1e-12, atol=1e-14)
+            outputs = problem.compute_cell_jac_diag(sol[problem.cells], np)
+            onp.testing.assert_allclose(outputs[0], res_diag, rtol=1e-12, atol=1e-14)
+            onp.testing.assert_allclose(outputs[1], jac_diag, rtol=1e-12, atol=1e-14)
+            onp.testing.assert_allclose(problem.compute_linearized_residual(inc), jvp, rtol=1e-12, atol=1e-14)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import LinearElasticity
+from jax_am.fem.solver import solver, assign_bc
+
+
+def sequential_bc_vals(problem):
+    """Dirichlet values applied group by group, so that the last group constraining a dof wins
+    """
+    dofs = onp.full(problem.num_total_dofs, onp.nan)
+    for node_inds, vec_inds, vals in zip(problem.node_inds_list, problem.vec_inds_list, problem.vals_list):
+        dofs[problem.vec*node_inds + vec_inds] = vals
+    return dofs
+
+
+class Test(unittest.TestCase):
+    """Test the fusion of overlapping Dirichlet B.C. groups
+    """
+    def setUp(self):
+        self.mesh = structured_box_mesh(3, 3, 3, ele_type='HEX8')
+        left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+        bottom = lambda point: np.isclose(point[1], 0., atol=1e-5)
+        right = lambda point: np.isclose(point[0], 1., atol=1e-5)
+        # Groups 0, 1 and 2 constrain the same x-component dofs on the left/bottom edge, 
+        # group 2 also overrides all of group 0
+        self.dirichlet_bc_info = [[left, bottom, left, left, left, right], [0, 0, 0, 1, 2, 0],
+                                  [lambda point: 1., lambda point: 2., lambda point: 0.1*point[1], 
+                                   lambda point: 0., lambda point: 0., lambda point: 0.05]]
+
+    def check_fused(self, problem):
+        baseline = sequential_bc_vals(problem)
+        bc_dof_inds = onp.flatnonzero(~onp.isnan(baseline))
+        onp.testing.assert_array_equal(problem.bc_dof_inds, bc_dof_inds)
+        onp.testing.assert_allclose(problem.bc_vals, baseline[bc_dof_inds], rtol=0., atol=0.)
+        dofs = onp.asarray(assign_bc(np.zeros(problem.num_total_dofs), problem))
+        onp.testing.assert_allclose(dofs[bc_dof_inds], baseline[bc_dof_inds], rtol=0., atol=0.)
+
+    def test_last_group_wins(self):
+        problem = LinearElasticity(self.mesh, vec=3, dim=3, dirichlet_bc_info=self.dirichlet_bc_info)
+        self.check_fused(problem)
+        # The edge x = y = 0 is set by group 1, then overridden by group 2
+        points = problem.mesh.points
+        edge = onp.flatnonzero(onp.isclose(points[:, 0], 0.) & onp.isclose(points[:, 1], 0.))
+        onp.testing.assert_allclose(problem.bc_vals[onp.searchsorted(problem.bc_dof_inds, 3*edge)], 0.)
+
+        sol = solver(problem)
+        baseline = sequential_bc_vals(problem)
+        bc_dof_inds = onp.flatnonzero(~onp.isnan(baseline))
+        onp.testing.assert_allclose(onp.asarray(sol).reshape(-1)[bc_dof_inds], baseline[bc_dof_inds], atol=1e-10)
+
+    def test_update(self):
+        problem = LinearElasticity(self.mesh, vec=3, dim=3, dirichlet_bc_info=self.dirichlet_bc_info)
+        location_fns, vecs, value_fns = self.dirichlet_bc_info
+        # Reversing the groups makes group 0 override group 2 on the left face
+        problem.update_Dirichlet_boundary_conditions([location_fns[::-1], vecs[::-1], value_fns[::-1]])
+        self.check_fused(problem)
+        left = onp.flatnonzero(onp.isclose(problem.mesh.points[:, 0], 0.))
+        onp.testing.assert_allclose(problem.bc_vals[onp.searchsorted(problem.bc_dof_inds, 3*left)], 1.)
+
+    def test_no_bc(self):
+        problem = LinearElasticity(self.mesh, vec=3, dim=3)
+        self.assertEqual(len(problem.bc_dof_inds), 0)
+        self.assertEqual(len(problem.bc_vals), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
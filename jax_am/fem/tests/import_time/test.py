@@ -0,0 +1,47 @@
+import json
+import subprocess
+import sys
+import unittest
+
+
+MODULES = ['jax_am.fem.core', 'jax_am.fem.solver', 'jax_am.fem.models', 'jax_am.fem.generate_mesh', 
+           'jax_am.phase_field.utils', 'jax_am.cfd.cfd_am']
+HEAVY_MODULES = ['gmsh', 'meshio', 'orix', 'matplotlib', 'sklearn']
+
+SCRIPT = """
+import json, sys, time
+import numpy as onp
+import jax
+print_options = onp.get_printoptions()
+start = time.time()
+for module in {modules}:
+    __import__(module)
+print(json.dumps({{'import_time': time.time() - start, 
+                  'loaded': [m for m in {heavy} if m in sys.modules], 
+                  'x64': bool(jax.config.jax_enable_x64), 
+                  'print_options_changed': onp.get_printoptions() != print_options}}))
+"""
+
+
+def measure_imports():
+    """Import the solver-side modules in a fresh interpreter.
+    jax itself is imported before the timer starts, so the time measures jax_am only.
+    """
+    script = SCRIPT.format(modules=MODULES, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+class Test(unittest.TestCase):
+    """Import-time benchmark: importing jax_am must be cheap and free of global side effects
+    """
+    def test_import(self):
+        result = measure_imports()
+        print(f"Importing {MODULES} took {result['import_time']:.3f} [s]")
+        self.assertEqual(result['loaded'], [], f"Optional dependencies loaded at import time")
+        self.assertFalse(result['x64'], f"jax_enable_x64 changed at import time")
+        self.assertFalse(result['print_options_changed'], f"numpy print options changed at import time")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import Plasticity
+
+
+class Test(unittest.TestCase):
+    """Test the kernel cache of FEM
+    """
+    def test_hits_and_misses(self):
+        """Repeated assembly with new internal variable values hits the cache and uses the new values
+        """
+        mesh = structured_box_mesh(2, 2, 2, ele_type='HEX8')
+        problem = Plasticity(mesh, vec=3, dim=3, dirichlet_bc_info=[[], [], []])
+        sol = 1e-3*onp.random.default_rng(0).random((problem.num_total_nodes, problem.vec))
+        self.assertEqual(problem.kernel_cache_info(), {'hits': 0, 'misses': 0, 'size': 0})
+
+        res_0 = problem.newton_update(sol)
+        info = problem.kernel_cache_info()
+        self.assertGreater(info['misses'], 0)
+        self.assertEqual(info['hits'], 0)
+
+        problem.epsilons_old = problem.epsilons_old + 1e-4
+        res_1 = problem.newton_update(sol)
+        self.assertEqual(problem.kernel_cache_info(), {**info, 'hits': info['misses']})
+        self.assertGreater(np.max(np.abs(res_1 - res_0)), 0.)
+
+        problem.clear_kernel_cache()
+        self.assertEqual(problem.kernel_cache_info(), {'hits': 0, 'misses': 0, 'size': 0})
+        onp.testing.assert_allclose(problem.newton_update(sol), res_1, rtol=1e-12)
+        self.assertEqual(problem.kernel_cache_info()['misses'], info['misses'])
+
+
+if __name__ == '__main__':
+    unittest.main()
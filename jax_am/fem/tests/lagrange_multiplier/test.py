@@ -0,0 +1,39 @@
+import numpy as onp
+import unittest
+
+from jax_am.fem.solver import solver
+from jax_am.fem.tests.problems import rve_problem
+
+
+class Test(unittest.TestCase):
+    """Test the preconditioned Lagrange multiplier solver
+    """
+    def test_block_preconditioner(self):
+        """With the default scaling of the constraints, the block triangular preconditioner cuts the 
+        BiCGSTAB iterations and gives the master-slave solution
+        """
+        problem = rve_problem(4)
+        sol_ref = solver(problem, periodic_method='master_slave')
+        sol, report_ref = solver(problem, precond=False, return_report=True)
+        del problem.p_num_eps
+        for precond in ['jacobi', 'block_jacobi']:
+            sol, report = solver(problem, precond=precond, return_report=True)
+            self.assertTrue(report.converged)
+            onp.testing.assert_allclose(sol, sol_ref, atol=1e-8)
+            self.assertLess(sum(s['iterations'] for s in report.linear_solves), 
+                            sum(s['iterations'] for s in report_ref.linear_solves)/3)
+
+    def test_newton_options(self):
+        """The iteration cap is reported as non-convergence, and unsupported options raise
+        """
+        problem = rve_problem(3)
+        del problem.p_num_eps
+        sol, report = solver(problem, newton_options={'max_iter': 1}, return_report=True)
+        self.assertFalse(report.converged)
+        self.assertEqual(len(report.newton_res_history), 2)
+        with self.assertRaises(NotImplementedError):
+            solver(problem, newton_options={'line_search': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
 import unittest
+import jax_am
 from . import __path__
 
+# FEM needs 64-bit floats, enabled before any test creates JAX arrays
+jax_am.enable_x64()
+
 suite = unittest.TestLoader().discover(__path__[0])
 unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,46 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import LinearElasticity
+from jax_am.fem.solver import solver
+
+
+def get_problem(symmetric):
+    mesh = structured_box_mesh(3, 3, 3, ele_type='HEX8')
+    left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+    right = lambda point: np.isclose(point[0], 1., atol=1e-5)
+    zero = lambda point: 0.
+    stretch = lambda point: 0.01
+    dirichlet_bc_info = [[left, left, left, right], [0, 1, 2, 0], [zero, zero, zero, stretch]]
+    return LinearElasticity(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info, symmetric=symmetric)
+
+
+class Test(unittest.TestCase):
+    """Test the linear solver backends
+    """
+    def test_backends(self):
+        """scipy Krylov and direct backends agree with the JAX Krylov backend
+        """
+        for symmetric in [False, True]:
+            problem = get_problem(symmetric)
+            sol_ref = solver(problem, linear=True)
+            for linear_solver in ['scipy_krylov', 'scipy_direct']:
+                sol, report = solver(problem, linear=True, linear_solver=linear_solver, return_report=True)
+                onp.testing.assert_allclose(sol, sol_ref, atol=1e-8)
+                self.assertTrue(report.converged)
+
+    def test_factorization_reuse(self):
+        """The LU factorization is reused while the matrix is unchanged
+        """
+        problem = get_problem(False)
+        _, report = solver(problem, linear=True, linear_solver='scipy_direct', return_report=True)
+        self.assertFalse(report.linear_solves[0]['factorization_reused'])
+        _, report = solver(problem, linear=True, linear_solver='scipy_direct', return_report=True)
+        self.assertTrue(report.linear_solves[0]['factorization_reused'])
+        self.assertEqual(report.linear_solves[0]['method'], 'splu')
+
+
+if __name__ == '__main__':
+    unittest.main()
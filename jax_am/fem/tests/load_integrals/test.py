@@ -0,0 +1,63 @@
+import numpy as onp
+import jax
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import LinearPoisson
+
+
+class Test(unittest.TestCase):
+    """Test body force and Neumann integrals
+    """
+    def test_load_integrals(self):
+        """Summed nodal loads equal the exact integrals over the box [0, 1] x [0, 2] x [0, 1.5]
+        """
+        def top(point):
+            return np.isclose(point[2], 1.5, atol=1e-5)
+
+        def side(point):
+            return np.isclose(point[0], 1., atol=1e-5)
+
+        neumann_bc_info = [[top, side], [lambda x: np.array([x[0]]), lambda x: np.array([x[1] + x[2]])]]
+        for ele_type in ['HEX8', 'TET4', 'HEX27', 'TET10']:
+            mesh = structured_box_mesh(3, 2, 2, 1., 2., 1.5, ele_type=ele_type)
+            problem = LinearPoisson(mesh, vec=1, dim=3, ele_type=ele_type, neumann_bc_info=neumann_bc_info, 
+                                    source_info=lambda x: np.array([x[0]]))
+            # Linear loads are integrated exactly: int x dV = 1.5, int_top x dA = 1, int_side (y + z) dA = 3 + 2.25
+            onp.testing.assert_allclose(onp.sum(problem.body_force), 1.5, rtol=1e-10)
+            onp.testing.assert_allclose(onp.sum(problem.neumann), 1. + 5.25, rtol=1e-10)
+            # The mass term of the interpolated coordinate x is exact for all element types
+            body_force_by_sol = problem.compute_body_force_by_sol(np.array(mesh.points[:, :1]), lambda u: u)
+            onp.testing.assert_allclose(body_force_by_sol, problem.body_force, atol=1e-12)
+
+    def test_face_interpolation(self):
+        """Values at the face quadrature points, compared point by point with a linear field, which all element 
+        types reproduce exactly, and with face shape values gathered per selected face
+        """
+        def boundary(point):
+            return np.isclose(point[0], 0., atol=1e-5) | np.isclose(point[1], 2., atol=1e-5) | \
+                   np.isclose(point[2], 1.5, atol=1e-5)
+
+        field = lambda x: np.array([1. + 2.*x[0] - x[1] + 0.5*x[2], 3.])
+        for ele_type in ['HEX8', 'TET4', 'HEX27', 'TET10']:
+            mesh = structured_box_mesh(3, 2, 2, 1., 2., 1.5, ele_type=ele_type)
+            problem = LinearPoisson(mesh, vec=2, dim=3, ele_type=ele_type)
+            boundary_inds = problem.get_boundary_conditions_inds([boundary])[0]
+            # Shuffled, so that faces of different local faces are interleaved
+            boundary_inds = boundary_inds[onp.random.default_rng(0).permutation(len(boundary_inds))]
+            sol = jax.vmap(field)(mesh.points)
+            u = problem.interpolate_to_face_quads(sol, boundary_inds)
+            quad_points = problem.get_physical_surface_quad_points(boundary_inds)
+            onp.testing.assert_allclose(u, jax.vmap(jax.vmap(field))(quad_points), rtol=1e-12, atol=1e-12)
+
+            sol = onp.random.default_rng(1).random(sol.shape)
+            face_shape_vals = problem.face_shape_vals[boundary_inds[:, 1]]
+            u_ref = onp.einsum('fqn,fnv->fqv', face_shape_vals, sol[problem.cells[boundary_inds[:, 0]]])
+            onp.testing.assert_allclose(problem.interpolate_to_face_quads(sol, boundary_inds), u_ref, rtol=1e-12)
+            onp.testing.assert_allclose(problem.interpolate_to_face_quads(sol, boundary_inds[:0]).shape, 
+                                        (0, face_shape_vals.shape[1], 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import HyperElasticity
+from jax_am.fem.solver import solver
+
+
+def get_problem():
+    mesh = structured_box_mesh(3, 2, 2, ele_type='HEX8')
+    left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+    right = lambda point: np.isclose(point[0], 1., atol=1e-5)
+    zero = lambda point: 0.
+    stretch = lambda point: 0.1
+    dirichlet_bc_info = [[left, left, left, right], [0, 1, 2, 0], [zero, zero, zero, stretch]]
+    return HyperElasticity(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info)
+
+
+class Test(unittest.TestCase):
+    """Test the matrix-free (Newton-Krylov) path against the assembled one
+    """
+    def test_linearization(self):
+        """Cell JVPs and the Jacobian diagonal match the assembled matrix
+        """
+        problem = get_problem()
+        rng = onp.random.default_rng(0)
+        sol = 0.05*rng.random((problem.num_total_nodes, problem.vec))
+        inc = rng.random((problem.num_total_nodes, problem.vec))
+
+        res = problem.newton_vars(sol)
+        A = problem.assembly_plan.to_scipy(problem.A_data)
+        res_matrix_free = problem.newton_vars_matrix_free(sol)
+        onp.testing.assert_allclose(res_matrix_free, res, rtol=1e-10, atol=1e-12)
+        onp.testing.assert_allclose(problem.A_diag, A.diagonal(), rtol=1e-10, atol=1e-12)
+        jvp = problem.compute_linearized_residual(inc)
+        onp.testing.assert_allclose(jvp.reshape(-1), A @ inc.reshape(-1), rtol=1e-10, atol=1e-12)
+
+    def test_solve(self):
+        sol_ref = solver(get_problem())
+        sol, report = solver(get_problem(), matrix_free=True, return_report=True)
+        self.assertTrue(report.converged)
+        self.assertEqual(report.nnz, 0)
+        onp.testing.assert_allclose(sol, sol_ref, rtol=1e-6, atol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
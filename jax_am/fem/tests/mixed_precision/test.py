@@ -0,0 +1,46 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import LinearElasticity
+from jax_am.fem.solver import solver
+
+
+def get_problem(**kwargs):
+    mesh = structured_box_mesh(4, 2, 2, Lx=2.)
+    left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+    right = lambda point: np.isclose(point[0], 2., atol=1e-5)
+    zero = lambda point: 0.
+    dirichlet_bc_info = [[left, left, left, right, right], [0, 1, 2, 1, 2], [zero, zero, zero, zero, zero]]
+    neumann_bc_info = [[right], [lambda point: np.array([10., 0., 0.])]]
+    return LinearElasticity(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info, 
+                            neumann_bc_info=neumann_bc_info, **kwargs)
+
+
+class Test(unittest.TestCase):
+    """Test precision='mixed' against the float64 solve
+    """
+    def test_iterative_refinement(self):
+        """float32 Jacobians alone give a float32-accurate solution, and iterative refinement 
+        with float64 residuals recovers the float64 one
+        """
+        problem = get_problem()
+        sol_ref = solver(problem, linear=True)
+        scale = np.max(np.abs(sol_ref))
+
+        problem_32 = get_problem(precision='mixed')
+        sol_32 = solver(problem_32, linear=True)
+        self.assertEqual(problem_32.A_data.dtype, np.float32)
+        error_32 = np.max(np.abs(sol_32 - sol_ref))/scale
+        self.assertLess(error_32, 1e-4)
+
+        problem_refined = get_problem(precision='mixed', iterative_refinement=5)
+        sol_refined = solver(problem_refined, linear=True)
+        error_refined = np.max(np.abs(sol_refined - sol_ref))/scale
+        self.assertLess(error_refined, 1e-8)
+        self.assertLess(error_refined, 1e-3*error_32)
+
+
+if __name__ == '__main__':
+    unittest.main()
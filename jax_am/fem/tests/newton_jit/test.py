@@ -0,0 +1,34 @@
+import numpy as onp
+import unittest
+
+from jax_am.fem.solver import solver, solver_jit
+from jax_am.fem.tests.problems import stretched_hyperelastic_box
+
+
+class Test(unittest.TestCase):
+    """Test the device-resident Newton solver
+    """
+    def test_solver_jit(self):
+        """solver_jit matches solver, and a second solve with new B.C. values reuses the compiled Newton loop
+        """
+        problem = stretched_hyperelastic_box()
+        sol_ref = solver(problem)
+        for precond in [True, 'block_jacobi']:
+            sol, report = solver_jit(problem, precond=precond, return_report=True)
+            self.assertTrue(report.converged)
+            onp.testing.assert_allclose(sol, sol_ref, atol=1e-7)
+
+        sol, report = solver_jit(problem, newton_options={'forcing': 'eisenstat_walker', 'line_search': True}, 
+                                 return_report=True)
+        self.assertTrue(report.converged)
+        onp.testing.assert_allclose(sol, sol_ref, atol=1e-7)
+
+        problem.bc_vals = 0.5*problem.bc_vals
+        sol_ref = solver(problem)
+        sol, report = solver_jit(problem, return_report=True)
+        self.assertEqual(report.kernel_cache['misses'], 0)
+        onp.testing.assert_allclose(sol, sol_ref, atol=1e-7)
+
+
+if __name__ == '__main__':
+    unittest.main()
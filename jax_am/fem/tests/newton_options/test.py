@@ -0,0 +1,56 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import HyperElasticity
+from jax_am.fem.solver import solver
+
+
+def get_problem():
+    mesh = structured_box_mesh(4, 4, 4, ele_type='HEX8')
+    left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+    right = lambda point: np.isclose(point[0], 1., atol=1e-5)
+    zero = lambda point: 0.
+    stretch = lambda point: 0.2
+    shear = lambda point: 0.1
+    dirichlet_bc_info = [[left, left, left, right, right, right], [0, 1, 2, 0, 1, 2], 
+                         [zero, zero, zero, stretch, zero, shear]]
+    return HyperElasticity(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info)
+
+
+class Test(unittest.TestCase):
+    """Test the configurable Newton solver
+    """
+    def test_inexact_newton(self):
+        """Eisenstat-Walker forcing, line search and Jacobian lagging converge to the exact Newton solution
+        """
+        problem = get_problem()
+        sol_ref, report_ref = solver(problem, return_report=True)
+        krylov_iterations_ref = sum(s['iterations'] for s in report_ref.linear_solves)
+        for newton_options in [{'forcing': 'eisenstat_walker'}, {'line_search': True}, {'jacobian_lag': 2}]:
+            sol, report = solver(problem, newton_options=newton_options, return_report=True)
+            self.assertTrue(report.converged)
+            onp.testing.assert_allclose(sol, sol_ref, atol=1e-7)
+            if 'forcing' in newton_options:
+                self.assertLess(sum(s['iterations'] for s in report.linear_solves), krylov_iterations_ref)
+            if 'jacobian_lag' in newton_options:
+                self.assertLess(report.phase_counts['newton_update'], len(report.newton_res_history) + 1)
+            if 'line_search' in newton_options:
+                self.assertEqual(len(report.newton_step_lengths), len(report.newton_res_history) - 1)
+
+    def test_failures(self):
+        """The iteration cap is reported as non-convergence, and divergence raises
+        """
+        problem = get_problem()
+        sol, report = solver(problem, newton_options={'max_iter': 1}, return_report=True)
+        self.assertFalse(report.converged)
+        self.assertEqual(len(report.newton_res_history), 2)
+        with self.assertRaises(RuntimeError):
+            solver(problem, newton_options={'divergence_factor': 1e-3})
+        with self.assertRaises(AssertionError):
+            solver(problem, newton_options={'maxiter': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import numpy as onp
+import unittest
+
+from jax_am.fem.solver import solver, get_periodic_master_inds
+from jax_am.fem.tests.problems import rve_problem
+
+
+class Test(unittest.TestCase):
+    """Test master-slave elimination of periodic B.C.
+    """
+    def test_master_inds(self):
+        """Periodic pairs are chained into groups, whose master is the Dirichlet corner dof if present
+        """
+        problem = rve_problem(2)
+        master_inds = get_periodic_master_inds(problem)
+        # The 8 corners of the cell form one group per component, with the fixed corner as master
+        corners = onp.flatnonzero(onp.all(onp.isclose(problem.mesh.points % 1., 0.), axis=1))
+        self.assertEqual(len(corners), 8)
+        for i in range(3):
+            onp.testing.assert_array_equal(master_inds[3*corners + i], problem.bc_dof_inds[i])
+        # 27 nodes, 8 independent ones (the interior, 3 face centers, 3 edge midpoints, 1 corner)
+        self.assertEqual(len(onp.unique(master_inds)), 8*3)
+
+    def test_master_slave(self):
+        """The condensed system gives the Lagrange multiplier solution with far fewer Krylov iterations 
+        than the unpreconditioned saddle-point system, and works with the other preconditioners and linear solvers
+        """
+        problem = rve_problem(4)
+        sol_ref, report_ref = solver(problem, precond=False, return_report=True)
+        for options in [{}, {'precond': 'amg'}, {'linear_solver': 'scipy_direct'}]:
+            sol, report = solver(problem, periodic_method='master_slave', return_report=True, **options)
+            self.assertTrue(report.converged)
+            onp.testing.assert_allclose(sol, sol_ref, atol=1e-8)
+            for node_inds_A, node_inds_B, vec_inds in zip(problem.p_node_inds_list_A, problem.p_node_inds_list_B, 
+                                                          problem.p_vec_inds_list):
+                onp.testing.assert_array_equal(sol[node_inds_A, vec_inds], sol[node_inds_B, vec_inds])
+            if not options:
+                self.assertLess(max(s['iterations'] for s in report.linear_solves), 
+                                max(s['iterations'] for s in report_ref.linear_solves)/10)
+
+
+if __name__ == '__main__':
+    unittest.main()
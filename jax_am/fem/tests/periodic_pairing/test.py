@@ -0,0 +1,42 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import LinearPoisson
+
+
+class Test(unittest.TestCase):
+    """Test the KD-tree pairing of periodic nodes
+    """
+    def setUp(self):
+        mesh = structured_box_mesh(2, 3, 2, ele_type='HEX8')
+        self.problem = LinearPoisson(mesh, vec=1, dim=3)
+        points = self.problem.mesh.points
+        self.node_inds_A = onp.flatnonzero(onp.isclose(points[:, 0], 0.))
+        # Shuffled, so that the pairing cannot rely on the node order
+        self.node_inds_B = onp.random.default_rng(0).permutation(onp.flatnonzero(onp.isclose(points[:, 0], 1.)))
+        self.mapping = lambda point: point + np.array([1., 0., 0.])
+
+    def test_valid_pairing(self):
+        node_inds_B = self.problem.pair_periodic_nodes(self.node_inds_A, self.node_inds_B, self.mapping)
+        points = self.problem.mesh.points
+        onp.testing.assert_allclose(points[node_inds_B], points[self.node_inds_A] + onp.array([1., 0., 0.]), atol=1e-12)
+        self.assertEqual(len(onp.unique(node_inds_B)), len(self.node_inds_A))
+
+    def test_unmatched_node(self):
+        mapping = lambda point: point + np.array([0.9, 0., 0.])
+        with self.assertRaisesRegex(ValueError, "have no node on boundary B"):
+            self.problem.pair_periodic_nodes(self.node_inds_A, self.node_inds_B, mapping)
+
+    def test_several_matches(self):
+        mesh = self.problem.mesh
+        duplicate = mesh.points[self.node_inds_B[0]] + onp.array([0., 0., 1e-6])
+        mesh.points = onp.vstack([mesh.points, duplicate])
+        node_inds_B = onp.append(self.node_inds_B, len(mesh.points) - 1)
+        with self.assertRaisesRegex(ValueError, "match several nodes on boundary B"):
+            self.problem.pair_periodic_nodes(self.node_inds_A, node_inds_B, self.mapping)
+
+
+if __name__ == '__main__':
+    unittest.main()
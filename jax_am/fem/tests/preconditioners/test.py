@@ -0,0 +1,35 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import HyperElasticity
+from jax_am.fem.solver import solver
+
+
+class Test(unittest.TestCase):
+    """Test the node-block jacobi and ILU preconditioners
+    """
+    def test_preconditioners(self):
+        """All preconditioners converge to the Jacobi preconditioned solution, for CG and BiCGSTAB
+        """
+        mesh = structured_box_mesh(4, 4, 4, ele_type='HEX8')
+        left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+        right = lambda point: np.isclose(point[0], 1., atol=1e-5)
+        zero = lambda point: 0.
+        shear = lambda point: 0.05
+        dirichlet_bc_info = [[left, left, left, right], [0, 1, 2, 1], [zero, zero, zero, shear]]
+        for symmetric in [False, True]:
+            problem = HyperElasticity(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info, symmetric=symmetric)
+            sol_ref = solver(problem, precond='jacobi')
+            for precond in ['block_jacobi', 'ilu']:
+                sol, report = solver(problem, precond=precond, return_report=True)
+                self.assertTrue(report.converged)
+                # ILU is not guaranteed to be SPD, so CG is only used with the other preconditioners
+                method = 'cg' if symmetric and precond != 'ilu' else 'bicgstab'
+                self.assertTrue(all(s['method'] == method for s in report.linear_solves))
+                onp.testing.assert_allclose(sol, sol_ref, atol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
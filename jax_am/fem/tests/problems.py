@@ -0,0 +1,89 @@
+"""Problems shared by several tests
+"""
+import jax
+import jax.numpy as np
+
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import HyperElasticity
+
+
+def stretched_hyperelastic_box():
+    """Unit cube of hyper-elastic material, clamped at x = 0, stretched and sheared at x = 1
+    """
+    mesh = structured_box_mesh(4, 4, 4, ele_type='HEX8')
+    left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+    right = lambda point: np.isclose(point[0], 1., atol=1e-5)
+    zero = lambda point: 0.
+    stretch = lambda point: 0.2
+    shear = lambda point: 0.1
+    dirichlet_bc_info = [[left, left, left, right, right, right], [0, 1, 2, 0, 1, 2],
+                         [zero, zero, zero, stretch, zero, shear]]
+    return HyperElasticity(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info)
+
+
+class RVE(HyperElasticity):
+    """Fluctuation displacement of a unit cell with a stiff spherical inclusion under the macroscopic 
+    displacement gradient H_bar
+    """
+    def custom_init(self):
+        self.H_bar = np.array([[0.05, 0.02, 0.], [0., -0.02, 0.], [0., 0.01, 0.03]])
+        points = self.get_physical_quad_points()
+        self.E = np.where(np.linalg.norm(points - 0.5, axis=-1) < 0.3, 1e4, 1e3)
+
+    def get_stress_fn(self):
+        def psi(F, E):
+            nu = 0.3
+            mu = E/(2.*(1. + nu))
+            kappa = E/(3.*(1. - 2.*nu))
+            J = np.linalg.det(F)
+            Jinv = J**(-2./3.)
+            I1 = np.trace(F.T @ F)
+            return (mu/2.)*(Jinv*I1 - 3.) + (kappa/2.) * (J - 1.)**2.
+        P_fn = jax.grad(psi)
+
+        def first_PK_stress(u_grad, E, H_bar):
+            return P_fn(u_grad + H_bar + np.eye(self.dim), E)
+        return first_PK_stress
+
+    def get_tensor_map(self):
+        stress = self.get_stress_fn()
+        return lambda u_grad, E: stress(u_grad, E, self.H_bar)
+
+    def newton_update(self, sol):
+        return self.newton_vars(sol, laplace=[self.E])
+
+    def compute_residual(self, sol):
+        return self.compute_residual_vars(sol, laplace=[self.E])
+
+
+class BatchRVE(RVE):
+    """RVE with the macroscopic displacement gradient as an internal variable, for batched solves over H_bar
+    """
+    def get_tensor_map(self):
+        return self.get_stress_fn()
+
+    def internal_vars(self, H_bar):
+        return {'laplace': [self.E, np.broadcast_to(H_bar, self.E.shape + H_bar.shape)]}
+
+    def newton_update(self, sol):
+        return self.newton_vars(sol, **self.internal_vars(self.H_bar))
+
+    def compute_residual(self, sol):
+        return self.compute_residual_vars(sol, **self.internal_vars(self.H_bar))
+
+
+def rve_problem(N, problem_class=RVE):
+    """Periodic N x N x N unit cell fixed at the origin, with the constraint scaling of the unpreconditioned 
+    Lagrange multiplier solver
+    """
+    mesh = structured_box_mesh(N, N, N, ele_type='HEX8')
+    corner = lambda point: np.isclose(np.linalg.norm(point), 0., atol=1e-5)
+    faces_A = [lambda point, d=d: np.isclose(point[d], 0., atol=1e-5) for d in range(3)]
+    faces_B = [lambda point, d=d: np.isclose(point[d], 1., atol=1e-5) for d in range(3)]
+    mappings = [lambda point, d=d: point + np.eye(3)[d] for d in range(3)]
+    periodic_bc_info = [[fn for fn in faces_A for i in range(3)], [fn for fn in faces_B for i in range(3)], 
+                        [fn for fn in mappings for i in range(3)], [0, 1, 2]*3]
+    dirichlet_bc_info = [[corner]*3, [0, 1, 2], [lambda point: 0.]*3]
+    problem = problem_class(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info, periodic_bc_info=periodic_bc_info)
+    problem.p_num_eps = 1e2
+    return problem
@@ -0,0 +1,50 @@
+import numpy as onp
+import jax.numpy as np
+import unittest
+
+from jax_am.fem.generate_mesh import scrambled_box_mesh, renumber_mesh
+from jax_am.fem.models import LinearElasticity
+from jax_am.fem.solver import solver
+
+
+class Test(unittest.TestCase):
+    """Test mesh renumbering
+    """
+    def test_renumber_mesh(self):
+        """Renumbering reduces the bandwidth and, mapped back, gives the same solution
+        """
+        scrambled = scrambled_box_mesh(4, 'HEX8')
+
+        def left(point):
+            return np.isclose(point[0], 0., atol=1e-5)
+
+        def right(point):
+            return np.isclose(point[0], 1., atol=1e-5)
+
+        def zero_dirichlet_val(point):
+            return 0.
+
+        def dirichlet_val(point):
+            return 0.01
+
+        dirichlet_bc_info = [[left, left, left, right], [0, 1, 2, 0], 
+                             [zero_dirichlet_val, zero_dirichlet_val, zero_dirichlet_val, dirichlet_val]]
+        sol_scrambled = solver(LinearElasticity(scrambled, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info), linear=True)
+
+        def bandwidth(cells):
+            return onp.max(onp.max(cells, axis=1) - onp.min(cells, axis=1))
+
+        for node_order in ['rcm', 'morton']:
+            mesh = renumber_mesh(scrambled, node_order, 'morton')
+            if node_order == 'rcm':
+                self.assertLess(bandwidth(mesh.cells), 0.75*bandwidth(scrambled.cells))
+            onp.testing.assert_array_equal(mesh.to_original_order(mesh.points), scrambled.points)
+            onp.testing.assert_array_equal(mesh.to_original_order(mesh.cells[:, 0], 'cell'), 
+                                           onp.argsort(mesh.node_perm)[scrambled.cells[:, 0]])
+            problem = LinearElasticity(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info)
+            sol = solver(problem, linear=True)
+            onp.testing.assert_allclose(mesh.to_original_order(sol), sol_scrambled, atol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
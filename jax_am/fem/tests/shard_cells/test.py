@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+
+SCRIPT = """
+import json
+import numpy as onp
+import jax
+from jax_am.fem.generate_mesh import structured_box_mesh
+from jax_am.fem.models import HyperElasticity, Plasticity
+
+mesh = structured_box_mesh(3, 3, 3, ele_type='HEX8')
+sol = 0.01*onp.random.default_rng(0).standard_normal((len(mesh.points), 3))
+diffs = {}
+for problem_class in [HyperElasticity, Plasticity]:
+    for symmetric in [False, True]:
+        single = problem_class(mesh, vec=3, dim=3, symmetric=symmetric)
+        sharded = problem_class(mesh, vec=3, dim=3, symmetric=symmetric, shard_cells=True, cell_batch_memory=2**16)
+        res_diff = onp.max(onp.abs(single.newton_update(sol) - sharded.newton_update(sol)))
+        jac_diff = onp.max(onp.abs(single.A_data - sharded.A_data))/onp.max(onp.abs(single.A_data))
+        diffs[f"{problem_class.__name__}, symmetric={symmetric}"] = [float(res_diff), float(jac_diff)]
+print(json.dumps({'num_devices': len(jax.devices()), 'diffs': diffs}))
+"""
+
+
+class Test(unittest.TestCase):
+    """Test sharded cell kernels on virtual CPU devices
+    """
+    def test_shard_cells(self):
+        """Residuals and CSR data agree with the single-device path. 
+        27 cells on 4 devices, so padded cells are exercised as well.
+        The devices must be requested before jax initializes, hence the fresh interpreter.
+        """
+        env = dict(os.environ, XLA_FLAGS='--xla_force_host_platform_device_count=4', JAX_PLATFORMS='cpu')
+        out = subprocess.run([sys.executable, '-c', SCRIPT], capture_output=True, text=True, check=True, env=env).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        self.assertEqual(result['num_devices'], 4)
+        for case, (res_diff, jac_diff) in result['diffs'].items():
+            self.assertLess(res_diff, 1e-10, case)
+            self.assertLess(jac_diff, 1e-12, case)
+
+
+if __name__ == '__main__':
+    unittest.main()
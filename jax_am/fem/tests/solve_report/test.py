@@ -0,0 +1,39 @@
+import numpy as onp
+import jax.numpy as np
+import json
+import unittest
+
+from jax_am.fem.models import HyperElasticity
+from jax_am.fem.solver import solver
+from jax_am.fem.generate_mesh import structured_box_mesh
+
+
+class Test(unittest.TestCase):
+    """Test solver telemetry
+    """
+    def test_solve_report(self):
+        """The report records the Newton residual history, Krylov iterations and matrix size
+        """
+        mesh = structured_box_mesh(2, 2, 2)
+        left = lambda point: np.isclose(point[0], 0., atol=1e-5)
+        right = lambda point: np.isclose(point[0], 1., atol=1e-5)
+        zero = lambda point: 0.
+        stretch = lambda point: 0.05
+        dirichlet_bc_info = [[left, left, left, right], [0, 1, 2, 0], [zero, zero, zero, stretch]]
+        problem = HyperElasticity(mesh, vec=3, dim=3, dirichlet_bc_info=dirichlet_bc_info)
+        sol, report = solver(problem, return_report=True)
+
+        self.assertIs(report, problem.solve_report)
+        self.assertTrue(report.converged)
+        self.assertLess(report.newton_res_history[-1], 1e-6)
+        self.assertEqual(len(report.linear_solves), len(report.newton_res_history))
+        self.assertTrue(all(s['iterations'] > 0 and s['matvecs'] > s['iterations'] for s in report.linear_solves))
+        self.assertEqual(report.nnz, problem.assembly_plan.nnz)
+        self.assertEqual(report.phase_counts['newton_update'], len(report.newton_res_history) + 1)
+        self.assertGreater(report.setup_time, 0.)
+        json.dumps(report.summary())
+        onp.testing.assert_array_equal(sol.shape, (len(mesh.points), 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
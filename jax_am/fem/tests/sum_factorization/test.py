@@ -0,0 +1,66 @@
+import numpy as onp
+import jax.numpy as np
+import basix
+import unittest
+
+from jax_am.fem.models import HyperElasticity
+from jax_am.fem.generate_mesh import Mesh
+from jax_am.fem.basis import get_elements
+
+
+def perturbed_hex_mesh(N, ele_type):
+    """Structured mesh of the unit cube with N^3 HEX8 or HEX27 cells and randomly perturbed nodes.
+    """
+    _, basix_ele, _, _, degree, re_order = get_elements(ele_type)
+    M = N*degree
+    xs = onp.linspace(0., 1., M + 1)
+    points = onp.stack(onp.meshgrid(xs, xs, xs, indexing='ij'), axis=-1).reshape(-1, 3)
+    points = points + 0.05/M*onp.random.default_rng(0).uniform(-1., 1., points.shape)
+    node_ids = onp.arange((M + 1)**3).reshape(M + 1, M + 1, M + 1)
+    offsets = onp.rint(basix.create_element(basix.ElementFamily.P, basix_ele, degree).points[re_order]*degree).astype(int)
+    corners = degree*onp.stack(onp.meshgrid(*[onp.arange(N)]*3, indexing='ij'), axis=-1).reshape(-1, 1, 3)
+    inds = corners + offsets[None, :, :]
+    cells = node_ids[inds[:, :, 0], inds[:, :, 1], inds[:, :, 2]]
+    return Mesh(points, cells)
+
+
+class Test(unittest.TestCase):
+    """Test sum-factorized Laplace kernels and on-the-fly geometry
+    """
+    def test_sum_factorization(self):
+        """Residuals and cell Jacobians agree with the dense shape gradient kernels
+        """
+        for ele_type in ['HEX8', 'HEX27']:
+            mesh = perturbed_hex_mesh(2, ele_type)
+            sol = 0.01*onp.random.default_rng(1).standard_normal((len(mesh.points), 3))
+            dense = HyperElasticity(mesh, vec=3, dim=3, ele_type=ele_type)
+            factorized = HyperElasticity(mesh, vec=3, dim=3, ele_type=ele_type, sum_factorization=True)
+
+            self.assertFalse(hasattr(factorized, 'shape_grads'))
+            onp.testing.assert_allclose(factorized.compute_residual(sol), dense.compute_residual(sol), rtol=1e-10, atol=1e-12)
+            onp.testing.assert_allclose(factorized.get_u_grads(sol), dense.get_u_grads(sol), rtol=1e-10, atol=1e-12)
+            cells_sol = np.array(sol)[dense.cells]
+            _, jac_dense = dense.split_and_compute_cell(cells_sol, onp, True)
+            _, jac_factorized = factorized.split_and_compute_cell(cells_sol, onp, True)
+            onp.testing.assert_allclose(jac_factorized, jac_dense, rtol=1e-10, atol=1e-12)
+
+    def test_on_the_fly_geometry(self):
+        """Recomputing the geometry inside the kernels gives the same residuals, Jacobians and gradients
+        """
+        mesh = perturbed_hex_mesh(2, 'HEX27')
+        sol = 0.01*onp.random.default_rng(1).standard_normal((len(mesh.points), 3))
+        stored = HyperElasticity(mesh, vec=3, dim=3, ele_type='HEX27')
+        cells_sol = np.array(sol)[stored.cells]
+        _, jac_stored = stored.split_and_compute_cell(cells_sol, onp, True)
+        for sum_factorization in [False, True]:
+            on_the_fly = HyperElasticity(mesh, vec=3, dim=3, ele_type='HEX27', sum_factorization=sum_factorization, 
+                                         on_the_fly_geometry=True)
+            self.assertFalse(hasattr(on_the_fly, 'shape_grads'))
+            onp.testing.assert_allclose(on_the_fly.compute_residual(sol), stored.compute_residual(sol), rtol=1e-10, atol=1e-12)
+            _, jac_on_the_fly = on_the_fly.split_and_compute_cell(cells_sol, onp, True)
+            onp.testing.assert_allclose(jac_on_the_fly, jac_stored, rtol=1e-10, atol=1e-12)
+            onp.testing.assert_allclose(on_the_fly.get_u_grads(sol), stored.get_u_grads(sol), rtol=1e-10, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,9 @@
-import meshio
 import os
 import numpy as onp
 
 
 def save_sol(problem, sol, sol_file, cell_infos=None, point_infos=None, cell_type='hexahedron'):
+    import meshio
     sol_dir = os.path.dirname(sol_file)
     os.makedirs(sol_dir, exist_ok=True)
     out_mesh = meshio.Mesh(points=problem.points, cells={cell_type: problem.cells})
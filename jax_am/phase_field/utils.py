@@ -1,17 +1,13 @@
 import jax.numpy as np
 import jax
 import numpy as onp
-import orix
-import meshio
 import pickle
 import time
 import os
-import matplotlib.pyplot as plt
-from orix import plot
-from orix.quaternion import Orientation, symmetry
-from orix.vector import Vector3d
 from scipy.spatial.transform import Rotation as R
-from sklearn.decomposition import PCA
+
+# meshio, orix, matplotlib and sklearn are imported where they are used, so that importing 
+# this module (e.g., only for walltime) stays cheap
 
 onp.random.seed(1)
 
@@ -26,6 +22,7 @@ class Field:
         self.get_unique_ori_colors()
 
     def process_neper_mesh(self):
+        import meshio
         print(f"Processing neper mesh...")
         neper_folder = os.path.join(self.pf_args['data_dir'], "neper")
 
@@ -85,6 +82,11 @@ class Field:
     def get_unique_ori_colors(self):
         """Grain orientations and IPF colors
         """
+        import matplotlib.pyplot as plt
+        from orix import plot
+        from orix.quaternion import Orientation, symmetry
+        from orix.vector import Vector3d
+
         if self.ori2 is None:
             ori2 = Orientation.random(self.pf_args['num_oris'])
         else:
@@ -150,6 +152,7 @@ class Field:
  
 
 def process_eta(pf_args):
+    import meshio
     step = 13
     file_path = os.path.join(pf_args['data_dir'], f"vtk/pf/sols/u{step:03d}.vtu")
     mesh_w_data = meshio.read(file_path)
@@ -252,6 +255,7 @@ def get_aspect_ratio_inputs(grains_combined, volumes, centroids):
 
 
 def compute_aspect_ratios_and_vols(grain_vols, grain_centroids):
+    from sklearn.decomposition import PCA
     pca = PCA(n_components=3)
     print(f"Call compute_aspect_ratios_and_vols")
     grain_sum_vols = []